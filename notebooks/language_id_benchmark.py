@@ -0,0 +1,62 @@
+# %% [markdown]
+# # requirements
+import time
+import numpy as np
+import pandas as pd
+
+# root path
+import sys
+import os
+
+# Add the project root directory to sys.path
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(project_root)
+
+# Now you can import from src
+from src.app.settings import Settings
+settings = Settings()
+from src.app.utils import open_table, is_english
+from src.app.services.blob_store import BlobStore
+from src.app.services.language_identifier import LanguageIdentifier
+
+# %% [markdown]
+# # corpus
+# %%
+df = open_table(settings.JOB_OFFERS)
+texts = BlobStore().texts(df).fillna('').to_list()
+len(texts), np.mean([len(text) for text in texts])
+
+# %% [markdown]
+# # is_english vs LanguageIdentifier
+# is_english reads every character of a text while LanguageIdentifier only reads
+# the first max_chars (500 by default), so part of the speedup comes from reading
+# less text. The second timing reads the full texts for a like for like comparison.
+# %%
+start = time.perf_counter()
+baseline = np.array([is_english(text) for text in texts])
+baseline_seconds = time.perf_counter() - start
+
+identifier = LanguageIdentifier()
+start = time.perf_counter()
+labels, confidence = identifier.predict(texts)
+batch_seconds = time.perf_counter() - start
+
+start = time.perf_counter()
+LanguageIdentifier(max_chars=0).predict(texts)
+full_seconds = time.perf_counter() - start
+
+print(f'is_english: {baseline_seconds:.3f}s, LanguageIdentifier: {batch_seconds:.3f}s, speedup: {baseline_seconds / batch_seconds:.1f}x')
+print(f'LanguageIdentifier over the full texts: {full_seconds:.3f}s, speedup: {baseline_seconds / full_seconds:.1f}x')
+# %%
+pd.crosstab(baseline, labels, rownames=['is_english'], colnames=['label'])
+
+# %% [markdown]
+# # disagreements
+# %%
+df_disagree = pd.DataFrame({
+    'text': [text[:200] for text in texts],
+    'is_english': baseline,
+    'label': labels,
+    'confidence': confidence
+})
+df_disagree[df_disagree['is_english'] != (df_disagree['label'] == 'en')].sort_values('confidence')
@@ -2,6 +2,7 @@
 #custom scraper
 import pandas as pd
 from src.app.services.custom_scraper import customLinkedInScraper
+from src.app.services.raw_job import RawJob
 #storage
 from src.app.utils import save_json, open_json
 #env
@@ -32,12 +33,12 @@ class Searcher:
                 scraper = customLinkedInScraper(keyword=role)
                 default_jobs = scraper.scrape_jobs()
                 if default_jobs:
-                    df_default = pd.DataFrame(default_jobs)
+                    df_default = RawJob.frame(default_jobs)
                     print(f"Successfully scraped {len(default_jobs)} default jobs.")
                     print(df_default.head())
                     # Save the scraped jobs to a JSON file
                     data_jobs = open_json(settings.RESULTS)
-                    data_jobs.extend(default_jobs)
+                    data_jobs.extend(job.to_dict() for job in default_jobs)
                     # Save the updated data to the JSON file
                     save_json(settings.RESULTS, data_jobs)
                 else:
@@ -68,7 +68,7 @@ class Seeker():
         2. Expires outdated jobs (currently commented out).
         3. Embeds user data (currently commented out).
         4. Embeds job data (currently commented out).
-        5. Saves matches using the Mentor service.
+        5. Pushes the newly embedded jobs to their users and saves matches using the Mentor service.
         6. Retrieves and processes matches for each user, generating recommendations.
         7. Saves recommendations to markdown files in the output directory.
 
@@ -94,9 +94,12 @@ class Seeker():
             logger.info("User embedding completed")
                         
             logger.info("Starting job embedding")
-            embeder.jobs()
+            new_jobs = embeder.jobs()
             logger.info("Job embedding completed")
             
+            logger.info("Pushing the new jobs to their users")
+            mentor.push(new_jobs)
+            
             logger.info("Starting the mentor service")
             mentor.run()
             
@@ -104,7 +107,8 @@ class Seeker():
             for user_id in self.user_ids:
                 try:
                     logger.info(f"Processing matches for user_id: {user_id}")
-                    matches = retriever.get_last_matches(user_id)
+                    user = mentor.users().get(user_id)
+                    matches = retriever.get_last_matches(user_id, locations=user.location if user else None)
                     logger.info(f"Found {len(matches)} matches for user_id: {user_id}")
                     
                     links = [
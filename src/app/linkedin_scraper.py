@@ -16,6 +16,7 @@ from linkedin_jobs_scraper.filters import RelevanceFilters, TimeFilters, TypeFil
 logging.basicConfig(level = logging.INFO)
 #storage
 from src.app.utils import save_json, open_json
+from src.app.services.raw_job import RawJob
 jobs = []
 
 
@@ -39,7 +40,7 @@ def pilot():
     info = f"[PILOT] Starting pilot | setting up default result file]"
     logging.info(info)
     def save_callback():
-        save_json(settings.RESULTS, jobs)
+        RawJob.dump(settings.RESULTS, jobs)
 
     def on_data(data: EventData):
 
@@ -60,7 +61,11 @@ def pilot():
             'scraping_date':datetime.now().strftime("%Y-%m-%d") #scraping_date
         }
 
-        jobs.append(jobs_data)
+        try:
+            jobs.append(RawJob.from_dict(jobs_data))
+        except ValueError as e:
+            logging.error(f'[ON_DATA] Skipping job that does not match the raw job schema: {e}')
+            return
         print('[seniority_level'+'-'*10, data.seniority_level)
         print('[ON_DATA]', data.title, data.company, data.date, data.link, len(data.description))
     
@@ -0,0 +1,110 @@
+""" module to run the preprocessing ETL as eager columnar Arrow operations """
+#base
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+def to_table(df: pd.DataFrame):
+    """
+    Convert a dataframe to an Arrow table.
+
+    Args:
+        df (pd.DataFrame): The dataframe to convert
+
+    Returns:
+        pa.Table: The table, None for a dataframe without columns
+    """
+    if not len(df.columns):
+        return None
+    return pa.Table.from_pandas(df, preserve_index=False)
+
+def first_rows(keys):
+    """
+    Find the first row of every key, like drop_duplicates(keep='first').
+
+    Args:
+        keys (pa.ChunkedArray): Key of every row, missing keys are one group
+
+    Returns:
+        np.ndarray: Sorted positions of the first row of every key
+    """
+    grouped = pa.table({'key': keys, 'row': np.arange(len(keys))}).group_by('key').aggregate([('row', 'min')])
+    return np.sort(grouped.column('row_min').to_numpy())
+
+def combine(tables: list):
+    """
+    Combine the raw and stored job offers, keeping the first row of every job_id.
+
+    The tables are already in memory and every compute call runs eagerly. Dictionary
+    encoded columns are decoded first so the sources share a schema.
+
+    Args:
+        tables (list): Arrow tables in priority order, None for missing sources
+
+    Returns:
+        pa.Table: The combined job offers with remote status and skills
+    """
+    tables = [
+        table.cast(pa.schema([
+            field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+            for field in table.schema
+        ]))
+        for table in tables if table is not None
+    ]
+    table = pa.concat_tables(tables, promote_options='permissive')
+    rows = first_rows(table.column('job_id'))
+    valid = pc.and_(
+        pc.is_valid(table.column('remote').take(rows)),
+        pc.is_valid(table.column('skills').take(rows))
+    )
+    rows = rows[valid.to_numpy(zero_copy_only=False)]
+    return table.take(rows)
+
+def clean(table: pa.Table, excluded_companies: list, since: pd.Timestamp):
+    """
+    Filter, clean, sort and deduplicate the job offers with eager compute calls.
+
+    The table is already materialized, so nothing is pushed down to the reads.
+    Every step works on the row positions and the few columns it needs, the
+    other columns are gathered once at the end.
+
+    Args:
+        table (pa.Table): Augmented job offers
+        excluded_companies (list): Companies to filter out
+        since (pd.Timestamp): Oldest publication date to keep
+
+    Returns:
+        pa.Table: The transformed job offers sorted by publication date
+    """
+    rows = np.arange(table.num_rows)
+    companies = table.column('company')
+    keep = pc.invert(pc.is_in(companies, value_set=pa.array(excluded_companies, type=companies.type)))
+    rows = rows[pc.fill_null(keep, True).to_numpy(zero_copy_only=False)]
+    logger.debug(f'{len(rows)} jobs left after filtering out fake companies')
+
+    dates = pc.cast(table.column('publication_date').take(rows), pa.timestamp('us'))
+    recent = pc.fill_null(pc.greater_equal(dates, pa.scalar(since.to_pydatetime(), pa.timestamp('us'))), False)
+    recent = recent.to_numpy(zero_copy_only=False)
+    rows, dates = rows[recent], pc.strftime(dates.filter(recent), format='%Y-%m-%d')
+    logger.debug(f'{len(rows)} jobs left after date filtering')
+
+    order = pc.sort_indices(pa.table({'date': dates}), sort_keys=[('date', 'descending')]).to_numpy()
+    rows, dates = rows[order], dates.take(order)
+
+    links = pc.list_element(pc.split_pattern(table.column('link').take(rows), pattern='?', max_splits=1), 0)
+    first = first_rows(links)
+    rows, dates, links = rows[first], dates.take(first), links.take(first)
+    logger.debug(f'{len(rows)} jobs left after link deduplication')
+
+    first = first_rows(table.column('description_hash').take(rows))
+    rows, dates, links = rows[first], dates.take(first), links.take(first)
+
+    table = table.take(rows)
+    table = table.set_column(table.schema.get_field_index('link'), 'link', links)
+    table = table.set_column(table.schema.get_field_index('publication_date'), 'publication_date', dates)
+    return table
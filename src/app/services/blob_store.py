@@ -0,0 +1,194 @@
+""" module to store the job descriptions once, addressed by their content """
+#base
+import os
+import time
+import hashlib
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+
+
+class BlobStore():
+    """
+    A content-addressed store for the job descriptions.
+
+    Every text is stored once under the 64-bit blake2b hash of its content, so job
+    records only carry the hash and reposts share a single copy. The store is a
+    directory of zstd compressed parquet parts with hash and text columns, sorted
+    by hash in small row groups so lookups skip the row groups whose hash range
+    does not hold a requested key. New texts are appended as a new part, and once
+    there are more than max_parts parts they are merged into a single one.
+
+    Attributes:
+        path (str): Directory of the store
+        max_parts (int): Number of parts that triggers a merge
+    """
+    ROW_GROUP_SIZE = 4096
+
+    def __init__(self, path: str = None, max_parts: int = None):
+        """
+        Initialize the BlobStore with the path from settings.
+
+        Args:
+            path (str): Store directory, defaults to settings.DESCRIPTIONS or a directory next to the job offers
+            max_parts (int): Number of parts that triggers a merge, defaults to settings.DESCRIPTIONS_MAX_PARTS
+        """
+        self.path = path or settings.DESCRIPTIONS or f'{os.path.splitext(settings.JOB_OFFERS)[0]}_descriptions'
+        self.max_parts = max(1, int(max_parts if max_parts is not None else settings.DESCRIPTIONS_MAX_PARTS))
+        self._keys = None
+        self._parts = None
+
+    @staticmethod
+    def key(text):
+        """
+        Get the content address of a text.
+
+        Args:
+            text (str): The text to address
+
+        Returns:
+            str: 16 hexadecimal characters, or None for a missing text
+        """
+        if not isinstance(text, str):
+            return None
+        return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+    def parts(self):
+        """
+        List the parts of the store.
+
+        Returns:
+            list: The part file names, oldest first
+        """
+        if not os.path.isdir(self.path):
+            return []
+        return sorted(name for name in os.listdir(self.path) if name.startswith('part-') and name.endswith('.parquet'))
+
+    def _read(self, columns: list, keys: list = None):
+        """Read the store, optionally only some keys."""
+        parts = self.parts()
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        filters = [('hash', 'in', list(keys))] if keys is not None else None
+        return pq.read_table(
+            [os.path.join(self.path, part) for part in parts],
+            columns=columns,
+            filters=filters
+        ).to_pandas()
+
+    def _write(self, table: pa.Table):
+        """Write a part sorted by hash, in row groups of ROW_GROUP_SIZE rows."""
+        os.makedirs(self.path, exist_ok=True)
+        table = table.sort_by('hash')
+        pathfile = os.path.join(self.path, f'part-{time.time_ns()}.parquet')
+        pq.write_table(table, f'{pathfile}.tmp', compression='zstd', row_group_size=self.ROW_GROUP_SIZE)
+        os.replace(f'{pathfile}.tmp', pathfile)
+        return os.path.basename(pathfile)
+
+    def keys(self):
+        """
+        Get the addresses of the stored texts.
+
+        The hashes are read once and kept until the parts of the store change.
+
+        Returns:
+            set: The stored hashes
+        """
+        parts = self.parts()
+        if self._keys is None or parts != self._parts:
+            self._keys = set(self._read(['hash'])['hash'])
+            self._parts = parts
+        return self._keys
+
+    def compact(self):
+        """
+        Merge the parts of the store into a single part sorted by hash.
+
+        The merged part is written before the old parts are removed, so readers
+        never miss a text.
+
+        Returns:
+            int: The number of parts merged
+        """
+        parts = self.parts()
+        if len(parts) < 2:
+            return 0
+        try:
+            table = pq.read_table([os.path.join(self.path, part) for part in parts], columns=['hash', 'text'])
+            _, first = np.unique(table.column('hash').to_numpy(zero_copy_only=False), return_index=True)
+            merged = self._write(table.take(np.sort(first)))
+            for part in parts:
+                os.remove(os.path.join(self.path, part))
+            if self._parts == parts:
+                self._parts = [merged]
+            logger.info(f'Merged {len(parts)} description parts into {merged} at {self.path}')
+            return len(parts)
+        except Exception as e:
+            logger.error(f'Error merging the description parts: {e}')
+            return 0
+
+    def put(self, texts):
+        """
+        Store the texts that are not stored yet.
+
+        Args:
+            texts (iterable): Texts to store
+
+        Returns:
+            list: The address of every text, in the same order
+        """
+        texts = list(texts)
+        hashes = [self.key(text) for text in texts]
+        stored = self.keys()
+        new = {}
+        for hash_, text in zip(hashes, texts):
+            if hash_ is not None and hash_ not in stored:
+                new[hash_] = text
+        if new:
+            part = self._write(pa.table({'hash': list(new), 'text': list(new.values())}))
+            stored.update(new)
+            self._parts = self._parts + [part] if self._parts is not None else None
+            logger.info(f'Storing {len(new)} new descriptions at {self.path}')
+            if len(self.parts()) > self.max_parts:
+                self.compact()
+        return hashes
+
+    def get(self, keys):
+        """
+        Fetch the texts of some addresses.
+
+        Args:
+            keys (iterable): Addresses to fetch
+
+        Returns:
+            dict: Text indexed by hash, missing addresses are left out
+        """
+        keys = {key for key in keys if isinstance(key, str)}
+        if not keys:
+            return {}
+        df = self._read(['hash', 'text'], keys)
+        return dict(zip(df['hash'], df['text']))
+
+    def texts(self, df: pd.DataFrame):
+        """
+        Get the descriptions of some job offers, fetching only the ones not held inline.
+
+        Args:
+            df (pd.DataFrame): Job offers with a description and/or a description_hash column
+
+        Returns:
+            pd.Series: The descriptions aligned with df
+        """
+        texts = df['description'] if 'description' in df.columns else pd.Series([None] * len(df), index=df.index, dtype=object)
+        missing = texts.isna()
+        if missing.any() and 'description_hash' in df.columns:
+            fetched = self.get(df.loc[missing, 'description_hash'])
+            texts = texts.where(~missing, df['description_hash'].map(fetched))
+        return texts
@@ -0,0 +1,224 @@
+""" module to compact the raw scraped jobs into a date partitioned archive """
+#base
+import os
+import time
+import logging
+logger = logging.getLogger('Jobbot')
+from datetime import datetime
+# vector management
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+from src.app.utils import (
+    save_records,
+    list_partitions,
+    partition_directory,
+    table_to_frame,
+    PARTITION_FILE
+)
+from src.app.services.job_ids import JobIds
+from src.app.services.raw_job import RawJob
+
+
+class Compactor():
+    """
+    A class for rolling the raw scraped jobs into an archive of parquet partitions.
+
+    The raw JSON or NDJSON file grows with every scrape. Compaction moves its rows
+    into one zstd compressed parquet file per scraping_date, drops the rows whose
+    canonical link is already archived and empties the raw file. Readers then open
+    only the partitions of the scraping dates they need.
+
+    The archived canonical links are kept apart in a _links directory of parquet
+    parts sorted by link in small row groups, so checking the raw links only reads
+    the row groups whose range holds them instead of every partition. Each
+    compaction appends a part and the parts are merged past MAX_LINK_PARTS.
+
+    Compaction must not run while a scraper is appending to the raw file.
+
+    Attributes:
+        path (str): Archive directory, compaction is disabled when empty
+        raw (str): Raw JSON or NDJSON file rolled into the archive
+        compression (str): Parquet compression codec
+    """
+    COLUMNS = ['scraping_date']
+    LINKS = '_links'
+    ROW_GROUP_SIZE = 4096
+    MAX_LINK_PARTS = 8
+
+    def __init__(self, path: str = None, raw: str = None, compression: str = 'zstd'):
+        """
+        Initialize the Compactor with the paths from settings.
+
+        Args:
+            path (str): Archive directory, defaults to settings.RAW_ARCHIVE
+            raw (str): Raw file, defaults to settings.DATA_JOBS
+            compression (str): Parquet compression codec
+        """
+        self.path = settings.RAW_ARCHIVE if path is None else path
+        self.raw = raw or settings.DATA_JOBS
+        self.compression = compression
+
+    @property
+    def enabled(self):
+        """bool: True when an archive directory is configured."""
+        return bool(self.path)
+
+    def _read(self, directory: str, columns: list = None):
+        """Read the parquet file of a partition."""
+        return pq.read_table(os.path.join(self.path, directory, PARTITION_FILE), columns=columns, partitioning=None)
+
+    def link_parts(self):
+        """
+        List the parts of the archived links.
+
+        Returns:
+            list: Paths of the link parts, oldest first
+        """
+        path = os.path.join(self.path, self.LINKS)
+        if not os.path.isdir(path):
+            return []
+        return [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.parquet')]
+
+    def _write_links(self, links):
+        """Write canonical links as a new part sorted by link."""
+        pathfile = os.path.join(self.path, self.LINKS, f'part-{time.time_ns()}.parquet')
+        os.makedirs(os.path.dirname(pathfile), exist_ok=True)
+        table = pa.table({'link': pa.array(sorted(set(links)), type=pa.string())})
+        pq.write_table(table, f'{pathfile}.tmp', compression=self.compression, row_group_size=self.ROW_GROUP_SIZE)
+        os.replace(f'{pathfile}.tmp', pathfile)
+        return pathfile
+
+    def index_links(self):
+        """
+        Rebuild the archived links from the link column of every partition.
+
+        Only needed once for an archive written before the links were kept apart.
+
+        Returns:
+            int: The number of links indexed
+        """
+        tables = [self._read(directory, ['link']) for directory in list_partitions(self.path, columns=self.COLUMNS)]
+        if not tables:
+            return 0
+        links = JobIds.canonical(pa.concat_tables(tables).column('link').to_pandas()).dropna().unique()
+        parts = self.link_parts()
+        self._write_links(links)
+        for part in parts:
+            os.remove(part)
+        logger.info(f'Indexed {len(links)} archived links at {self.path}')
+        return len(links)
+
+    def merge_links(self):
+        """
+        Merge the link parts into a single part.
+
+        Returns:
+            int: The number of parts merged
+        """
+        parts = self.link_parts()
+        if len(parts) < 2:
+            return 0
+        self._write_links(pq.read_table(parts).column('link').to_pylist())
+        for part in parts:
+            os.remove(part)
+        logger.info(f'Merged {len(parts)} archived link parts at {self.path}')
+        return len(parts)
+
+    def links(self, candidates=None):
+        """
+        Get the canonical links already archived.
+
+        Args:
+            candidates (iterable): Canonical links to look up, every archived link by default.
+                Only the row groups whose range holds them are read.
+
+        Returns:
+            pd.Index: The archived canonical links, among the candidates when given
+        """
+        if not self.link_parts() and list_partitions(self.path, columns=self.COLUMNS):
+            self.index_links()
+        parts = self.link_parts()
+        if candidates is not None:
+            candidates = sorted({link for link in candidates if isinstance(link, str)})
+        if not parts or candidates == []:
+            return pd.Index([], dtype=object)
+        filters = [('link', 'in', candidates)] if candidates is not None else None
+        return pd.Index(pq.read_table(parts, filters=filters).column('link').to_pandas().unique())
+
+    def compact(self):
+        """
+        Roll the raw file into the archive.
+
+        Rows without a scraping_date are archived under the compaction date. Only
+        the partitions receiving rows are rewritten and only the archived links
+        among the raw ones are read. The raw file is only emptied once every
+        partition is stored and holds its expected rows, and their links are kept.
+
+        Returns:
+            int: The number of rows archived
+        """
+        try:
+            df_raw = RawJob.read(self.raw)
+            if df_raw.empty:
+                return 0
+            today = datetime.now().strftime("%Y-%m-%d")
+            dates = df_raw['scraping_date']
+            df_raw['scraping_date'] = dates.where(dates.notna() & (dates != ''), today)
+            links = JobIds.canonical(df_raw['link'])
+            df_new = df_raw[~links.isin(self.links(links)) & ~links.duplicated()]
+            for date, df_partition in df_new.groupby('scraping_date', sort=True):
+                directory = partition_directory((date,), self.COLUMNS)
+                pathfile = os.path.join(self.path, directory, PARTITION_FILE)
+                tables = [self._read(directory)] if os.path.exists(pathfile) else []
+                tables.append(pa.Table.from_pandas(df_partition, preserve_index=False))
+                table = pa.concat_tables(tables, promote_options='permissive')
+                os.makedirs(os.path.dirname(pathfile), exist_ok=True)
+                pq.write_table(table, f'{pathfile}.tmp', compression=self.compression)
+                os.replace(f'{pathfile}.tmp', pathfile)
+                if pq.ParquetFile(pathfile).metadata.num_rows != table.num_rows:
+                    raise IOError(f"Partition {directory} was not fully written")
+            if not df_new.empty:
+                self._write_links(links[df_new.index].dropna())
+                if len(self.link_parts()) > self.MAX_LINK_PARTS:
+                    self.merge_links()
+            if save_records(self.raw, [[]]) is None:
+                raise IOError(f"Could not empty the raw file {self.raw}")
+            logger.info(f'Archived {len(df_new)} of {len(df_raw)} raw jobs from {self.raw} at {self.path}')
+            return len(df_new)
+        except Exception as e:
+            logger.error(f"Error compacting raw jobs: {e}")
+            return 0
+
+    def read(self, since: str = ''):
+        """
+        Read the archived raw jobs, oldest scraping date first.
+
+        Args:
+            since (str): Oldest scraping_date to read, YYYY-MM-DD, every partition when empty
+
+        Returns:
+            pd.DataFrame: The raw jobs of the partitions scraped since the date, with
+            the RawJob columns even when no partition is in range
+        """
+        filters = [('scraping_date', '>=', since)] if since else None
+        partitions = sorted(list_partitions(self.path, filters, self.COLUMNS))
+        logger.info(f"Reading {len(partitions)} raw partitions since {since or 'the start'} at {self.path}")
+        if not partitions:
+            return pd.DataFrame(columns=list(RawJob.__slots__), dtype=object)
+        return table_to_frame(pa.concat_tables([self._read(directory) for directory in partitions], promote_options='permissive'))
+
+    def run(self):
+        """
+        Execute the compaction job.
+
+        Returns:
+            int: The number of rows archived
+        """
+        if not self.enabled:
+            logger.info("No raw archive configured, skipping compaction")
+            return 0
+        return self.compact()
@@ -12,6 +12,7 @@ from src.app.settings import Settings
 from dotenv import load_dotenv
 load_dotenv()
 settings = Settings()
+from src.app.services.raw_job import RawJob
 # web scrapping
 from urllib.parse import (
     urlencode,
@@ -407,7 +408,7 @@ class customLinkedInScraper:
 
         return details
 
-    def scrape_single_job(self, job_url: str) -> Optional[Dict[str, Any]]:
+    def scrape_single_job(self, job_url: str) -> Optional[RawJob]:
         """
         Scrapes the details for a single job posting URL.
 
@@ -415,8 +416,8 @@ class customLinkedInScraper:
             job_url (str): The URL of the job posting.
 
         Returns:
-            Optional[Dict[str, Any]]: A dictionary with the scraped job data
-                                      in the specified format, or None if scraping fails.
+            Optional[RawJob]: A validated record with the scraped job data,
+                              or None if scraping or validation fails.
         """
         logging.info(f"Scraping details for: {job_url}")
         soup = self._make_request(job_url)
@@ -446,14 +447,18 @@ class customLinkedInScraper:
             'country': self.location,     # Use the location the scraper was initialized with
             'scraping_date': datetime.now().strftime("%Y-%m-%d")
         }
-        return job_data
+        try:
+            return RawJob.from_dict(job_data)
+        except ValueError as e:
+            logging.error(f"Scraped job does not match the raw job schema: {e}")
+            return None
 
     def scrape_jobs(
             self,
             filters: Optional[Dict[str, str]] = None,
             max_jobs: Optional[int] = None,
             delay_between_jobs: float = 5.0
-        ) -> List[Dict[str, Any]]:
+        ) -> List[RawJob]:
         """
         Performs the complete scraping process: finds job links and scrapes details.
 
@@ -465,7 +470,7 @@ class customLinkedInScraper:
             delay_between_jobs (float): Seconds to wait between scraping job detail pages.
 
         Returns:
-            List[Dict[str, Any]]: A list of dictionaries, each containing data for one job posting.
+            List[RawJob]: A list of validated records, each containing data for one job posting.
         """
         start_url = self._build_search_url(filters=filters)
         job_links, total_found = self.get_job_links(start_url)
@@ -0,0 +1,212 @@
+""" module to collapse near-duplicate job offers with MinHash and LSH """
+#base
+import os
+import re
+import zlib
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+
+
+class Deduplicator():
+    """
+    A class for clustering near-identical job descriptions and keeping one canonical job.
+
+    Descriptions are split into word shingles and summarized by MinHash signatures.
+    Locality sensitive hashing over bands of the signatures proposes candidate pairs,
+    which are kept when their estimated Jaccard similarity reaches the threshold.
+    Every cluster keeps a single canonical job listing the job_ids of its aliases.
+
+    Signatures of the canonical jobs are stored next to the job offers with the
+    description_hash they were computed from, so each run only hashes the new or
+    edited descriptions and compares them with the existing offers.
+
+    Attributes:
+        threshold (float): Minimum estimated Jaccard similarity, 0 disables the stage
+        num_perm (int): Number of MinHash permutations
+        bands (int): Number of LSH bands
+        shingle_size (int): Number of words per shingle
+        path (str): Parquet file holding the stored signatures
+    """
+    PRIME = (1 << 31) - 1
+
+    def __init__(self, threshold: float = None, num_perm: int = 64, bands: int = 16, shingle_size: int = 3, path: str = None):
+        """
+        Initialize the Deduplicator with the threshold from settings.
+
+        Args:
+            threshold (float): Defaults to settings.NEAR_DUPLICATE_THRESHOLD
+            num_perm (int): Number of MinHash permutations, a multiple of bands
+            bands (int): Number of LSH bands
+            shingle_size (int): Number of words per shingle
+            path (str): Signatures file, defaults to a file next to the job offers
+
+        Raises:
+            ValueError: If num_perm is not a multiple of bands
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = float(threshold if threshold is not None else settings.NEAR_DUPLICATE_THRESHOLD)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.path = path or f'{os.path.splitext(settings.JOB_OFFERS)[0]}_minhash.parquet'
+        rng = np.random.default_rng(42)
+        self.a = rng.integers(1, self.PRIME, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, self.PRIME, size=num_perm, dtype=np.uint64)
+
+    @property
+    def enabled(self):
+        """bool: True when a similarity threshold is configured."""
+        return self.threshold > 0
+
+    def shingles(self, text):
+        """
+        Hash the word shingles of a text.
+
+        Args:
+            text (str): The text to shingle
+
+        Returns:
+            np.ndarray: Distinct 31-bit shingle hashes
+        """
+        words = re.findall(r'\b\w+\b', text.lower()) if isinstance(text, str) else []
+        size = min(self.shingle_size, len(words)) or 1
+        shingles = {' '.join(words[start:start + size]) for start in range(max(len(words) - size + 1, 1))}
+        return np.array([zlib.crc32(shingle.encode()) & self.PRIME for shingle in shingles], dtype=np.uint64)
+
+    def signature(self, text):
+        """
+        Compute the MinHash signature of a text.
+
+        Args:
+            text (str): The text to sign
+
+        Returns:
+            np.ndarray: uint32 signature with num_perm values
+        """
+        hashes = self.shingles(text)
+        return ((self.a[:, None] * hashes[None, :] + self.b[:, None]) % self.PRIME).min(axis=1).astype(np.uint32)
+
+    def load(self):
+        """
+        Load the stored signatures.
+
+        Returns:
+            dict: description_hash and signature indexed by job_id, the hash is None
+            for signatures stored without it
+        """
+        if not os.path.exists(self.path):
+            return {}
+        df = pq.read_table(self.path).to_pandas()
+        hashes = df['description_hash'] if 'description_hash' in df.columns else [None] * len(df)
+        return {
+            job_id: (description_hash, np.asarray(signature, dtype=np.uint32))
+            for job_id, description_hash, signature in zip(df['job_id'], hashes, df['signature'])
+        }
+
+    def save(self, signatures: dict):
+        """
+        Store the signatures of the canonical jobs.
+
+        Args:
+            signatures (dict): description_hash and signature indexed by job_id
+        """
+        table = pa.table({
+            'job_id': list(signatures),
+            'description_hash': pa.array([description_hash for description_hash, _ in signatures.values()], type=pa.string()),
+            'signature': pa.array([signature.tolist() for _, signature in signatures.values()], type=pa.list_(pa.uint32()))
+        })
+        pq.write_table(table, self.path)
+        logger.info(f'Storing {len(signatures)} MinHash signatures at {self.path}')
+
+    def clusters(self, signatures: np.ndarray):
+        """
+        Cluster signatures whose estimated Jaccard similarity reaches the threshold.
+
+        Args:
+            signatures (np.ndarray): Matrix with one signature per row
+
+        Returns:
+            np.ndarray: Cluster root of every row, the lowest row of its cluster
+        """
+        parent = np.arange(len(signatures))
+
+        def find(row):
+            while parent[row] != row:
+                parent[row] = parent[parent[row]]
+                row = parent[row]
+            return row
+
+        rows_per_band = self.num_perm // self.bands
+        for band in range(self.bands):
+            buckets = {}
+            for row, key in enumerate(signatures[:, band * rows_per_band:(band + 1) * rows_per_band]):
+                buckets.setdefault(key.tobytes(), []).append(row)
+            for rows in buckets.values():
+                for row in rows[1:]:
+                    first, other = find(rows[0]), find(row)
+                    if first != other and np.mean(signatures[rows[0]] == signatures[row]) >= self.threshold:
+                        parent[max(first, other)] = min(first, other)
+        return np.array([find(row) for row in range(len(signatures))])
+
+    def run(self, df: pd.DataFrame, texts=None):
+        """
+        Keep one canonical job per cluster of near-duplicate descriptions.
+
+        Jobs stored as canonical by the previous run win their cluster, otherwise the
+        first job in the dataframe order does. A stored signature is only reused
+        while the job keeps the description_hash it was computed from. The canonical job lists the job_ids of
+        the jobs it absorbed, together with their previous aliases, in the aliases column.
+
+        Args:
+            df (pd.DataFrame): Job offers with job_id, description and optionally
+                description_hash, sorted by priority
+            texts (callable): Optional function returning the descriptions of a dataframe,
+                used to fetch the ones not held inline
+
+        Returns:
+            pd.DataFrame: The canonical jobs with their aliases
+        """
+        if df.empty:
+            return df
+        df = df.reset_index(drop=True)
+        stored = self.load()
+        hashes = df['description_hash'] if 'description_hash' in df.columns else pd.Series([None] * len(df), dtype=object)
+        is_stored = np.array([
+            job_id in stored and stored[job_id][0] == (description_hash if isinstance(description_hash, str) else None)
+            for job_id, description_hash in zip(df['job_id'], hashes)
+        ], dtype=bool)
+        descriptions = pd.Series([None] * len(df), dtype=object)
+        if (~is_stored).any():
+            descriptions[~is_stored] = (texts(df[~is_stored]) if texts is not None else df.loc[~is_stored, 'description']).to_numpy()
+        signatures = np.vstack([
+            stored[job_id][1] if known else self.signature(description)
+            for job_id, description, known in zip(df['job_id'], descriptions, is_stored)
+        ])
+        logger.info(f'Hashed {int((~is_stored).sum())} new descriptions')
+        # canonical jobs of the previous run come first so they win their clusters
+        priority = np.argsort(~is_stored, kind='stable')
+        roots = np.empty(len(df), dtype=np.int64)
+        roots[priority] = priority[self.clusters(signatures[priority])]
+        previous = df['aliases'] if 'aliases' in df.columns else pd.Series([None] * len(df))
+        aliases = {}
+        for row, root in enumerate(roots):
+            old = previous[row] if isinstance(previous[row], (list, np.ndarray)) else []
+            aliases.setdefault(root, []).extend(list(old) + ([df.at[row, 'job_id']] if row != root else []))
+        keep = np.unique(roots)
+        df_canonical = df.loc[keep].copy()
+        df_canonical['aliases'] = [sorted(set(aliases[root]) - {df.at[root, 'job_id']}) for root in keep]
+        logger.info(f'Collapsed {len(df) - len(df_canonical)} near-duplicate jobs into {len(df_canonical)} canonical jobs')
+        self.save({
+            df.at[root, 'job_id']: (hashes[root] if isinstance(hashes[root], str) else None, signatures[root])
+            for root in keep
+        })
+        return df_canonical.reset_index(drop=True)
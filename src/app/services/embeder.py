@@ -6,15 +6,19 @@ logger = logging.getLogger('Jobbot')
 from datetime import datetime
 import torch
 # vector management
+import numpy as np
 import pandas as pd
 import pyarrow as pa
 import pyarrow.parquet as pq
 # repo imports
-from src.app.utils import open_json
+from src.app.utils import open_json, open_table, recent_filters, location_filters, save_clustered
 from src.app.settings import Settings
 settings = Settings()
 from src.app.utils import Retriever
 retriever = Retriever()
+from src.app.services.quantizer import Quantizer
+from src.app.services.projector import Projector
+from src.app.services.user_registry import UserRegistry
 
 class Embeder():
     """
@@ -22,7 +26,8 @@ class Embeder():
     
     This class handles the creation of vector embeddings for skills and job titles/roles,
     comparing available data with previously embedded data, and storing the results
-    in parquet files organized by date.
+    in parquet files organized by date. Embedding columns are stored with the
+    precision configured in settings.EMBEDDING_DTYPE.
     """
     def __init__(self):
         """
@@ -33,6 +38,9 @@ class Embeder():
         self.job_seekers = settings.JOB_SEEKERS
         self.today = datetime.today().strftime("%Y-%m-%d")
         self.embedder = settings.get_embedder()
+        self.quantizer = Quantizer()
+        self.projector = Projector()
+        self.user_registry = UserRegistry(self.job_seekers)
     
     def users(self):
         """
@@ -49,6 +57,7 @@ class Embeder():
             # previous users
             df_last_embeds = retriever.get_last_embed('users')
             df_last_embeds = df_last_embeds[df_last_embeds['user_id'].isin(df_available_users['user_id'])].copy()
+            df_last_embeds = self.quantizer.dequantize(df_last_embeds, ['avg_skill_embeds', 'avg_role_embeds'])
             
             missing_embeds = list(set(df_available_users.user_id)-set(df_last_embeds.user_id))
             if len(missing_embeds) > 0:
@@ -91,6 +100,7 @@ class Embeder():
                 ignore_index=True
             )
             df_embeds.dropna(inplace=True)
+            df_embeds = self.quantizer.quantize(df_embeds, ['avg_skill_embeds', 'avg_role_embeds'])
             table_embeds = pa.Table.from_pandas(df_embeds)
             today_path = f'{self.root}{self.today}'
             if not os.path.exists(today_path):
@@ -107,14 +117,32 @@ class Embeder():
         
         Compares available jobs with previously embedded jobs,
         generates embeddings for missing jobs, and stores the combined
-        results in a parquet file.
+        results in a parquet file. When a projection is configured it is
+        fitted on the combined job embeddings, stored next to the snapshot,
+        and the projected vectors are written as extra `*_projected` columns.
+        
+        Only the jobs of the locations accepted by some job seeker are read, and
+        the snapshot is clustered by location so Mentor reads only the locations
+        of the users it scores.
+        
+        Returns:
+            list: Ids of the newly embedded jobs, to be pushed with Mentor.push()
         """
         try:
             # new jobs
-            available_jobs_list = open_json(self.job_offers)
-            df_available_jobs = pd.DataFrame(available_jobs_list)
+            registry = self.user_registry.load(self.job_seekers)
+            locations = registry.locations() if len(registry) else None
+            df_available_jobs = open_table(self.job_offers, recent_filters() + location_filters(locations))
             # previous jobs
             df_last_embeds = retriever.get_last_embed('jobs')
+            df_last_embeds = self.quantizer.dequantize(df_last_embeds, ['avg_skill_embeds', 'role_embeds'])
+            # projections are refitted on every run
+            df_last_embeds = df_last_embeds.drop(
+                columns=[
+                    col for col in df_last_embeds.columns
+                    if self.projector.SUFFIX in col or col == 'location'
+                ]
+            )
             
             missing_embeds = list(set(df_available_jobs.job_id)-set(df_last_embeds.job_id))
             if len(missing_embeds) > 0:
@@ -158,13 +186,27 @@ class Embeder():
                 ignore_index=True
             )
             df_embeds.dropna(inplace=True)
-            table_embeds = pa.Table.from_pandas(df_embeds)
+            if 'location' in df_available_jobs.columns:
+                df_embeds['location'] = df_embeds['job_id'].map(
+                    dict(zip(df_available_jobs['job_id'], df_available_jobs['location'].astype(object)))
+                )
             today_path = f'{self.root}{self.today}'
             if not os.path.exists(today_path):
                 os.makedirs(today_path)
+            embed_columns = ['avg_skill_embeds', 'role_embeds']
+            if self.projector.enabled and not df_embeds.empty:
+                matrices = [self.quantizer.to_matrix(df_embeds, col) for col in embed_columns]
+                self.projector.fit(np.vstack(matrices))
+                self.projector.save(f'{today_path}/{self.projector.FILE_NAME}')
+                for col, matrix in zip(self.projector.columns(embed_columns), matrices):
+                    df_embeds[col] = list(self.projector.transform(matrix))
+                embed_columns = embed_columns + self.projector.columns(embed_columns)
+            df_embeds = self.quantizer.quantize(df_embeds, embed_columns)
+            table_embeds = pa.Table.from_pandas(df_embeds)
             today_path_file = f'{today_path}/jobs.parquet'
             logger.info(f'Storing job embeddings at {today_path_file}')
-            pq.write_table(table_embeds, today_path_file)
+            save_clustered(today_path_file, table_embeds, 'location')
+            return df_missing_embeds.loc[df_missing_embeds['job_id'].isin(df_embeds['job_id']), 'job_id'].tolist()
         except Exception as e:
             logger.error(f"Error generating job embeddings: {str(e)}")
     
\ No newline at end of file
@@ -1,8 +1,11 @@
 """ module to review the preprocessed jobs to expire them """
 #base
 import ast
+import asyncio
+import httpx
 import requests
 import time
+from urllib.parse import urlparse
 import pandas as pd
 import logging
 logger = logging.getLogger('Jobbot')
@@ -12,14 +15,19 @@ from requests.exceptions import RequestException
 from src.app.settings import Settings
 settings = Settings()
 from src.app.utils import (
-    open_json,
-    save_json
+    open_table,
+    save_table
 )
 
 
 class Expirer:
     """
     Class for checking job offer availability and expiring outdated offers.
+
+    With settings.EXPIRER_CONCURRENCY above one the links are checked by an
+    asyncio checker over pooled keep-alive httpx connections, with at most that
+    many requests in flight, at most settings.EXPIRER_HOST_RATE requests per
+    second to each host, and every request paused while a Retry-After is pending.
     """
     def __init__(self):
         try:
@@ -27,6 +35,10 @@ class Expirer:
             self.tags = ast.literal_eval(settings.AVAILABLE_TAGS)
             self.retry_delay_seconds = int(settings.RETRY_DELAY_SECONDS)
             self.max_retries = int(settings.MAX_RETRIES)
+            self.concurrency = max(1, int(settings.EXPIRER_CONCURRENCY))
+            self.host_rate = float(settings.EXPIRER_HOST_RATE)
+            self._host_slots = {}
+            self._paused_until = 0.0
             logger.info("Expirer initialized successfully")
         except (AttributeError, ValueError, SyntaxError) as e:
             logger.error(f"Failed to initialize Expirer: {str(e)}")
@@ -34,8 +46,8 @@ class Expirer:
     
     def extract(self, path: str):
         try:
-            jobs_list = open_json(path)
-            df = pd.DataFrame(jobs_list)
+            df = open_table(path)
+            df = df if df is not None else pd.DataFrame()
             logger.info(f"Extracted job data frame with shape: {df.shape}")
             return df
         except (FileNotFoundError, ValueError, pd.errors.EmptyDataError) as e:
@@ -49,8 +61,7 @@ class Expirer:
             response = requests.get(url, timeout=10)  # Add timeout to avoid hanging
             if response.status_code == 429 and retries < self.max_retries:
                 # Check for Retry-After header (if provided)
-                retry_after = response.headers.get('Retry-After')
-                wait_time = int(retry_after) if retry_after and retry_after.isdigit() else self.retry_delay_seconds
+                wait_time = self._retry_after(response)
                 
                 logger.warning(
                     f"Received 429 status code for {url}. Retrying after {wait_time} seconds "
@@ -64,6 +75,30 @@ class Expirer:
             print(f"Error fetching URL {url}: {ex}")
             raise
 
+    def _retry_after(self, response) -> int:
+        """Get the seconds to wait after a 429 response, from its Retry-After header when provided."""
+        retry_after = response.headers.get('Retry-After')
+        return int(retry_after) if retry_after and retry_after.isdigit() else self.retry_delay_seconds
+
+    def availability(self, job_id: str, url: str, response) -> dict:
+        """
+        Decide the availability of a job from the response to its URL.
+        Returns a dictionary with job_id and availability status.
+        """
+        # Handle 404 status code (Not Found)
+        if response.status_code == 404:
+            logger.info(f"Job not found (404): {url}")
+            return {'job_id': job_id, 'available': False}
+
+        # Check response content for expired job tags
+        response_content = str(response.content)
+        if any(tag in response_content for tag in self.tags):
+            logger.info(f"Expired job detected: {url}")
+            return {'job_id': job_id, 'available': False}
+
+        # Job is available
+        return {'job_id': job_id, 'available': True}
+
     def checker(self, job: dict) -> dict:
         """
         Check the availability of a job by making an HTTP request to the job URL.
@@ -78,28 +113,90 @@ class Expirer:
 
         try:
             response = self._make_request(url)
+            return self.availability(job_id, url, response)
+
+        except RequestException:
+            print(f"Failed to check job {job_id} at {url}")
+            return {'job_id': job_id, 'available': True}
 
-            # Handle 404 status code (Not Found)
-            if response.status_code == 404:
-                logger.info(f"Job not found (404): {url}")
-                return {'job_id': job_id, 'available': False}
+    async def _wait_turn(self, host: str):
+        """
+        Wait for the next request slot of a host and for any pending Retry-After.
 
-            # Check response content for expired job tags
-            response_content = str(response.content)
-            if any(tag in response_content for tag in self.tags):
-                logger.info(f"Expired job detected: {url}")
-                return {'job_id': job_id, 'available': False}
+        Slots are reserved without awaiting in between, so the coroutines of the
+        event loop never share one.
+        """
+        loop = asyncio.get_running_loop()
+        if self.host_rate > 0:
+            slot = max(loop.time(), self._host_slots.get(host, 0.0))
+            self._host_slots[host] = slot + 1 / self.host_rate
+            await asyncio.sleep(slot - loop.time())
+        while self._paused_until > loop.time():
+            await asyncio.sleep(self._paused_until - loop.time())
 
-            # Job is available
-            return {'job_id': job_id, 'available': True}
+    async def checker_async(self, client, semaphore, job: dict) -> dict:
+        """
+        Check the availability of a job with the shared asyncio client.
 
-        except RequestException:
-            print(f"Failed to check job {job_id} at {url}")
+        A 429 response pauses every request until its Retry-After has passed, and
+        the job is retried up to self.max_retries times. The semaphore is only
+        held while the request is in flight, not while waiting for a slot.
+        Returns a dictionary with job_id and availability status.
+        """
+        job_id = job.get('job_id')
+        url = job.get('link')
+
+        if not job_id or not url:
+            logger.error("Invalid job data: missing job_id or link")
+            return {'job_id': job_id, 'available': False}
+
+        try:
+            for retries in range(self.max_retries + 1):
+                await self._wait_turn(urlparse(url).netloc)
+                async with semaphore:
+                    response = await client.get(url)
+                if response.status_code != 429 or retries == self.max_retries:
+                    break
+                wait_time = self._retry_after(response)
+                logger.warning(
+                    f"Received 429 status code for {url}. Pausing every request for {wait_time} seconds "
+                    f"(attempt {retries + 1}/{self.max_retries})"
+                )
+                self._paused_until = max(self._paused_until, asyncio.get_running_loop().time() + wait_time)
+            return self.availability(job_id, url, response)
+
+        except httpx.HTTPError as ex:
+            logger.error(f"Failed to check job {job_id} at {url}: {ex}")
             return {'job_id': job_id, 'available': True}
+
+    async def check_all(self, jobs: list, transport=None) -> list:
+        """
+        Check the availability of the jobs concurrently, keeping their order.
+
+        Args:
+            jobs (list): Dictionaries with link and job_id
+            transport (httpx.AsyncBaseTransport): Optional transport of the client
+
+        Returns:
+            list: Dictionaries with job_id and availability status
+        """
+        self._host_slots = {}
+        self._paused_until = 0.0
+        semaphore = asyncio.Semaphore(self.concurrency)
+        limits = httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=10, limits=limits, follow_redirects=True, transport=transport) as client:
+            async def check(job):
+                try:
+                    return await self.checker_async(client, semaphore, job)
+                except Exception as e:
+                    logger.error(f"Error checking job {job.get('job_id')}: {str(e)}")
+                    return {'job_id': job.get('job_id'), 'available': True}
+            return await asyncio.gather(*(check(job) for job in jobs))
           
     def run(self):
         """
-        Run the job availability check using multiprocessing and multithreading.
+        Run the job availability check, one job at a time or with the asyncio
+        checker when self.concurrency is above one.
 
         :return: List of availability results
         """
@@ -116,6 +213,11 @@ class Expirer:
             dict_df_available = df_available[['link', 'job_id']].to_dict(orient='records')
             logger.info(f"Checking availability for {len(dict_df_available)} jobs")
 
+            if self.concurrency > 1:
+                availability = asyncio.run(self.check_all(dict_df_available))
+                logger.info(f"Completed availability check for {len(availability)} jobs")
+                return availability
+
             # Loop through jobs
             availability = []
             for job in dict_df_available:
@@ -161,7 +263,7 @@ class Expirer:
             df_updated = df_raw[df_raw['available']==True].copy()
             dict_df_updated = df_updated.to_dict(orient='records')
             logger.info(f'Final available offers: {len(dict_df_updated)}')
-            save_json(self.job_offers, dict_df_updated)   
+            save_table(self.job_offers, df_updated)
             logger.info(f"Updated job offers saved to {self.job_offers}")
         
         except Exception as e:
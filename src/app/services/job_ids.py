@@ -0,0 +1,107 @@
+""" module to keep a persistent map from the job links to their ids """
+#base
+import os
+import uuid
+import shortuuid
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+
+
+class JobIds():
+    """
+    A persistent map from canonical job links to job ids.
+
+    Links are canonicalized by dropping their query parameters before the id is
+    looked up, so tracking parameters never produce a new job. Known links are
+    resolved with a hash join against the stored map, and ids are only generated
+    for the unseen links, once per distinct link. Links of the stored job offers
+    seed the map, which keeps the ids already used by embeddings and matches.
+
+    Attributes:
+        path (str): Parquet file holding the link and job_id columns
+        namespace (uuid.UUID): UUID namespace for generating the job ids
+    """
+    def __init__(self, path: str = None, namespace: uuid.UUID = uuid.NAMESPACE_DNS):
+        """
+        Initialize the JobIds map with the path from settings.
+
+        Args:
+            path (str): Map file, defaults to settings.JOB_IDS or a file next to the job offers
+            namespace (uuid.UUID): UUID namespace for generating the job ids
+        """
+        self.path = path or settings.JOB_IDS or f'{os.path.splitext(settings.JOB_OFFERS)[0]}_ids.parquet'
+        self.namespace = namespace
+
+    @staticmethod
+    def canonical(links: pd.Series):
+        """
+        Drop the query parameters of the links.
+
+        Args:
+            links (pd.Series): Job links
+
+        Returns:
+            pd.Series: The canonical links
+        """
+        return links.astype(object).str.split('?', n=1).str[0]
+
+    def generate(self, links):
+        """
+        Generate the ids of some links.
+
+        Args:
+            links (iterable): Canonical links
+
+        Returns:
+            list: The shortuuid encoded uuid5 of every link
+        """
+        return [shortuuid.encode(uuid.uuid5(self.namespace, link)) for link in links]
+
+    def load(self):
+        """
+        Load the stored map.
+
+        Returns:
+            pd.DataFrame: The link and job_id of every known job
+        """
+        if not os.path.exists(self.path):
+            return pd.DataFrame({'link': pd.Series(dtype=object), 'job_id': pd.Series(dtype=object)})
+        return pq.read_table(self.path).to_pandas()
+
+    def assign(self, links: pd.Series, df_offers: pd.DataFrame = None):
+        """
+        Get the job id of every link, storing the ids of the unseen ones.
+
+        Args:
+            links (pd.Series): Raw job links
+            df_offers (pd.DataFrame): Stored job offers with link and job_id, seeding the map
+
+        Returns:
+            pd.Series: The job ids aligned with links
+        """
+        canonical = self.canonical(links)
+        df_map = self.load()
+        known = len(df_map)
+        if df_offers is not None and {'link', 'job_id'} <= set(df_offers.columns):
+            df_seed = pd.DataFrame({
+                'link': self.canonical(df_offers['link']).to_numpy(),
+                'job_id': df_offers['job_id'].astype(object).to_numpy()
+            }).dropna()
+            df_map = pd.concat([df_map, df_seed[~df_seed['link'].isin(df_map['link'])]], ignore_index=True)
+        df_map = df_map.drop_duplicates(subset=['link'], ignore_index=True)
+        unseen = pd.Index(canonical.dropna().unique()).difference(df_map['link'])
+        if len(unseen):
+            df_map = pd.concat([df_map, pd.DataFrame({'link': unseen, 'job_id': self.generate(unseen)})], ignore_index=True)
+        if len(df_map) != known:
+            pq.write_table(pa.Table.from_pandas(df_map, preserve_index=False), self.path)
+            logger.info(f'Generated {len(unseen)} job ids, {len(df_map)} links stored at {self.path}')
+        job_ids = pd.DataFrame({'link': canonical.to_numpy()}).merge(df_map, on='link', how='left')['job_id']
+        job_ids.index = links.index
+        return job_ids
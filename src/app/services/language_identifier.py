@@ -0,0 +1,145 @@
+""" module to identify the language of the job descriptions in batch """
+#base
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import numpy as np
+import pandas as pd
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+
+# frequent words that are only written in one of the languages, technical terms
+# such as python, cloud or data are shared by both and carry no evidence
+ENGLISH_WORDS = """
+the and of to in is are was were be been being for with on at by from as that this these those
+it its we our you your they their them he she his her who whom whose which what when where why how
+will would shall should can could may might must do does did done have has had having not or but
+if than then so such also only about into over under between through during before after above
+there here all any each every other some more most very just well etc including within without
+join looking work working team teams company role position experience experienced skills ability
+years strong knowledge develop developing development build building support responsibilities
+requirements required preferred plus degree understanding communication environment across help
+new people customers clients business opportunity apply benefits salary based level senior junior
+""".split()
+
+SPANISH_WORDS = """
+el la los las de del y en un una unos unas es son fue ser estar está están para por con sin sobre
+entre desde hasta hacia según durante que qué cual cuál cuales quien quienes cuando donde como
+cómo este esta estos estas ese esa esos esas aquel su sus nuestro nuestra nuestros nuestras tu tus
+se lo le les nos ya muy más también pero porque si sino ni o u al así otro otra otros otras todo
+toda todos todas cada mismo misma buscamos busca buscando ofrecemos ofrece empresa equipo trabajo
+trabajar experiencia años conocimiento conocimientos desarrollo desarrollar requisitos deseable
+funciones responsabilidades manejo nivel inglés español oportunidad salario beneficios contrato
+tiempo completo profesional perfil vacante cargo área procesos proyectos herramientas clientes
+""".split()
+
+# bytes kept by the tokenizer: ascii letters, digits, underscore, utf-8 multibyte letters and
+# the text separator, any other byte becomes a space
+_SEPARATOR = b'\x01'
+_KEPT = set(b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_' + _SEPARATOR) | set(range(128, 256))
+_TOKENIZER = bytes(byte if byte in _KEPT else ord(' ') for byte in range(256))
+
+
+class LanguageIdentifier():
+    """
+    A batch English/Spanish identifier over a hashed vocabulary.
+
+    Each text contributes naive Bayes evidence from the frequent words that only
+    exist in one language and from the Spanish accented characters. Words shared
+    by both languages, such as technical terms, are ignored, so short Spanish
+    texts full of English tool names are still identified as Spanish.
+
+    The texts of a batch are encoded, joined and tokenized with a single bytes
+    translate and split. The tokens are looked up in the hashed vocabulary at once
+    and the evidence is summed per text with numpy, instead of a Python loop over
+    every word. Only the first max_chars characters of each text are read, which
+    is plenty to tell both languages apart and accounts for part of the speedup
+    over is_english on long descriptions, as that one reads the whole text.
+
+    Attributes:
+        max_chars (int): Characters read from the start of each text, 0 reads it all
+        weight (float): Log likelihood ratio of a vocabulary word
+        character_weight (float): Log likelihood ratio of a Spanish accented character
+        vocabulary (pd.Index): Hashed vocabulary of both languages, utf-8 encoded
+        weights (np.ndarray): English minus Spanish log likelihood of every vocabulary word
+    """
+    LANGUAGES = ('en', 'es')
+
+    def __init__(self, max_chars: int = 500, weight: float = 2.0, character_weight: float = 0.5):
+        """
+        Initialize the LanguageIdentifier with its vocabulary.
+
+        Args:
+            max_chars (int): Characters read from the start of each text, 0 reads it all
+            weight (float): Log likelihood ratio of a vocabulary word
+            character_weight (float): Log likelihood ratio of a Spanish accented character
+        """
+        self.max_chars = max_chars
+        self.weight = weight
+        self.character_weight = character_weight
+        english, spanish = set(ENGLISH_WORDS), set(SPANISH_WORDS)
+        shared = english & spanish
+        english, spanish = sorted(english - shared), sorted(spanish - shared)
+        self.vocabulary = pd.Index([word.encode() for word in english + spanish], dtype=object)
+        self.weights = np.concatenate([np.full(len(english), weight), np.full(len(spanish), -weight)])
+
+    def encode(self, texts):
+        """Lowercase, truncate and utf-8 encode the texts, without separator bytes."""
+        return [
+            ((text[:self.max_chars] if self.max_chars else text) if isinstance(text, str) else '')
+            .lower().encode().replace(_SEPARATOR, b' ')
+            for text in texts
+        ]
+
+    def scores(self, texts):
+        """
+        Compute the English minus Spanish log likelihood of every text.
+
+        Args:
+            texts (list or pd.Series): Texts to identify, missing texts score 0
+
+        Returns:
+            np.ndarray: The score of every text, positive for English
+        """
+        texts = self.encode(texts)
+        if not texts:
+            return np.zeros(0)
+        tokens = np.array((b' ' + _SEPARATOR + b' ').join(texts).translate(_TOKENIZER).split(), dtype=object)
+        separators = tokens == _SEPARATOR
+        owners = np.cumsum(separators)[~separators]
+        positions = self.vocabulary.get_indexer(tokens[~separators])
+        known = positions >= 0
+        scores = np.bincount(owners[known], weights=self.weights[positions[known]], minlength=len(texts))
+        # accented latin letters start with 0xc3 in utf-8, the opening marks are ¿ and ¡
+        characters = np.array([text.count(b'\xc3') + text.count('¿'.encode()) + text.count('¡'.encode()) for text in texts])
+        return scores - self.character_weight * characters
+
+    def predict(self, texts):
+        """
+        Identify the language of a batch of texts.
+
+        Args:
+            texts (list or pd.Series): Texts to identify
+
+        Returns:
+            tuple: The label of every text ('en', 'es' or 'unknown' without evidence) and
+            the posterior probability of the label
+        """
+        scores = self.scores(texts)
+        labels = np.where(scores > 0, self.LANGUAGES[0], np.where(scores < 0, self.LANGUAGES[1], 'unknown'))
+        with np.errstate(over='ignore'):
+            confidence = 1 / (1 + np.exp(-np.abs(scores)))
+        return labels.astype(object), confidence
+
+    def is_english(self, texts):
+        """
+        Check which texts are in English.
+
+        Args:
+            texts (list or pd.Series): Texts to identify
+
+        Returns:
+            np.ndarray: True for the texts identified as English
+        """
+        return self.scores(texts) > 0
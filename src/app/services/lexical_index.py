@@ -0,0 +1,288 @@
+""" module to retrieve job offers lexically with a BM25 inverted index """
+#base
+import os
+import re
+import time
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+
+
+class LexicalIndex():
+    """
+    A BM25 inverted index over the job descriptions, stored on disk.
+
+    The index is a directory with a documents parquet file (job_id, length in
+    tokens, description_hash and active flag) and a postings directory of parquet
+    parts (term, job_id and term frequency) sorted by term, so only the row groups
+    of the query terms have to be read. The Preprocesor updates it incrementally:
+    the postings of new jobs are written as a new part and jobs no longer offered
+    are only flagged inactive, their postings being skipped until the parts are
+    merged once there are more than MAX_PARTS of them. A job re-indexed because it
+    came back or its description_hash changed has its previous postings merged
+    away first, so every job has a single set of postings.
+
+    Attributes:
+        path (str): Directory of the index
+        top_n (int): Number of jobs given a lexical score per query, 0 disables lexical scoring
+        weight (float): Weight of the normalized BM25 score fused with the dense score to rank the matches
+        doc_ids (np.ndarray): Ids of the loaded documents
+        postings (dict): Document positions and term frequencies indexed by term
+    """
+    K1 = 1.5
+    B = 0.75
+    DOCUMENTS = 'documents.parquet'
+    DOCUMENT_COLUMNS = ['job_id', 'length', 'description_hash', 'active']
+    POSTINGS = 'postings'
+    MAX_PARTS = 8
+
+    def __init__(self, path: str = None, top_n: int = None, weight: float = None):
+        """
+        Initialize the LexicalIndex with the path and retrieval settings.
+
+        Args:
+            path (str): Index directory, defaults to settings.LEXICAL_INDEX or a directory next to the job offers
+            top_n (int): Defaults to settings.MATCHES_LEXICAL_TOP_N
+            weight (float): Defaults to settings.MATCHES_LEXICAL_WEIGHT
+        """
+        self.path = path or settings.LEXICAL_INDEX or f'{os.path.splitext(settings.JOB_OFFERS)[0]}_lexical'
+        self.top_n = int(top_n if top_n is not None else settings.MATCHES_LEXICAL_TOP_N)
+        self.weight = float(weight if weight is not None else settings.MATCHES_LEXICAL_WEIGHT)
+        self.doc_ids = np.zeros(0, dtype=object)
+        self.doc_lengths = np.zeros(0, dtype=np.float32)
+        self.postings = {}
+
+    @property
+    def enabled(self):
+        """bool: True when lexical retrieval is configured."""
+        return self.top_n > 0
+
+    @staticmethod
+    def tokenize(text):
+        """
+        Split a text into lowercase word tokens.
+
+        Args:
+            text (str): The text to tokenize
+
+        Returns:
+            list: Tokens with at least two characters
+        """
+        if not isinstance(text, str):
+            return []
+        return [token for token in re.findall(r'\b\w+\b', text.lower()) if len(token) > 1]
+
+    def _read(self, name: str, filters=None):
+        """Read one of the index files, None if it does not exist yet."""
+        path = os.path.join(self.path, name)
+        if not os.path.exists(path):
+            return None
+        return pq.read_table(path, filters=filters).to_pandas()
+
+    def documents(self):
+        """
+        Read the documents file, with every job active when it predates the flag.
+
+        Returns:
+            pd.DataFrame: One row per job with postings in the parts, empty if there is no index yet
+        """
+        df_documents = self._read(self.DOCUMENTS)
+        if df_documents is None:
+            return pd.DataFrame(columns=self.DOCUMENT_COLUMNS)
+        if 'active' not in df_documents.columns:
+            df_documents['active'] = True
+        return df_documents.reindex(columns=self.DOCUMENT_COLUMNS)
+
+    def _write_documents(self, df_documents: pd.DataFrame):
+        """Replace the documents file."""
+        df_documents = df_documents.astype({'length': np.uint32, 'description_hash': object, 'active': bool})
+        os.makedirs(self.path, exist_ok=True)
+        path = os.path.join(self.path, self.DOCUMENTS)
+        pq.write_table(pa.Table.from_pandas(df_documents, preserve_index=False), f'{path}.tmp')
+        os.replace(f'{path}.tmp', path)
+
+    def parts(self):
+        """
+        List the postings parts of the index.
+
+        Returns:
+            list: Paths of the postings parts, oldest first
+        """
+        path = os.path.join(self.path, self.POSTINGS)
+        if not os.path.isdir(path):
+            return []
+        return [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.parquet')]
+
+    def _read_postings(self, filters=None):
+        """Read the postings of every part, None if there is no part yet."""
+        parts = self.parts()
+        if not parts:
+            return None
+        return pq.read_table(parts, filters=filters).to_pandas()
+
+    def _write_postings(self, df_postings: pd.DataFrame):
+        """Write postings as a new part sorted by term."""
+        df_postings = df_postings.astype({'tf': np.uint16}).sort_values(['term', 'job_id'], ignore_index=True)
+        path = os.path.join(self.path, self.POSTINGS, f'part-{time.time_ns()}.parquet')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        pq.write_table(
+            pa.Table.from_pandas(df_postings, preserve_index=False),
+            f'{path}.tmp',
+            use_dictionary=['term', 'job_id'],
+            row_group_size=65536
+        )
+        os.replace(f'{path}.tmp', path)
+        return path
+
+    def compact(self, job_ids=None):
+        """
+        Merge the postings parts into one, keeping only the postings of some jobs.
+
+        Args:
+            job_ids (iterable): Jobs to keep, defaults to the active jobs of the documents file
+
+        Returns:
+            int: The number of parts merged
+        """
+        parts = self.parts()
+        if not parts:
+            return 0
+        if job_ids is None:
+            df_documents = self.documents()
+            job_ids = df_documents.loc[df_documents['active'], 'job_id']
+        df_postings = self._read_postings()
+        df_postings = df_postings[df_postings['job_id'].isin(set(job_ids))]
+        if not df_postings.empty:
+            self._write_postings(df_postings)
+        for part in parts:
+            os.remove(part)
+        logger.info(f'Merged {len(parts)} lexical postings parts at {self.path}')
+        return len(parts)
+
+    def update(self, df_jobs: pd.DataFrame, texts=None):
+        """
+        Index the descriptions of new jobs and drop the jobs no longer offered.
+
+        Only the postings of the new jobs are written, as a new part, and the
+        removed jobs are flagged inactive. Jobs already holding postings, because
+        they were removed and came back or their description_hash changed, are
+        merged out of the parts before being indexed again.
+
+        Args:
+            df_jobs (pd.DataFrame): Current job offers with job_id, description and
+                optionally description_hash
+            texts (callable): Optional function returning the descriptions of a dataframe,
+                used to fetch the ones not held inline
+        """
+        try:
+            df_documents = self.documents().astype({'active': bool})
+            df_jobs = df_jobs.drop_duplicates(subset=['job_id'])
+            active = df_documents[df_documents['active']]
+            hashes = df_jobs['description_hash'] if 'description_hash' in df_jobs.columns else pd.Series(None, index=df_jobs.index, dtype=object)
+            stored_hashes = df_jobs['job_id'].map(dict(zip(active['job_id'], active['description_hash'])))
+            changed = df_jobs['job_id'].isin(active['job_id']) & hashes.notna() & hashes.ne(stored_hashes)
+            new = ~df_jobs['job_id'].isin(active['job_id']) | changed
+            df_new = df_jobs[new]
+            removed = set(active['job_id']) - set(df_jobs['job_id'])
+            if df_new.empty and not removed:
+                logger.info('Lexical index is up to date')
+                return
+            stale = set(df_new['job_id']) & set(df_documents['job_id'])
+            df_documents.loc[df_documents['job_id'].isin(removed), 'active'] = False
+            df_documents = df_documents[~df_documents['job_id'].isin(df_new['job_id'])]
+            if stale:
+                self.compact(df_documents.loc[df_documents['active'], 'job_id'])
+                df_documents = df_documents[df_documents['active']]
+            rows = []
+            lengths = []
+            descriptions = texts(df_new) if texts is not None else df_new['description']
+            for job_id, description in zip(df_new['job_id'], descriptions):
+                tokens = self.tokenize(description)
+                lengths.append(len(tokens))
+                rows.extend((term, job_id, tf) for term, tf in pd.Series(tokens, dtype=object).value_counts().items())
+            if rows:
+                self._write_postings(pd.DataFrame(rows, columns=['term', 'job_id', 'tf']))
+            df_documents = pd.concat([
+                frame for frame in [df_documents, pd.DataFrame({
+                    'job_id': df_new['job_id'].to_list(),
+                    'length': lengths,
+                    'description_hash': hashes[new].to_list(),
+                    'active': True
+                })] if not frame.empty
+            ] or [pd.DataFrame(columns=self.DOCUMENT_COLUMNS)], ignore_index=True)
+            if len(self.parts()) > self.MAX_PARTS:
+                self.compact(df_documents.loc[df_documents['active'], 'job_id'])
+                df_documents = df_documents[df_documents['active']]
+            self._write_documents(df_documents)
+            logger.info(f'Lexical index updated with {len(df_new)} new and {len(removed)} removed jobs at {self.path}')
+        except Exception as e:
+            logger.error(f'Error updating the lexical index: {e}')
+
+    def load(self, terms=None):
+        """
+        Load the documents and the postings of some terms into memory.
+
+        Args:
+            terms (iterable): Terms to load, all terms by default
+
+        Returns:
+            LexicalIndex: The loaded index
+        """
+        df_documents = self.documents()
+        df_documents = df_documents[df_documents['active'].astype(bool)]
+        if df_documents.empty:
+            logger.warning(f'No lexical index found at {self.path}')
+            self.doc_ids, self.doc_lengths, self.postings = np.zeros(0, dtype=object), np.zeros(0, dtype=np.float32), {}
+            return self
+        self.doc_ids = df_documents['job_id'].to_numpy(dtype=object)
+        self.doc_lengths = df_documents['length'].to_numpy(dtype=np.float32)
+        filters = [('term', 'in', sorted(set(terms)))] if terms is not None else None
+        df_postings = self._read_postings(filters) if terms is None or len(set(terms)) else None
+        self.postings = {}
+        if df_postings is not None and not df_postings.empty:
+            positions = pd.Series(np.arange(len(self.doc_ids)), index=self.doc_ids)
+            df_postings['position'] = df_postings['job_id'].map(positions)
+            df_postings = df_postings.dropna(subset=['position'])
+            for term, df_term in df_postings.groupby('term', sort=False):
+                self.postings[term] = (
+                    df_term['position'].to_numpy(dtype=np.int64),
+                    df_term['tf'].to_numpy(dtype=np.float32)
+                )
+        logger.info(f'Loaded lexical postings of {len(self.postings)} terms over {len(self.doc_ids)} jobs')
+        return self
+
+    def search(self, query: str, top_n: int = None):
+        """
+        Retrieve the jobs with the highest BM25 score for a query.
+
+        Args:
+            query (str): Free text query
+            top_n (int): Number of jobs to retrieve, defaults to self.top_n
+
+        Returns:
+            tuple: Job ids and BM25 scores sorted by descending score
+        """
+        top_n = self.top_n if top_n is None else top_n
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        if not len(self.doc_ids):
+            return self.doc_ids, scores
+        avgdl = max(float(self.doc_lengths.mean()), 1.0)
+        for term in set(self.tokenize(query)):
+            if term not in self.postings:
+                continue
+            positions, tf = self.postings[term]
+            idf = np.log(1 + (len(self.doc_ids) - len(positions) + 0.5) / (len(positions) + 0.5))
+            norm = tf + self.K1 * (1 - self.B + self.B * self.doc_lengths[positions] / avgdl)
+            scores[positions] += idf * tf * (self.K1 + 1) / norm
+        matched = np.flatnonzero(scores > 0)
+        if top_n and top_n < matched.size:
+            matched = matched[np.argpartition(-scores[matched], top_n - 1)[:top_n]]
+        matched = matched[np.argsort(-scores[matched], kind='stable')]
+        return self.doc_ids[matched], scores[matched]
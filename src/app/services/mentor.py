@@ -1,21 +1,42 @@
 """ module to generate the recomendations """
 #base
+import os
 import ast
+import json
+import heapq
+import hashlib
 import logging
 logger = logging.getLogger('Jobbot')
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
 # repo imports
 from src.app.utils import (
     save_json,
     open_json,
+    save_records,
+    open_records,
+    open_table,
+    isin_codes,
+    recent_filters,
+    location_filters,
     Retriever,
-    cosine_similarity_numpy,
-    is_english
+    cosine_similarity_matrix,
+    top_k_indices
 )
 retriever = Retriever()
 from src.app.settings import Settings
 settings = Settings()
+from src.app.services.quantizer import Quantizer
+from src.app.services.projector import Projector
+from src.app.services.similarity_store import SimilarityStore
+from src.app.services.scorer import Scorer
+from src.app.services.user_registry import UserRegistry
+from src.app.services.skill_index import SkillIndex
+from src.app.services.user_index import UserIndex
+from src.app.services.lexical_index import LexicalIndex
+from src.app.services.blob_store import BlobStore
+from src.app.services.language_identifier import LanguageIdentifier
 
 class Mentor():
     """
@@ -26,6 +47,8 @@ class Mentor():
     calculating similarity scores between job seekers and filtered job offers,
     and storing the resulting matches.
     """
+    FILTER_COLUMNS = ['seniority', 'location', 'work_modality_english', 'remote']
+
     def __init__(self):
         """
         Initialize the Mentor with paths from settings and filter parameters.
@@ -33,8 +56,56 @@ class Mentor():
         self.job_offers = settings.JOB_OFFERS
         self.job_seekers = settings.JOB_SEEKERS
         self.matches = settings.MATCHES
+        self.matches_state = settings.MATCHES_STATE or f'{os.path.splitext(settings.MATCHES)[0]}_state.json'
+        self.incremental = settings.MATCHING_MODE.lower() == 'incremental'
+        self.top_k = int(settings.MATCHES_TOP_K)
+        self.threshold_fallback = settings.MATCHES_THRESHOLD_FALLBACK.lower() == 'true'
         self.filter_params = ast.literal_eval(settings.FILTER_PARAMS)
+        self.quantizer = Quantizer()
+        self.projector = Projector()
+        self.similarity_store = SimilarityStore()
+        self.scorer = Scorer()
+        self.user_registry = UserRegistry(self.job_seekers)
+        self.skill_index = SkillIndex()
+        self.lexical_index = LexicalIndex()
+        self.blob_store = BlobStore()
+        self.language_identifier = LanguageIdentifier()
+        self.user_index = None
+        self.user_index_key = None
+        
+    def users(self):
+        """
+        Get the validated job seekers, parsing the job seekers file only when it changed.
+        
+        Returns:
+            UserRegistry: The job seekers indexed by user_id
+        """
+        return self.user_registry.load(self.job_seekers)
+
+    def offers(self, records: bool = False, locations=None, job_ids=None):
+        """
+        Get the job offers, with the low-cardinality columns dictionary encoded.
         
+        Only the partitions of the publication window and of the given locations
+        are read when the job offers are partitioned.
+        
+        Parameters:
+            records (bool): Return a list of dictionaries with None for missing values
+            locations (iterable): Locations a user's criteria can match, None reads every location
+            job_ids (iterable): Optional jobs to keep, all jobs by default
+            
+        Returns:
+            pd.DataFrame or list: The job offers
+        """
+        df_offers = open_table(self.job_offers, recent_filters() + location_filters(locations))
+        if df_offers is None:
+            df_offers = pd.DataFrame()
+        if job_ids is not None and not df_offers.empty:
+            df_offers = df_offers[df_offers['job_id'].isin(job_ids)]
+        if records:
+            return df_offers.astype(object).where(df_offers.notna(), None).to_dict(orient='records')
+        return df_offers
+
     def knowledge_based_filter(self, user_id):
         """
         Filter job offers based on a user's preferences and criteria.
@@ -47,14 +118,13 @@ class Mentor():
         """
         try:
             # user customization
-            list_users = open_json(self.job_seekers)
-            user = [user for user in list_users if user['user_id']==user_id]
-            seniority_criteria = user[0]['seniority']
-            location_criteria = user[0]['location']
-            work_modality_criteria = user[0]['work_modality_english']
-            remote_criteria = [ast.literal_eval(val) for val in user[0]['remote']]
+            user = self.users()[user_id]
+            seniority_criteria = list(user.seniority)
+            location_criteria = list(user.location)
+            work_modality_criteria = list(user.work_modality_english)
+            remote_criteria = list(user.remote)
             excluded_companies = self.filter_params
-            english = ast.literal_eval(user[0]['english'])
+            english = user.english
             
             logger.info(f'Filtering job offers for the user: {user_id}')
             logger.debug(f'Knowledge filter to apply for seniority_criteria: {seniority_criteria}')
@@ -64,20 +134,19 @@ class Mentor():
             logger.debug(f'Knowledge filter to apply for excluded_companies: {excluded_companies}')
             logger.debug(f'Knowledge filter to apply for english: {english}')
             
-            # offers
-            list_jobs = open_json(self.job_offers)
-            df_jobs = pd.DataFrame(list_jobs)
+            # offers, compared on their integer category codes
+            df_jobs = self.offers(locations=location_criteria)
             df_filtered = df_jobs[
-                (df_jobs["seniority"].isin(seniority_criteria)) &  # Filter by seniority
-                (df_jobs["location"].isin(location_criteria)) &    # Filter by location
-                (df_jobs["work_modality_english"].isin(work_modality_criteria)) &  # Filter by work modality
-                (df_jobs["remote"].isin(remote_criteria)) &  # Filter by remote_criteria
-                (~df_jobs["company"].isin(excluded_companies))   # Exclude specified companies
+                isin_codes(df_jobs["seniority"], seniority_criteria) &  # Filter by seniority
+                isin_codes(df_jobs["location"], location_criteria) &    # Filter by location
+                isin_codes(df_jobs["work_modality_english"], work_modality_criteria) &  # Filter by work modality
+                isin_codes(df_jobs["remote"], remote_criteria) &  # Filter by remote_criteria
+                ~isin_codes(df_jobs["company"], excluded_companies)   # Exclude specified companies
             ].copy()
             
             if not english:
                 logger.info(f'Filtering only Spanish jobs: {df_filtered.shape}')
-                df_filtered['english'] = df_filtered['description'].apply(lambda x: is_english(x))
+                df_filtered['english'] = self.language_identifier.is_english(self.blob_store.texts(df_filtered))
                 df_filtered = df_filtered[~df_filtered['english']]
                 
             logger.info(f'Current available jobs after filtering: {df_filtered.shape}')
@@ -85,67 +154,636 @@ class Mentor():
         except Exception as e:
             logger.error(f"Error in knowledge-based filtering for user {user_id}: {str(e)}")
 
-    def recommend(self):
+    def threshold(self, similarity_threshold):
+        """
+        Get the minimum score applied to a user's matches.
+        
+        When a per-user top-k is configured the threshold is only applied if
+        settings.MATCHES_THRESHOLD_FALLBACK is enabled.
+        
+        Parameters:
+            similarity_threshold (str or float): The user's similarity threshold
+            
+        Returns:
+            float or None: The threshold to apply, None to keep the k best jobs regardless of score
+        """
+        if self.top_k and not self.threshold_fallback:
+            return None
+        return float(similarity_threshold)
+
+    def limit_matches(self, dict_matches: list):
+        """
+        Keep only the top-k matches of every user.
+        
+        Parameters:
+            dict_matches (list): Matches of one or several users
+            
+        Returns:
+            list: The best matches of every user
+        """
+        if not self.top_k:
+            return dict_matches
+        matches_by_user = {}
+        for match in dict_matches:
+            matches_by_user.setdefault(match['match_id'].split('|')[0], []).append(match)
+        return [
+            match
+            for user_matches in matches_by_user.values()
+            for match in heapq.nlargest(self.top_k, user_matches, key=lambda match: match['score'])
+        ]
+
+    def use_projection(self, df_jobs=None):
+        """
+        Check whether scoring runs on projected embeddings.
+        
+        Parameters:
+            df_jobs (pd.DataFrame): Optional job embeddings that must carry the projected columns
+            
+        Returns:
+            bool: True when the last job snapshot carries a fitted projection, which is then loaded
+        """
+        projected_columns = self.projector.columns(['avg_skill_embeds', 'role_embeds'])
+        return bool(
+            self.projector.enabled
+            and (df_jobs is None or all(col in df_jobs.columns for col in projected_columns))
+            and self.projector.load(
+                f'{retriever.embedding_path}{retriever.get_last_run("jobs.parquet")}/{self.projector.FILE_NAME}'
+            )
+        )
+
+    def job_matrices(self, df_jobs, projected: bool = False):
+        """
+        Build the job skill and role matrices, kept in their stored precision.
+        
+        Parameters:
+            df_jobs (pd.DataFrame): Job embeddings
+            projected (bool): Use the projected job columns
+            
+        Returns:
+            tuple: Job skill and job role matrices
+        """
+        columns = ['avg_skill_embeds', 'role_embeds']
+        if projected:
+            columns = self.projector.columns(columns)
+        return tuple(self.quantizer.stack(df_jobs, col) for col in columns)
+
+    def user_matrices(self, df_users, projected: bool = False):
+        """
+        Build the user skill and role matrices, projected at scoring time if needed.
+        
+        Parameters:
+            df_users (pd.DataFrame): User embeddings
+            projected (bool): Project the user vectors with the loaded projection
+            
+        Returns:
+            tuple: User skill and user role matrices
+        """
+        if projected:
+            return tuple(
+                self.projector.transform(self.quantizer.to_matrix(df_users, col))
+                for col in ['avg_skill_embeds', 'avg_role_embeds']
+            )
+        return tuple(self.quantizer.stack(df_users, col) for col in ['avg_skill_embeds', 'avg_role_embeds'])
+
+    def embedding_matrices(self, df_users, df_jobs):
+        """
+        Build the job and user matrices used for scoring.
+        
+        Job matrices are kept in their stored precision. When the last job snapshot
+        carries a fitted projection, the projected job columns are used and the user
+        vectors are projected at scoring time.
+        
+        Parameters:
+            df_users (pd.DataFrame): User embeddings
+            df_jobs (pd.DataFrame): Job embeddings
+            
+        Returns:
+            tuple: Job skill, job role, user skill and user role matrices
+        """
+        projected = not df_users.empty and self.use_projection(df_jobs)
+        if projected:
+            logger.info(f'Scoring on {self.projector.dim} dimensional projected embeddings')
+        return self.job_matrices(df_jobs, projected) + self.user_matrices(df_users, projected)
+
+    def embedding_versions(self, df, id_column, columns, profiles, projection: str = ''):
+        """
+        Compute a version for every embedded entity.
+        
+        The version changes whenever the stored embeddings, the projection applied
+        at scoring time or any of the profile fields that take part in the matching
+        change.
+        
+        Parameters:
+            df (pd.DataFrame): Embeddings of users or jobs
+            id_column (str): Name of the id column
+            columns (list): Names of the embedding columns
+            profiles (dict): Matching fields indexed by id
+            projection (str): Fingerprint of the projection used for scoring, empty without projection
+            
+        Returns:
+            dict: Version hash indexed by id
+        """
+        matrices = [self.quantizer.stack(df, col) for col in columns]
+        versions = {}
+        for position, entity_id in enumerate(df[id_column].to_list()):
+            digest = hashlib.blake2b(digest_size=8)
+            digest.update(projection.encode())
+            for matrix in matrices:
+                digest.update(matrix[position].tobytes())
+            digest.update(json.dumps(profiles.get(entity_id), sort_keys=True, default=str).encode())
+            versions[entity_id] = digest.hexdigest()
+        return versions
+
+    def matching_state(self):
+        """
+        Compute the current versions of the embedded users and of the available jobs.
+        
+        The blending preferences (role_weight and similarity_threshold) are kept apart
+        from the user versions, so changing them only requires a re-blend of the
+        cached similarity components. Both versions include the fingerprint of the
+        projection used for scoring, when there is one.
+        
+        Returns:
+            dict: User and job versions and user preferences, only jobs still present
+            in the job offers of the users' locations are kept
+        """
+        job_fields = ['seniority', 'location', 'work_modality_english', 'remote', 'company']
+        registry = self.users()
+        locations = registry.locations()
+        users = {user.user_id: user.profile() for user in registry}
+        jobs = {
+            job['job_id']: [job.get(field) for field in job_fields] + [
+                job.get('description_hash') or self.blob_store.key(job.get('description'))
+            ]
+            for job in self.offers(records=True, locations=locations)
+        }
+        df_users = retriever.get_last_embed('users')
+        df_jobs = retriever.get_last_embed('jobs', locations)
+        df_users = df_users[df_users['user_id'].isin(list(users))] if 'user_id' in df_users.columns else df_users
+        df_jobs = df_jobs[df_jobs['job_id'].isin(list(jobs))] if 'job_id' in df_jobs.columns else df_jobs
+        # scores cached on a projection are stale once the projection is refitted
+        projection = self.projector.fingerprint() if not df_users.empty and self.use_projection(df_jobs) else ''
+        user_versions = self.embedding_versions(df_users, 'user_id', ['avg_skill_embeds', 'avg_role_embeds'], users, projection) if not df_users.empty else {}
+        return {
+            'users': user_versions,
+            'preferences': {
+                user_id: [registry[user_id].role_weight, registry[user_id].similarity_threshold]
+                for user_id in user_versions
+            },
+            'jobs': self.embedding_versions(df_jobs, 'job_id', ['avg_skill_embeds', 'role_embeds'], jobs, projection) if not df_jobs.empty else {}
+        }
+
+    def filter_index(self, df_jobs, english: bool = True, locations=None):
+        """
+        Encode the knowledge filter columns of the embedded jobs once per run.
+        
+        Every filter column is stored as integer codes aligned with the rows of
+        df_jobs, so the per-user knowledge filter becomes a set of np.isin checks
+        instead of a scan over the job offers. When skill candidate generation is
+        enabled the skill index is rebuilt over the same rows.
+        
+        Parameters:
+            df_jobs (pd.DataFrame): Job embeddings
+            english (bool): Whether every user accepts English jobs, the language
+                of the descriptions is only detected otherwise
+            locations (iterable): Locations the users can match, None reads every location
+            
+        Returns:
+            tuple: The job filter arrays (codes, valid, english) and the code of every
+            value of each filter column
+        """
+        df_offers = self.offers(locations=locations)
+        if df_offers.empty:
+            df_offers = pd.DataFrame(columns=['job_id', 'company', 'description', 'skills'] + self.FILTER_COLUMNS)
+        available = df_jobs['job_id'].isin(df_offers['job_id']).to_numpy()
+        df_offers = df_offers.drop_duplicates(subset=['job_id']).set_index('job_id').reindex(df_jobs['job_id'])
+        valid = available & ~isin_codes(df_offers['company'], self.filter_params)
+        codes = np.empty((len(df_jobs), len(self.FILTER_COLUMNS)), dtype=np.int32)
+        categories = []
+        for column, name in enumerate(self.FILTER_COLUMNS):
+            values = pd.Categorical(df_offers[name])
+            codes[:, column] = values.codes
+            categories.append({value: code for code, value in enumerate(values.categories)})
+        english_jobs = np.zeros(len(df_jobs), dtype=bool)
+        if not english:
+            english_jobs[valid] = self.language_identifier.is_english(self.blob_store.texts(df_offers[valid]))
+        if self.skill_index.enabled:
+            self.skill_index.build(df_offers['skills'].to_list() if 'skills' in df_offers.columns else [[]] * len(df_jobs))
+        return {'codes': codes, 'valid': valid, 'english': english_jobs}, categories
+
+    def candidates(self, user, job_positions: dict):
+        """
+        Get the candidate jobs of a user from the skill index and their lexical scores.
+        
+        The lexical scores are the BM25 scores of the top-N jobs for the user's job
+        titles and skills, normalized by the best one. They are fused with the dense
+        score of the jobs clearing the user's threshold, the others contributing no
+        lexical score, to rank them for the top-k without restricting the jobs or
+        changing their dense score.
+        
+        Parameters:
+            user (UserRecord): The user
+            job_positions (dict): Position of every job in the job matrices
+            
+        Returns:
+            tuple: Sorted candidate positions, None when every job has to be scored,
+            and the sorted positions with their lexical scores, None when no lexical
+            score applies
+        """
+        candidates = self.skill_index.candidates(user.skills) if self.skill_index.enabled else None
+        if not self.lexical_index.enabled or not user.query().strip():
+            return candidates, None
+        job_ids, scores = self.lexical_index.search(user.query())
+        found = [position for position, job_id in enumerate(job_ids) if job_id in job_positions]
+        positions = np.array([job_positions[job_ids[position]] for position in found], dtype=np.int64)
+        scores = scores[found].astype(np.float64)
+        order = np.argsort(positions)
+        positions, scores = positions[order], scores[order]
+        if scores.size and scores.max() > 0:
+            scores = scores / scores.max()
+        return candidates, (positions, scores)
+
+    def user_tasks(self, df_users, registry, user_skill_embeds, user_role_embeds, categories, job_ids=()):
+        """
+        Build the scoring task of every embedded user.
+        
+        Parameters:
+            df_users (pd.DataFrame): User embeddings
+            registry (UserRegistry): Job seekers profiles
+            user_skill_embeds (np.ndarray): User skill matrix
+            user_role_embeds (np.ndarray): User role matrix
+            categories (list): Code of every value of each filter column
+            job_ids (list): Ids of the jobs in the order of the job matrices
+            
+        Returns:
+            list: Scoring tasks in the order of df_users
+        """
+        job_positions = {job_id: position for position, job_id in enumerate(job_ids)}
+        if self.lexical_index.enabled:
+            self.lexical_index.load({
+                term
+                for user_id in df_users['user_id']
+                for term in self.lexical_index.tokenize(registry[user_id].query())
+            })
+        tasks = []
+        for position, user_id in enumerate(df_users['user_id'].to_list()):
+            user = registry[user_id]
+            criteria = user.criteria()
+            tasks.append({
+                'user_id': user_id,
+                'skill': user_skill_embeds[position],
+                'role': user_role_embeds[position],
+                'criteria': [
+                    np.array([codes[value] for value in criteria[name] if value in codes], dtype=np.int32)
+                    for name, codes in zip(self.FILTER_COLUMNS, categories)
+                ],
+                'english': user.english,
+                'role_weight': user.role_weight,
+                'threshold': self.threshold(user.similarity_threshold),
+                'top_k': self.top_k,
+                'candidates': None,
+                'lexical': None,
+                'lexical_weight': self.lexical_index.weight
+            })
+            tasks[-1]['candidates'], tasks[-1]['lexical'] = self.candidates(user, job_positions)
+        return tasks
+
+    def recommend(self, user_ids: list = None, job_ids: list = None):
         """
         Generate job recommendations for all users based on embedding similarity
         and knowledge-based filtering.
         
+        Parameters:
+            user_ids (list): Optional subset of users to score, all users by default
+            job_ids (list): Optional subset of jobs to score, all jobs by default
+        
+        Returns:
+            list: A list of dictionaries containing match information
+        """
+        return [match for batch in self.recommend_batches(user_ids, job_ids) for match in batch]
+
+    def recommend_batches(self, user_ids: list = None, job_ids: list = None):
+        """
+        Generate the job recommendations one user at a time.
+        
+        Users are scored by the Scorer, in a process pool sharing the job matrices
+        when settings.MENTOR_WORKERS is greater than one. The similarity components
+        of every user are written to the similarity store as they are scored, when
+        a run is writing it. Errors are raised so a partial run is never stored.
+        
+        Parameters:
+            user_ids (list): Optional subset of users to score, all users by default
+            job_ids (list): Optional subset of jobs to score, all jobs by default
+        
+        Yields:
+            list: The match dictionaries of one user
+        """
+        registry = self.users()
+        df_users = retriever.get_last_embed('users')
+        if user_ids is not None:
+            df_users = df_users[df_users['user_id'].isin(user_ids)].reset_index(drop=True)
+        df_users = df_users[df_users['user_id'].isin(list(registry.users))].reset_index(drop=True)
+        # only the jobs of the locations these users accept can match
+        locations = registry.locations(df_users['user_id'])
+        df_jobs = retriever.get_last_embed('jobs', locations).reset_index(drop=True)
+        if job_ids is not None:
+            df_jobs = df_jobs[df_jobs['job_id'].isin(job_ids)].reset_index(drop=True)
+        (
+            job_skill_embeds,
+            job_role_embeds,
+            user_skill_embeds,
+            user_role_embeds
+        ) = self.embedding_matrices(df_users, df_jobs)
+        english = all(registry[user_id].english for user_id in df_users['user_id'])
+        jobs, categories = self.filter_index(df_jobs, english, locations)
+        jobs['skill'] = job_skill_embeds
+        jobs['role'] = job_role_embeds
+        tasks = self.user_tasks(df_users, registry, user_skill_embeds, user_role_embeds, categories, df_jobs['job_id'].to_list())
+        job_id_array = df_jobs['job_id'].to_numpy()
+        match_date = datetime.today().strftime("%Y-%m-%d")
+        job_scope = set(job_ids) if job_ids is not None else None
+        
+        for result in self.scorer.score(tasks, jobs):
+            user_id = result['user_id']
+            if not result['positions'].size:
+                logger.info(f'There are no matches for knowledge filter for the user {user_id}')
+                continue
+            job_ids_user = job_id_array[result['positions']]
+            self.similarity_store.append(pd.DataFrame({
+                'user_id': user_id,
+                'job_id': job_ids_user,
+                'role_similarity': result['role_similarity'],
+                'skills_similarity': result['skills_similarity']
+            }), job_scope)
+            logger.info(f'{"#"*10} User scores: {user_id} on {result["positions"].size} filtered jobs, {result["selected"].size} matches')
+            selected = result['selected']
+            yield [
+                {'match_id': f'{user_id}|{job_id}', 'match_date': match_date, 'score': float(score)}
+                for job_id, score in zip(job_ids_user[selected], result['score'][selected])
+            ]
+    
+    def candidate_recall(self, user_ids: list = None):
+        """
+        Measure how many matches of a full scoring pass survive skill candidate generation.
+        
+        Parameters:
+            user_ids (list): Optional subset of users to evaluate, all users by default
+            
+        Returns:
+            dict: Overall recall, number of matches of each pass and recall per user
+        """
+        skill_index = self.skill_index
+        session = self.similarity_store.session
+        try:
+            self.similarity_store.session = None
+            self.skill_index = SkillIndex(0, 0)
+            full = self.recommend(user_ids=user_ids)
+            self.skill_index = skill_index
+            restricted = {match['match_id'] for match in self.recommend(user_ids=user_ids)}
+        finally:
+            self.skill_index = skill_index
+            self.similarity_store.session = session
+        per_user = {}
+        for match in full:
+            hits = per_user.setdefault(match['match_id'].split('|')[0], [0, 0])
+            hits[0] += match['match_id'] in restricted
+            hits[1] += 1
+        report = {
+            'min_shared': skill_index.min_shared,
+            'min_jaccard': skill_index.min_jaccard,
+            'full_matches': len(full),
+            'candidate_matches': len(restricted),
+            'recall': sum(hits for hits, _ in per_user.values()) / len(full) if full else 1.0,
+            'per_user': {user_id: hits / total for user_id, (hits, total) in per_user.items()}
+        }
+        logger.info(f"Skill candidate recall: {report['recall']:.4f} over {len(full)} matches")
+        return report
+
+    def rerank_matches(self, user_ids: list, state: dict, excluded_job_ids: set = None):
+        """
+        Re-blend the cached similarity components of some users with their current preferences.
+        
+        Parameters:
+            user_ids (list): Users to re-rank
+            state (dict): Current versions and preferences from matching_state()
+            excluded_job_ids (set): Jobs that are scored elsewhere and must be skipped
+            
         Returns:
             list: A list of dictionaries containing match information
         """
+        df_components = self.similarity_store.valid(self.similarity_store.load(user_ids), state)
+        if excluded_job_ids:
+            df_components = df_components[~df_components['job_id'].isin(excluded_job_ids)]
+        dict_matches = []
+        for user_id, df_user in df_components.groupby('user_id', sort=False):
+            role_weight, threshold = state['preferences'][user_id]
+            df_matches = self.similarity_store.blend(df_user, role_weight, self.threshold(threshold), self.top_k)
+            df_matches['match_id'] = user_id+'|'+df_matches['job_id']
+            df_matches['match_date'] = datetime.today().strftime("%Y-%m-%d")
+            dict_matches.extend(df_matches[['match_id','match_date','score']].to_dict(orient='records'))
+        logger.info(f'Re-ranked {len(dict_matches)} matches from cached similarities for {len(user_ids)} users')
+        return dict_matches
+
+    def recommend_incremental(self, state: dict):
+        """
+        Score only what changed since the last matches snapshot and merge it into
+        the persisted matches.
+        
+        New or changed users are scored against all jobs, unchanged users only
+        against new or changed jobs. Unchanged users whose preferences changed are
+        re-ranked from the cached similarity components. Matches of expired jobs
+        and removed users are dropped.
+        
+        Parameters:
+            state (dict): Current versions and preferences from matching_state()
+            
+        Returns:
+            list: A list of dictionaries containing the merged match information
+        """
+        last_state = open_json(self.matches_state) or {'users': {}, 'jobs': {}}
+        last_preferences = last_state.get('preferences', {})
+        new_users = [user_id for user_id, version in state['users'].items() if last_state['users'].get(user_id) != version]
+        old_users = [user_id for user_id, version in state['users'].items() if last_state['users'].get(user_id) == version]
+        new_jobs = [job_id for job_id, version in state['jobs'].items() if last_state['jobs'].get(job_id) != version]
+        reranked_users = [user_id for user_id in old_users if last_preferences.get(user_id) != state['preferences'][user_id]]
+        if reranked_users and not os.path.exists(self.similarity_store.path):
+            logger.info('No cached similarities available, rescoring users with new preferences')
+            reranked = set(reranked_users)
+            new_users, old_users = new_users + reranked_users, [user_id for user_id in old_users if user_id not in reranked]
+            reranked_users = []
+        logger.info(f'Incremental matching for {len(new_users)} new users, {len(reranked_users)} re-ranked users and {len(new_jobs)} new jobs')
+        
+        dict_matches = []
+        if new_users:
+            dict_matches.extend(self.recommend(user_ids=new_users))
+        if old_users and new_jobs:
+            dict_matches.extend(self.recommend(user_ids=old_users, job_ids=new_jobs))
+        if reranked_users:
+            dict_matches.extend(self.rerank_matches(reranked_users, state, set(new_jobs)))
+        
+        old_users = set(old_users) - set(reranked_users)
+        new_jobs = set(new_jobs)
+        kept_matches = [
+            match for match in (open_records(self.matches) or [])
+            if match['match_id'].split('|')[0] in old_users
+            and match['match_id'].split('|')[1] in state['jobs']
+            and match['match_id'].split('|')[1] not in new_jobs
+        ]
+        logger.info(f'Keeping {len(kept_matches)} previous matches')
+        return self.limit_matches(kept_matches + dict_matches)
+
+    def rerank(self, user_ids: list):
+        """
+        Refresh the matches of some users after a change of their role_weight or
+        similarity_threshold, without rescoring their embeddings.
+        
+        Users whose embeddings or filters changed as well are rescored.
+        
+        Parameters:
+            user_ids (list): Users whose preferences changed
+        """
         try:
+            state = self.matching_state()
+            last_state = open_json(self.matches_state) or {'users': {}, 'jobs': {}}
+            user_ids = [user_id for user_id in user_ids if user_id in state['users']]
+            rescored_users = [
+                user_id for user_id in user_ids
+                if last_state['users'].get(user_id) != state['users'][user_id]
+                or not os.path.exists(self.similarity_store.path)
+            ]
+            rescored = set(rescored_users)
+            reranked_users = [user_id for user_id in user_ids if user_id not in rescored]
+            self.similarity_store.begin(state)
+            dict_matches = self.rerank_matches(reranked_users, state) if reranked_users else []
+            if rescored_users:
+                dict_matches.extend(self.recommend(user_ids=rescored_users))
+            
+            user_ids = set(user_ids)
+            kept_matches = [
+                match for match in (open_records(self.matches) or [])
+                if match['match_id'].split('|')[0] not in user_ids
+            ]
+            if save_records(self.matches, [kept_matches, dict_matches]) is None:
+                raise IOError(f"Could not store the matches at {self.matches}")
+            last_state['preferences'] = {
+                **last_state.get('preferences', {}),
+                **{user_id: state['preferences'][user_id] for user_id in user_ids}
+            }
+            last_state['users'] = {
+                **last_state['users'],
+                **{user_id: state['users'][user_id] for user_id in rescored_users}
+            }
+            self.similarity_store.commit()
+            save_json(self.matches_state, last_state)
+            logger.info(f"Successfully re-ranked matches for {len(user_ids)} users")
+        except Exception as e:
+            logger.error(f"Error in Mentor.rerank(): {str(e)}")
+        finally:
+            self.similarity_store.abort()
+
+    def reverse_index(self):
+        """
+        Get the reverse index over the embedded users, rebuilt only when the job
+        seekers or the user embeddings changed.
+        
+        Returns:
+            UserIndex: The users indexed by accepted filter values
+        """
+        registry = self.users()
+        key = (registry.signature(), retriever.get_last_run("users.parquet"), retriever.get_last_run("jobs.parquet"))
+        if self.user_index is None or key != self.user_index_key:
             df_users = retriever.get_last_embed('users')
-            df_jobs = retriever.get_last_embed('jobs')
-            list_users = open_json(self.job_seekers)
+            df_users = df_users[df_users['user_id'].isin(list(registry.users))].reset_index(drop=True)
+            user_skill_embeds, user_role_embeds = self.user_matrices(df_users, self.use_projection())
+            user_ids = df_users['user_id'].to_list()
+            self.user_index = UserIndex(user_ids, user_skill_embeds, user_role_embeds, [registry[user_id] for user_id in user_ids])
+            if self.threshold(0) is None:
+                self.user_index.threshold[:] = -np.inf
+            self.user_index_key = key
+        return self.user_index
+
+    def push(self, job_ids: list):
+        """
+        Match freshly embedded jobs against the users as soon as they are scraped.
+        
+        Each new job is looked up in the reverse user index, so the cost grows with
+        the number of new jobs instead of users x jobs. The new matches replace any
+        previous match of those jobs in the persisted matches.
+        
+        Parameters:
+            job_ids (list): Ids of the new jobs, e.g. the ones returned by Embeder.jobs()
+            
+        Returns:
+            list: The new matches, to notify the users
+        """
+        try:
+            job_ids = list(job_ids or [])
+            if not job_ids:
+                return []
+            index = self.reverse_index()
+            locations = self.users().locations()
+            df_jobs = retriever.get_last_embed('jobs', locations)
+            df_jobs = df_jobs[df_jobs['job_id'].isin(job_ids)].reset_index(drop=True)
+            offers = {
+                job['job_id']: job
+                for job in self.offers(records=True, locations=locations, job_ids=df_jobs['job_id'])
+            }
+            job_skill_embeds, job_role_embeds = self.job_matrices(df_jobs, self.use_projection())
+            match_date = datetime.today().strftime("%Y-%m-%d")
+            english_offers = {}
+            if offers and not index.english.all():
+                df_offers = pd.DataFrame(list(offers.values()))
+                english_offers = dict(zip(df_offers['job_id'], self.language_identifier.is_english(self.blob_store.texts(df_offers))))
             dict_matches = []
+            for position, job_id in enumerate(df_jobs['job_id'].to_list()):
+                job = offers.get(job_id)
+                if job is None or job.get('company') in self.filter_params:
+                    continue
+                english = bool(english_offers.get(job_id, False))
+                user_ids, _, _, scores = index.match(job, job_skill_embeds[position], job_role_embeds[position], english)
+                dict_matches.extend(
+                    {'match_id': f'{user_id}|{job_id}', 'match_date': match_date, 'score': float(score)}
+                    for user_id, score in zip(user_ids, scores)
+                )
             
-            for _, row in df_users.iterrows():
-                user = [user for user in list_users if user['user_id']==row['user_id']]
-                knowledge_filtered_job_id = self.knowledge_based_filter(row['user_id'])
-                filtered_jobs = df_jobs[df_jobs['job_id'].isin(knowledge_filtered_job_id)].copy()
-                
-                if filtered_jobs.shape[0] > 0:
-                    list_dict_jobs = filtered_jobs.to_dict(orient='records')
-                    list_dict_jobs_scored = [
-                        {
-                            **job,
-                            'skills_similarity': cosine_similarity_numpy(
-                                job['avg_skill_embeds'],
-                                row['avg_skill_embeds']
-                            ),
-                            'role_similarity': cosine_similarity_numpy(
-                                job['role_embeds'],
-                                row['avg_role_embeds']
-                            )
-                        }
-                        for job in list_dict_jobs
-                    ]
-                    
-                    df_matches = pd.DataFrame(list_dict_jobs_scored)
-                    df_matches['score'] = df_matches['role_similarity']*float(user[0]['role_weight'])+df_matches['skills_similarity']*(1-float(user[0]['role_weight']))
-                    logger.info(f'{"#"*10} User scores: {row["user_id"]}\n {df_matches.score.value_counts()}')
-                    
-                    df_matches = df_matches[df_matches['score']>=float(user[0]['similarity_threshold'])].copy()
-                    df_matches['match_id'] = row['user_id']+'|'+df_matches['job_id']
-                    df_matches['match_date'] = datetime.today().strftime("%Y-%m-%d")
-                    df_matches = df_matches[['match_id','match_date','score']].copy()
-                    
-                    tmp_dict_matches = df_matches.to_dict(orient='records')
-                    dict_matches = dict_matches + tmp_dict_matches
-                else:
-                    logger.info(f'There are no matches for knowledge filter for the user {row["user_id"]}')
-                    
+            job_ids = set(job_ids)
+            kept_matches = [
+                match for match in (open_records(self.matches) or [])
+                if match['match_id'].split('|')[1] not in job_ids
+            ]
+            save_records(self.matches, [self.limit_matches(kept_matches + dict_matches)])
+            logger.info(f"Pushed {len(dict_matches)} matches for {len(df_jobs)} new jobs to {len({match['match_id'].split('|')[0] for match in dict_matches})} users")
             return dict_matches
         except Exception as e:
-            logger.error(f"Error generating recommendations: {str(e)}")
-    
-    def run(self):
+            logger.error(f"Error in Mentor.push(): {str(e)}")
+            return []
+
+    def run(self, incremental: bool = None):
         """
         Execute the recommendation process and save the results.
+        
+        A full run streams the matches of every user to settings.MATCHES as soon as
+        they are scored, one JSON record per line when the file ends in .ndjson, and
+        their similarity components to the similarity store. Neither file nor the
+        matching state is replaced when scoring fails.
+        
+        Parameters:
+            incremental (bool): Score only new users and new jobs, defaults to settings.MATCHING_MODE
         """
         try:
-            dict_matches = self.recommend()
-            save_json(self.matches, dict_matches)
-            logger.info(f"Successfully saved {len(dict_matches)} matches")
+            incremental = self.incremental if incremental is None else incremental
+            state = self.matching_state()
+            self.similarity_store.begin(state)
+            if incremental:
+                count = save_records(self.matches, [self.recommend_incremental(state)])
+            else:
+                count = save_records(self.matches, self.recommend_batches())
+            if count is None:
+                raise IOError(f"Could not store the matches at {self.matches}")
+            self.similarity_store.commit()
+            save_json(self.matches_state, state)
+            logger.info(f"Successfully saved {count} matches")
         except Exception as e:
             logger.error(f"Error in Mentor.run(): {str(e)}")
+        finally:
+            self.similarity_store.abort()
@@ -1,18 +1,82 @@
 """ module to make the preprocesses of the data """
 #base
+import os
 import ast
+import time
 import uuid
-import shortuuid
 import pandas as pd
 import logging
 logger = logging.getLogger('Jobbot')
+from concurrent.futures import ProcessPoolExecutor
 # repo imports
 from src.app.settings import Settings
 settings = Settings()
 from src.app.utils import (
     open_json,
-    save_json
+    save_json,
+    open_table,
+    save_table,
+    append_partitions,
+    is_partitioned,
+    PARTITION_COLUMNS,
+    recent_filters,
+    recent_cutoff,
+    table_to_frame
 )
+from src.app.services.lexical_index import LexicalIndex
+from src.app.services.deduplicator import Deduplicator
+from src.app.services.blob_store import BlobStore
+from src.app.services.job_ids import JobIds
+from src.app.services.compactor import Compactor
+from src.app.services.raw_job import RawJob
+from src.app.services import arrow_etl
+
+# augmentation parameters set by every worker process
+_augment_params = {}
+
+
+def augment_chunk(df_raw: pd.DataFrame, gral_skills: list):
+    """
+    Add the row level features to a chunk of raw jobs.
+
+    Args:
+        df_raw (pd.DataFrame): Raw scraped jobs with description and vacancy_name
+        gral_skills (list): Skills searched in the descriptions
+
+    Returns:
+        pd.DataFrame: The chunk with description_hash, remote and skills columns
+    """
+    df_raw = df_raw.copy()
+    df_raw['description_hash'] = df_raw['description'].apply(BlobStore.key)
+    df_raw['remote'] = (
+        df_raw['description'].str.contains(
+            'remote',
+            case=False,
+            na=False
+        ) |
+        df_raw['vacancy_name'].str.contains(
+            'remote',
+            case=False,
+            na=False
+        )
+    )
+    df_raw['skills'] = df_raw['description'].apply(
+        lambda x: [
+            skill for skill in gral_skills
+            if skill in x.lower()
+        ]
+    )
+    return df_raw
+
+def _set_augment_params(gral_skills: list):
+    """Keep the augmentation parameters in a worker process."""
+    _augment_params['gral_skills'] = gral_skills
+
+def _augment_chunk(df_raw: pd.DataFrame):
+    """Augment a chunk in a worker process, returning it with the seconds it took."""
+    start = time.time()
+    df_raw = augment_chunk(df_raw, **_augment_params)
+    return df_raw, time.time() - start
 
 
 class Preprocesor:
@@ -28,7 +92,21 @@ class Preprocesor:
         data_jobs (str): Path to raw job data
         gral_skills (str): Path to skills data
         namespace (uuid.UUID): UUID namespace for generating unique IDs
+        job_ids (JobIds): Persistent map from canonical links to job IDs
+        lexical_index (LexicalIndex): BM25 index over the job descriptions
+        deduplicator (Deduplicator): Near-duplicate detection over the job descriptions
+        blob_store (BlobStore): Content-addressed store holding the job descriptions
+        incremental (bool): Augment only the raw rows past the watermark
+        state (str): Path to the watermark of the last processed raw rows
+        watermark (dict): Watermark to store once the current run is loaded
+        workers (int): Number of processes augmenting the raw jobs
+        chunk_size (int): Number of raw jobs per augmentation chunk
+        engine (str): 'pandas', or 'arrow' to combine and transform the jobs with Arrow compute
+        compactor (Compactor): Archive of the raw jobs, read instead of data_jobs when enabled
     """
+    # columns of the stored job offers read when new jobs are appended to partitions
+    KEY_COLUMNS = ['job_id', 'link', 'description_hash', 'publication_date', 'location', 'aliases']
+
     def __init__(self):
         """
         Initialize the Preprocesor with configured settings.
@@ -42,6 +120,17 @@ class Preprocesor:
             self.data_jobs = settings.DATA_JOBS
             self.gral_skills = settings.SKILLS
             self.namespace = uuid.NAMESPACE_DNS
+            self.job_ids = JobIds(namespace=self.namespace)
+            self.lexical_index = LexicalIndex()
+            self.deduplicator = Deduplicator()
+            self.blob_store = BlobStore()
+            self.incremental = settings.PREPROCESSING_MODE.lower() == 'incremental'
+            self.state = settings.PREPROCESS_STATE or f'{os.path.splitext(settings.JOB_OFFERS)[0]}_preprocess_state.json'
+            self.watermark = None
+            self.workers = max(1, int(settings.PREPROCESS_WORKERS))
+            self.chunk_size = max(1, int(settings.PREPROCESS_CHUNK_SIZE))
+            self.engine = settings.PREPROCESS_ENGINE.lower()
+            self.compactor = Compactor(raw=self.data_jobs)
             logger.info("Preprocessor initialized with configured settings")
         except Exception as e:
             logger.error(f"Error initializing Preprocessor: {e}")
@@ -67,89 +156,255 @@ class Preprocesor:
             logger.error(f"Error extracting data from {path}: {e}")
             raise
 
-    def augment(self):
+    def raw(self):
         """
-        Augment the raw job data with additional features and combine with existing data.
+        Extract the raw jobs, decoded and validated as RawJob records.
 
-        This method performs several augmentation steps:
-        - Generates unique job IDs
-        - Determines remote work status
-        - Extracts relevant skills
-        - Combines with existing job offers
-        - Removes duplicates and handles missing data
+        When the raw archive is enabled the raw file is compacted first, and only
+        the partitions scraped within the publication window, and since the
+        watermark in incremental mode, are read. Jobs scraped earlier were also
+        published earlier, so the transformation would drop them anyway.
 
         Returns:
-            pd.DataFrame: Augmented DataFrame with additional features
+            pd.DataFrame: The raw jobs
         """
-        try:
-            logger.info("Starting data augmentation process")
-            df_raw = self.extract(path=self.data_jobs)
-
-            logger.debug("Generating job IDs from links")
-            df_raw['job_id'] = df_raw['link'].apply(
-                lambda x: shortuuid.encode(
-                    uuid.uuid5(
-                        self.namespace,
-                        x
-                    )
-                )
-            )
+        if not self.compactor.enabled:
+            return RawJob.read(self.data_jobs)
+        self.compactor.raw = self.data_jobs
+        self.compactor.compact()
+        since = recent_cutoff().strftime('%Y-%m-%d')
+        if self.incremental:
+            since = max(since, (open_json(self.state) or {}).get('scraping_date') or '')
+        return self.compactor.read(since)
+
+    def unseen(self, df_raw: pd.DataFrame):
+        """
+        Keep the raw rows that were not processed by a previous run.
 
-            logger.debug("Determining remote work status")
-            df_raw['remote'] = False
-            df_raw['remote'] = (
-                df_raw['description'].str.contains(
-                    'remote',
-                    case=False,
-                    na=False
-                ) |
-                df_raw['vacancy_name'].str.contains(
-                    'remote',
-                    case=False,
-                    na=False
-                )
-            )
+        The watermark holds the latest scraping_date processed and the canonical
+        links processed on that date. Rows scraped before it are skipped and rows
+        scraped on it are skipped when their link was processed. Rows without a
+        scraping_date never move the watermark, so their canonical links are kept
+        apart in undated_links, limited to the ones still in the raw jobs, and they
+        are processed once. The watermark covering the returned rows is kept in
+        self.watermark until the run is loaded.
 
-            logger.debug("Extracting skills from job descriptions")
-            df_skills = self.extract(self.gral_skills)
-            gral_skills = df_skills.skills.to_list()
-            df_raw['skills'] = df_raw['description'].apply(
-                lambda x: [
-                    skill for skill in gral_skills
-                    if skill in x.lower()
-                ]
-            )
+        Args:
+            df_raw (pd.DataFrame): Raw scraped jobs
+
+        Returns:
+            pd.DataFrame: The raw rows still to be processed
+        """
+        state = open_json(self.state) or {}
+        last_date = state.get('scraping_date') or ''
+        processed = set(state.get('links', []))
+        links = df_raw['link'].fillna('').str.split('?').str[0] if not df_raw.empty else pd.Series(dtype=object)
+        dates = df_raw['scraping_date'].fillna('') if 'scraping_date' in df_raw.columns else pd.Series('', index=df_raw.index)
+        undated = dates == ''
+        is_new = ~links.isin(processed) & ((dates >= last_date) & ~undated | undated & ~links.isin(state.get('undated_links', [])))
+        df_unseen = df_raw[is_new].copy()
+
+        new_date = max([last_date, *dates[is_new & ~undated]])
+        latest = links[(dates == new_date) & is_new]
+        self.watermark = {
+            'scraping_date': new_date,
+            'links': sorted((processed if new_date == last_date else set()) | set(latest)),
+            'undated_links': sorted(set(links[undated]))
+        }
+        logger.info(f"Processing {len(df_unseen)} of {len(df_raw)} raw jobs past the watermark {last_date or 'none'}")
+        return df_unseen
+
+    def augment_raw(self, df_raw: pd.DataFrame, gral_skills: list):
+        """
+        Generate the content hashes, remote status and skills of the raw jobs.
 
-            df_preprocessed = self.extract(path=self.job_offers)
-            df_concated = pd.concat([df_raw, df_preprocessed])
+        The raw jobs are split into chunks of self.chunk_size rows, augmented in a
+        pool of self.workers processes, or in this process with a single worker,
+        and concatenated back in their original order.
 
-            logger.debug("Removing duplicates based on job_id")
-            df_concated.drop_duplicates(
-                subset=['job_id'],
-                inplace=True,
-                ignore_index=True
-            )
+        Args:
+            df_raw (pd.DataFrame): Raw scraped jobs
+            gral_skills (list): Skills searched in the descriptions
 
-            logger.debug("Dropping rows with missing remote status")
-            df_concated.dropna(
-                subset=['remote'],
-                inplace=True,
-                ignore_index=True
-            )
+        Returns:
+            pd.DataFrame: The augmented raw jobs
+        """
+        chunks = [df_raw.iloc[start:start + self.chunk_size] for start in range(0, len(df_raw), self.chunk_size)]
+        if not chunks:
+            return augment_chunk(df_raw, gral_skills)
+        start = time.time()
+        logger.info(f"Augmenting {len(df_raw)} raw jobs in {len(chunks)} chunks with {self.workers} workers")
+        if self.workers == 1 or len(chunks) == 1:
+            _set_augment_params(gral_skills)
+            augmented = self._log_chunks(map(_augment_chunk, chunks), len(chunks))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=min(self.workers, len(chunks)),
+                initializer=_set_augment_params,
+                initargs=(gral_skills,)
+            ) as executor:
+                augmented = self._log_chunks(executor.map(_augment_chunk, chunks), len(chunks))
+        logger.info(f"Augmented {len(df_raw)} raw jobs in {time.time() - start:.2f}s")
+        return pd.concat(augmented)
+
+    @staticmethod
+    def _log_chunks(results, total: int):
+        """Collect the augmented chunks in order, logging the time each one took."""
+        augmented = []
+        for number, (df_chunk, seconds) in enumerate(results):
+            logger.info(f"Augmented chunk {number + 1}/{total} of {len(df_chunk)} jobs in {seconds:.2f}s")
+            augmented.append(df_chunk)
+        return augmented
+
+    def sources(self):
+        """
+        Extract and augment the raw jobs and extract the stored job offers.
 
-            logger.debug("Dropping rows with missing skills")
-            df_concated.dropna(
-                subset=['skills'],
-                inplace=True,
-                ignore_index=True
+        This method performs several steps:
+        - Extracts the raw jobs, from the raw archive when enabled
+        - Skips the raw rows already processed, in incremental mode, and returns
+          early when no raw row is left
+        - Hashes the descriptions of offers stored before content addressing
+        - Looks up the job IDs of the canonical links, generating only the unseen ones
+        - Addresses the descriptions by content hash, determines remote work status
+          and extracts relevant skills, in chunks
+
+        Returns:
+            tuple: The augmented raw jobs and the stored job offers, only their
+            KEY_COLUMNS when the job offers are partitioned
+        """
+        columns = self.KEY_COLUMNS if is_partitioned(self.job_offers) else None
+        df_preprocessed = open_table(self.job_offers, recent_filters(), columns)
+        if df_preprocessed is None:
+            df_preprocessed = pd.DataFrame()
+        if 'description' in df_preprocessed.columns:
+            # offers stored before descriptions were content addressed
+            hashes = df_preprocessed['description'].apply(self.blob_store.key)
+            df_preprocessed['description_hash'] = (
+                df_preprocessed['description_hash'].fillna(hashes)
+                if 'description_hash' in df_preprocessed.columns else hashes
             )
 
+        df_raw = self.raw()
+        if self.incremental:
+            df_raw = self.unseen(df_raw)
+        if df_raw.empty:
+            logger.info("No raw jobs to augment")
+            return df_raw.reindex(columns=[*df_raw.columns, 'job_id', 'description_hash', 'remote', 'skills']), df_preprocessed
+
+        logger.debug("Looking up job IDs of the canonical links")
+        df_raw['job_id'] = self.job_ids.assign(df_raw['link'], df_preprocessed)
+
+        df_skills = self.extract(self.gral_skills)
+        gral_skills = df_skills.skills.to_list()
+        df_raw = self.augment_raw(df_raw, gral_skills)
+        return df_raw, df_preprocessed
+
+    def combine(self, frames: list):
+        """
+        Combine job offers, keeping the first row of every job_id and dropping the
+        rows with missing remote status or skills.
+
+        Args:
+            frames (list): Job offers by priority, e.g. the raw jobs before the stored ones
+
+        Returns:
+            pd.DataFrame: The combined job offers
+        """
+        df_concated = pd.concat([frame for frame in frames if not frame.empty] or frames[:1])
+
+        logger.debug("Removing duplicates based on job_id")
+        df_concated.drop_duplicates(
+            subset=['job_id'],
+            inplace=True,
+            ignore_index=True
+        )
+
+        logger.debug("Dropping rows with missing remote status")
+        df_concated.dropna(
+            subset=['remote'],
+            inplace=True,
+            ignore_index=True
+        )
+
+        logger.debug("Dropping rows with missing skills")
+        df_concated.dropna(
+            subset=['skills'],
+            inplace=True,
+            ignore_index=True
+        )
+        return df_concated
+
+    def augment(self):
+        """
+        Augment the raw job data with additional features and combine with existing data.
+
+        This method performs several augmentation steps:
+        - Extracts and augments the raw jobs, see sources
+        - Combines with existing job offers
+        - Removes duplicates and handles missing data
+
+        Returns:
+            pd.DataFrame: Augmented DataFrame with additional features
+        """
+        try:
+            logger.info("Starting data augmentation process")
+            df_raw, df_preprocessed = self.sources()
+            df_concated = self.combine([df_raw, df_preprocessed])
             logger.info(f"Augmented dataframe shape: {df_concated.shape}")
             return df_concated
         except Exception as e:
             logger.error(f"Error during data augmentation: {e}")
             raise
 
+    def clean(self, df: pd.DataFrame):
+        """
+        Filter, clean and deduplicate the combined job offers.
+
+        Args:
+            df (pd.DataFrame): Combined job offers
+
+        Returns:
+            pd.DataFrame: The recent job offers, most recent first, one per link and description
+        """
+        logger.debug("Filtering out fake companies")
+        df = df[~df["company"].isin(self.filter_params)].copy()
+
+        logger.debug("Removing query parameters from links")
+        df['link'] = df['link'].apply(lambda x: x.split('?')[0])
+
+        logger.debug("Filtering for jobs from the last week")
+        df['publication_date'] = pd.to_datetime(df['publication_date'])
+        one_week_ago = recent_cutoff()
+        df = df[df['publication_date'] >= one_week_ago].copy()
+        df['publication_date'] = df['publication_date'].dt.strftime('%Y-%m-%d')
+        logger.info(f"Dataframe shape after date filtering: {df.shape}")
+
+        logger.debug("Sorting by publication date (most recent first)")
+        df.sort_values(
+            by=['publication_date'],
+            inplace=True,
+            ascending=False
+        )
+
+        logger.debug("Removing duplicate links")
+        df.drop_duplicates(
+            subset=['link'],
+            keep='first',
+            inplace=True,
+            ignore_index=True
+        )
+        logger.info(f"Dataframe shape after link deduplication: {df.shape}")
+
+        logger.debug("Removing duplicate descriptions")
+        df.drop_duplicates(
+            subset=['description_hash'],
+            keep='first',
+            inplace=True,
+            ignore_index=True
+        )
+        return df
+
     def transform(self):
         """
         Transform the augmented data by applying various cleaning and filtering operations.
@@ -160,72 +415,152 @@ class Preprocesor:
         - Filtering for recent jobs
         - Sorting by date
         - Removing duplicates
+        - Collapsing near-duplicate descriptions, when enabled
+
+        With the arrow engine the same steps run as Arrow compute kernels, see
+        transform_arrow.
 
         Returns:
             pd.DataFrame: Transformed DataFrame ready for loading
         """
         try:
             logger.info("Starting data transformation process")
-            df = self.augment()
-
-            logger.debug("Filtering out fake companies")
-            df = df[~df["company"].isin(self.filter_params)].copy()
-
-            logger.debug("Removing query parameters from links")
-            df['link'] = df['link'].apply(lambda x: x.split('?')[0])
-
-            logger.debug("Filtering for jobs from the last week")
-            df['publication_date'] = pd.to_datetime(df['publication_date'])
-            one_week_ago = pd.Timestamp.now() - pd.Timedelta(days=7)
-            df = df[df['publication_date'] >= one_week_ago].copy()
-            df['publication_date'] = df['publication_date'].dt.strftime('%Y-%m-%d')
-            logger.info(f"Dataframe shape after date filtering: {df.shape}")
-
-            logger.debug("Sorting by publication date (most recent first)")
-            df.sort_values(
-                by=['publication_date'],
-                inplace=True,
-                ascending=False
-            )
-
-            logger.debug("Removing duplicate links")
-            df.drop_duplicates(
-                subset=['link'],
-                keep='first',
-                inplace=True,
-                ignore_index=True
-            )
-            logger.info(f"Dataframe shape after link deduplication: {df.shape}")
-
-            logger.debug("Removing duplicate descriptions")
-            df.drop_duplicates(
-                subset=['description'],
-                keep='first',
-                inplace=True,
-                ignore_index=True
-            )
-            logger.info(f"Final transformed dataframe shape: {df.shape}")
-            return df
+            if self.engine == 'arrow':
+                return self.collapse(self.transform_arrow())
+            df = self.clean(self.augment())
+            return self.collapse(df)
         except Exception as e:
             logger.error(f"Error during data transformation: {e}")
             raise
 
-    def load(self):
+    def transform_arrow(self):
+        """
+        Augment and transform the job offers as eager columnar Arrow operations.
+
+        The raw and stored job offers are read and converted to Arrow once. Deduplication,
+        company and date filters, link cleaning and sorting then run as
+        multithreaded compute kernels over the few columns each step needs, and the
+        remaining columns are gathered once at the end instead of being copied by
+        every pandas step.
+
+        Returns:
+            pd.DataFrame: The same job offers as the pandas path, before near-duplicate collapsing
+        """
+        df_raw, df_preprocessed = self.sources()
+        table = arrow_etl.combine([arrow_etl.to_table(df_raw), arrow_etl.to_table(df_preprocessed)])
+        logger.info(f"Augmented table shape: {table.shape}")
+        one_week_ago = recent_cutoff()
+        table = arrow_etl.clean(table, self.filter_params, one_week_ago)
+        return table_to_frame(table)
+
+    def transform_append(self):
+        """
+        Transform only the new raw jobs against the keys of the stored job offers.
+
+        Used when the job offers are partitioned, with either engine. The cleaning
+        steps of transform run over the new rows only, and the stored job offers
+        are only read for their KEY_COLUMNS. A new job replaces the stored jobs
+        sharing its job_id, or its link or description when they were not
+        published later, and is dropped otherwise. Near-duplicate descriptions are
+        collapsed against the stored canonical jobs, and the stored jobs absorbing
+        new ones are returned with their new aliases.
+
+        Returns:
+            tuple: The job offers to append, the stored job offers they replace and
+            the stored job offers kept
         """
-        Load the transformed data into a JSON file.
+        logger.info("Starting data transformation of the new jobs")
+        df_raw, df_stored = self.sources()
+        df = self.clean(self.combine([df_raw]))
+        df_stored = df_stored.astype({column: object for column in ['link', 'description_hash', 'publication_date'] if column in df_stored.columns})
+        replaced = df_stored['job_id'].isin(df['job_id']) if 'job_id' in df_stored.columns else pd.Series(False, index=df_stored.index)
+        for key in ['link', 'description_hash']:
+            if key not in df_stored.columns or df.empty:
+                continue
+            shared = df_stored[~replaced & df_stored[key].isin(df[key])]
+            published = df[key].map(shared.groupby(key)['publication_date'].max())
+            df = df[published.isna() | (df['publication_date'] >= published)]
+            replaced |= df_stored[key].isin(df[key])
+        df_removed, df_stored = df_stored[replaced], df_stored[~replaced]
+        logger.info(f"Appending {len(df)} new jobs replacing {len(df_removed)} stored jobs")
+
+        if self.deduplicator.enabled and not df.empty:
+            new_ids = set(df['job_id'])
+            df_canonical = self.collapse(pd.concat([frame for frame in [df_stored, df] if not frame.empty], ignore_index=True))
+            changed = [
+                job_id for job_id, aliases in zip(df_canonical['job_id'], df_canonical['aliases'])
+                if job_id not in new_ids and new_ids.intersection(aliases)
+            ]
+            df = df_canonical[df_canonical['job_id'].isin(new_ids)]
+            if changed:
+                # stored canonical jobs absorbing new jobs are rewritten with their new aliases
+                df_changed = df_stored[df_stored['job_id'].isin(changed)]
+                df_updated = open_table(self.job_offers, [
+                    (column, 'in', [None if pd.isna(value) else value for value in df_changed[column].astype(object).unique()])
+                    for column in PARTITION_COLUMNS if column in df_changed.columns
+                ])
+                df_updated = df_updated[df_updated['job_id'].isin(changed)].drop(columns=['aliases'], errors='ignore')
+                df_updated = df_updated.merge(df_canonical[['job_id', 'aliases']], on='job_id', how='left')
+                df = pd.concat([df, df_updated], ignore_index=True)
+        return df, df_removed, df_stored
+
+    def collapse(self, df: pd.DataFrame):
+        """
+        Collapse near-duplicate descriptions, when enabled.
+
+        Args:
+            df (pd.DataFrame): Transformed job offers
 
-        Converts the DataFrame to a dictionary and saves it to the specified
-        job offers file path.
+        Returns:
+            pd.DataFrame: The canonical job offers
+        """
+        if self.deduplicator.enabled:
+            logger.debug("Collapsing near-duplicate descriptions")
+            df = self.deduplicator.run(df, texts=self.blob_store.texts)
+        logger.info(f"Final transformed dataframe shape: {df.shape}")
+        return df
+
+    def load(self):
+        """
+        Load the transformed data into a JSON or parquet file.
+
+        Descriptions are stored once in the content-addressed blob store and the
+        job records only keep their description_hash. The DataFrame is saved to the
+        specified job offers file path, as a JSON list or, for a .parquet path, with
+        the low-cardinality columns dictionary encoded. For a partitioned path only
+        the new jobs are transformed and appended to their partitions, and the
+        partitions that left the publication window are dropped. When lexical
+        retrieval is enabled the BM25 index over the descriptions is updated with
+        the new and expired jobs. In incremental mode the watermark is only advanced
+        once the job offers are saved.
 
         Returns:
-            list: List of dictionaries containing the processed job records
+            list: List of dictionaries containing the processed job records, only
+            the appended ones for a partitioned path
         """
         try:
             logger.info("Starting data loading process")
-            df = self.transform()
+            partitioned = is_partitioned(self.job_offers)
+            if partitioned:
+                df, df_removed, df_stored = self.transform_append()
+            else:
+                df = self.transform()
+            if 'description' in df.columns:
+                self.blob_store.put(df.loc[df['description'].notna(), 'description'])
+            if self.lexical_index.enabled:
+                df_current = pd.concat([frame for frame in [df_stored, df] if not frame.empty] or [df], ignore_index=True) if partitioned else df
+                self.lexical_index.update(df_current, texts=self.blob_store.texts)
+            df = df.drop(columns=['description'], errors='ignore')
             dict_df = df.to_dict(orient='records')
             logger.info(f"Saving {len(dict_df)} job records to {self.job_offers}")
-            save_json(self.job_offers, dict_df)
+            if partitioned:
+                if append_partitions(self.job_offers, df, df_removed, recent_filters()[0][2]) is None:
+                    raise IOError(f"Could not append the job offers to {self.job_offers}")
+            else:
+                save_table(self.job_offers, df)
+            if self.incremental and self.watermark is not None:
+                save_json(self.state, self.watermark)
+                self.watermark = None
             return dict_df
         except Exception as e:
             logger.error(f"Error during data loading: {e}")
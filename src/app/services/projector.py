@@ -0,0 +1,188 @@
+""" module to reduce the dimension of the embeddings before matching """
+#base
+import os
+import hashlib
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import numpy as np
+import pandas as pd
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+from src.app.utils import cosine_similarity_matrix
+
+
+class Projector():
+    """
+    A class for projecting embeddings onto a lower dimensional space.
+
+    Two methods are supported:
+    - pca: a principal component projection fitted on the current job embeddings
+    - truncate: keeps the leading dimensions, meant for Matryoshka-capable models
+
+    The PCA basis is fitted on the uncentred embeddings and is orthonormal, so the
+    projection keeps the dot products and norms of the vectors within the fitted
+    subspace and the cosine similarities stay on the scale the matching
+    thresholds and weights were tuned for.
+
+    The fitted projection is stored next to the job embeddings snapshot so the
+    same transformation can be applied to users at scoring time.
+
+    Attributes:
+        method (str): Projection method ('none', 'pca' or 'truncate')
+        dim (int): Target dimension
+        components (np.ndarray): PCA components with shape (input_dim, dim)
+    """
+    METHODS = ('none', 'pca', 'truncate')
+    SUFFIX = '_projected'
+    FILE_NAME = 'projection.npz'
+
+    def __init__(self, method: str = None, dim: int = None):
+        """
+        Initialize the Projector with the method and dimension from settings.
+
+        Args:
+            method (str): Projection method, defaults to settings.EMBEDDING_PROJECTION
+            dim (int): Target dimension, defaults to settings.EMBEDDING_PROJECTION_DIM
+
+        Raises:
+            ValueError: If the method is not supported
+        """
+        self.method = (method or settings.EMBEDDING_PROJECTION).lower()
+        if self.method not in self.METHODS:
+            raise ValueError(f"Unsupported projection method: {self.method}. Expected one of {self.METHODS}")
+        self.dim = int(dim if dim is not None else settings.EMBEDDING_PROJECTION_DIM)
+        self.components = None
+
+    @property
+    def enabled(self):
+        """bool: True when a projection method and a target dimension are configured."""
+        return self.method != 'none' and self.dim > 0
+
+    def columns(self, columns: list):
+        """
+        Get the names of the projected columns for a list of embedding columns.
+
+        Args:
+            columns (list): Names of the full dimension embedding columns
+
+        Returns:
+            list: Names of the projected columns
+        """
+        return [f'{column}{self.SUFFIX}' for column in columns]
+
+    def fit(self, matrix):
+        """
+        Fit the projection on a matrix of embeddings.
+
+        Args:
+            matrix (np.ndarray): Embeddings with one vector per row
+
+        Returns:
+            Projector: The fitted projector
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        self.dim = min(self.dim, matrix.shape[1])
+        if self.method == 'pca':
+            _, _, vt = np.linalg.svd(matrix, full_matrices=False)
+            self.components = vt[:self.dim].T.astype(np.float32)
+            logger.info(f'Fitted PCA projection from {matrix.shape[1]} to {self.components.shape[1]} dimensions')
+        return self
+
+    def transform(self, matrix):
+        """
+        Project a matrix of embeddings.
+
+        Args:
+            matrix (np.ndarray): Embeddings with one vector per row
+
+        Returns:
+            np.ndarray: float32 matrix with self.dim columns
+        """
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if self.method == 'truncate':
+            return np.ascontiguousarray(matrix[:, :self.dim])
+        if self.method == 'pca':
+            if self.components is None:
+                raise ValueError("The PCA projection has not been fitted")
+            return matrix @ self.components
+        return matrix
+
+    def save(self, path: str):
+        """
+        Store the projection parameters in a npz file.
+
+        Args:
+            path (str): Path of the npz file
+        """
+        np.savez(
+            path,
+            method=self.method,
+            dim=self.dim,
+            components=self.components if self.components is not None else np.empty((0, 0))
+        )
+        logger.info(f'Storing projection at {path}')
+
+    def load(self, path: str):
+        """
+        Load the projection parameters from a npz file.
+
+        Args:
+            path (str): Path of the npz file
+
+        Returns:
+            bool: True if the projection was loaded, False if the file does not exist
+        """
+        if not os.path.exists(path):
+            return False
+        params = np.load(path)
+        self.method = str(params['method'])
+        self.dim = int(params['dim'])
+        self.components = params['components'] if params['components'].size else None
+        logger.info(f'Loaded {self.method} projection to {self.dim} dimensions from {path}')
+        return True
+
+    def fingerprint(self):
+        """
+        Get a digest of the projection parameters.
+
+        Returns:
+            str: A hex digest that changes whenever the method, the dimension or the fitted basis change
+        """
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update(f'{self.method}:{self.dim}'.encode())
+        if self.components is not None:
+            digest.update(np.ascontiguousarray(self.components).tobytes())
+        return digest.hexdigest()
+
+    def correlation_report(self, df_users: pd.DataFrame, df_jobs: pd.DataFrame):
+        """
+        Compare the similarities obtained on projected vectors with the full vectors.
+
+        Args:
+            df_users (pd.DataFrame): User embeddings with avg_skill_embeds and avg_role_embeds
+            df_jobs (pd.DataFrame): Job embeddings with avg_skill_embeds and role_embeds
+
+        Returns:
+            dict: Pearson and Spearman correlation for each embedding pair
+        """
+        report = {'method': self.method, 'dim': self.dim}
+        pairs = {
+            'skills': ('avg_skill_embeds', 'avg_skill_embeds'),
+            'role': ('role_embeds', 'avg_role_embeds')
+        }
+        for name, (job_column, user_column) in pairs.items():
+            jobs = np.array(df_jobs[job_column].to_list(), dtype=np.float32)
+            users = np.array(df_users[user_column].to_list(), dtype=np.float32)
+            full = cosine_similarity_matrix(jobs, users).ravel()
+            projected = cosine_similarity_matrix(self.transform(jobs), self.transform(users)).ravel()
+            scores = pd.DataFrame({'full': full, 'projected': projected}).dropna()
+            ranks = scores.rank()
+            report[name] = {
+                'pearson': float(scores['full'].corr(scores['projected'])),
+                'spearman': float(ranks['full'].corr(ranks['projected'])),
+                'max_abs_diff': float((scores['full'] - scores['projected']).abs().max())
+            }
+        logger.info(f'Projection correlation report: {report}')
+        return report
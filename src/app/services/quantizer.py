@@ -0,0 +1,178 @@
+""" module to store the embeddings in compact precision """
+#base
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import numpy as np
+import pandas as pd
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+from src.app.utils import cosine_similarity_matrix
+
+
+class Quantizer():
+    """
+    A class for compacting embedding columns before they are stored and for
+    recovering matrices from them at scoring time.
+
+    Supported storage types are float64 (plain lists, the legacy format), float32,
+    float16 and int8. The int8 mode scales every vector to the [-127, 127] range and
+    keeps the float32 scale in a `<column>_scale` column. Cosine similarity is scale
+    invariant, so the stored codes can be scored directly without dequantizing.
+
+    Attributes:
+        dtype (str): Storage type used when quantizing
+        block_size (int): Number of rows processed at once when dequantizing
+    """
+    DTYPES = ('float64', 'float32', 'float16', 'int8')
+    SCALE_SUFFIX = '_scale'
+
+    def __init__(self, dtype: str = None, block_size: int = 4096):
+        """
+        Initialize the Quantizer with the storage type from settings.
+
+        Args:
+            dtype (str): Storage type, defaults to settings.EMBEDDING_DTYPE
+            block_size (int): Number of rows processed at once when dequantizing
+
+        Raises:
+            ValueError: If the storage type is not supported
+        """
+        self.dtype = (dtype or settings.EMBEDDING_DTYPE).lower()
+        if self.dtype not in self.DTYPES:
+            raise ValueError(f"Unsupported embedding dtype: {self.dtype}. Expected one of {self.DTYPES}")
+        self.block_size = block_size
+
+    def stack(self, df: pd.DataFrame, column: str):
+        """
+        Stack an embedding column into a 2D matrix keeping its stored dtype.
+
+        Args:
+            df (pd.DataFrame): DataFrame holding one embedding per row
+            column (str): Name of the embedding column
+
+        Returns:
+            np.ndarray: Matrix with one row per DataFrame row
+        """
+        if df.empty or column not in df.columns:
+            return np.empty((0, 0), dtype=np.float32)
+        values = df[column].to_list()
+        if isinstance(values[0], np.ndarray):
+            return np.stack(values)
+        return np.asarray(values, dtype=np.float64)
+
+    def to_matrix(self, df: pd.DataFrame, column: str):
+        """
+        Dequantize an embedding column into a float32 matrix, one block at a time.
+
+        Args:
+            df (pd.DataFrame): DataFrame holding one embedding per row
+            column (str): Name of the embedding column
+
+        Returns:
+            np.ndarray: float32 matrix with one row per DataFrame row
+        """
+        codes = self.stack(df, column)
+        scale_column = f'{column}{self.SCALE_SUFFIX}'
+        scales = df[scale_column].to_numpy(dtype=np.float32) if scale_column in df.columns else None
+        matrix = np.empty(codes.shape, dtype=np.float32)
+        for start in range(0, codes.shape[0], self.block_size):
+            block = codes[start:start + self.block_size].astype(np.float32)
+            if scales is not None:
+                block_scales = np.nan_to_num(scales[start:start + self.block_size], nan=1.0)
+                block = block * block_scales[:, None]
+            matrix[start:start + self.block_size] = block
+        return matrix
+
+    def quantize(self, df: pd.DataFrame, columns: list):
+        """
+        Convert embedding columns to the configured storage type.
+
+        Args:
+            df (pd.DataFrame): DataFrame holding the embedding columns
+            columns (list): Names of the embedding columns to convert
+
+        Returns:
+            pd.DataFrame: Copy of the DataFrame with the converted columns
+        """
+        df = df.copy()
+        for column in columns:
+            if df.empty or column not in df.columns:
+                continue
+            matrix = self.to_matrix(df, column)
+            df = df.drop(columns=[f'{column}{self.SCALE_SUFFIX}'], errors='ignore')
+            if self.dtype == 'float64':
+                df[column] = matrix.astype(np.float64).tolist()
+            elif self.dtype == 'int8':
+                scales = np.abs(matrix).max(axis=1) / 127
+                scales[scales == 0] = 1
+                codes = np.round(matrix / scales[:, None]).astype(np.int8)
+                df[column] = list(codes)
+                df[f'{column}{self.SCALE_SUFFIX}'] = scales.astype(np.float32)
+            else:
+                df[column] = list(matrix.astype(self.dtype))
+        logger.info(f'Quantized {columns} to {self.dtype} for {len(df)} rows')
+        return df
+
+    def dequantize(self, df: pd.DataFrame, columns: list):
+        """
+        Convert compact embedding columns back to float32 vectors.
+
+        Args:
+            df (pd.DataFrame): DataFrame holding the embedding columns
+            columns (list): Names of the embedding columns to convert
+
+        Returns:
+            pd.DataFrame: Copy of the DataFrame without scale columns
+        """
+        df = df.copy()
+        for column in columns:
+            if df.empty or column not in df.columns:
+                continue
+            df[column] = list(self.to_matrix(df, column))
+            df = df.drop(columns=[f'{column}{self.SCALE_SUFFIX}'], errors='ignore')
+        return df
+
+    def drift_report(self, df_users: pd.DataFrame, df_jobs: pd.DataFrame, top_k: int = 10, threshold: float = None):
+        """
+        Compare the similarities obtained from quantized job embeddings with full precision.
+
+        Args:
+            df_users (pd.DataFrame): User embeddings with avg_skill_embeds and avg_role_embeds
+            df_jobs (pd.DataFrame): Full precision job embeddings with avg_skill_embeds and role_embeds
+            top_k (int): Size of the per-user ranking used to measure recall
+            threshold (float): Optional similarity threshold used to measure recall
+
+        Returns:
+            dict: Score drift and recall metrics for each embedding pair
+        """
+        report = {'dtype': self.dtype}
+        df_quantized = self.quantize(df_jobs, ['avg_skill_embeds', 'role_embeds'])
+        pairs = {
+            'skills': ('avg_skill_embeds', 'avg_skill_embeds'),
+            'role': ('role_embeds', 'avg_role_embeds')
+        }
+        for name, (job_column, user_column) in pairs.items():
+            users = self.to_matrix(df_users, user_column)
+            full = cosine_similarity_matrix(self.to_matrix(df_jobs, job_column), users)
+            compact = cosine_similarity_matrix(self.stack(df_quantized, job_column), users)
+            drift = np.abs(full - compact)
+            k = min(top_k, full.shape[0])
+            recalls = [
+                len(
+                    set(np.argsort(-full[:, i])[:k]) & set(np.argsort(-compact[:, i])[:k])
+                ) / k
+                for i in range(full.shape[1])
+            ] if k > 0 else []
+            report[name] = {
+                'max_abs_drift': float(np.nanmax(drift)) if drift.size else 0.0,
+                'mean_abs_drift': float(np.nanmean(drift)) if drift.size else 0.0,
+                f'recall@{top_k}': float(np.mean(recalls)) if recalls else 1.0
+            }
+            if threshold is not None:
+                relevant = full >= threshold
+                retained = relevant & (compact >= threshold)
+                report[name]['threshold_recall'] = float(retained.sum() / relevant.sum()) if relevant.any() else 1.0
+        logger.info(f'Quantization drift report: {report}')
+        return report
@@ -0,0 +1,212 @@
+""" module to validate the raw scraped jobs as compact typed records """
+#base
+import re
+import json
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import pandas as pd
+# repo imports
+from src.app.utils import iter_records, save_records
+
+DATE = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+class RawJob():
+    """
+    A compact, validated job posting as scraped from LinkedIn.
+
+    Records keep their fields in slots instead of a dictionary per job, and are
+    validated once when they are built, at the scrape boundary or when a raw
+    file is decoded. Every field is a string or None, the link is required and
+    the dates, when known, use the YYYY-MM-DD format.
+
+    Attributes:
+        vacancy_name (str): Title of the job
+        company (str): Company offering the job
+        location (str): Location of the job
+        work_modality_english (str): Employment type
+        seniority (str): Seniority level
+        link (str): Link to the job posting
+        job_function (str): Job function
+        industries (str): Industries of the company
+        description (str): Description of the job
+        apply_link (str): Link to apply to the job
+        publication_date (str): Publication date, YYYY-MM-DD
+        query_keyword (str): Role searched by the scraper
+        country (str): Country searched by the scraper
+        scraping_date (str): Scraping date, YYYY-MM-DD
+    """
+    __slots__ = (
+        'vacancy_name',
+        'company',
+        'location',
+        'work_modality_english',
+        'seniority',
+        'link',
+        'job_function',
+        'industries',
+        'description',
+        'apply_link',
+        'publication_date',
+        'query_keyword',
+        'country',
+        'scraping_date'
+    )
+    DATES = ('publication_date', 'scraping_date')
+
+    def __init__(self, link, vacancy_name=None, company=None, location=None, work_modality_english=None,
+                 seniority=None, job_function=None, industries=None, description=None, apply_link=None,
+                 publication_date=None, query_keyword=None, country=None, scraping_date=None):
+        self.vacancy_name = vacancy_name
+        self.company = company
+        self.location = location
+        self.work_modality_english = work_modality_english
+        self.seniority = seniority
+        self.link = link
+        self.job_function = job_function
+        self.industries = industries
+        self.description = description
+        self.apply_link = apply_link
+        self.publication_date = publication_date
+        self.query_keyword = query_keyword
+        self.country = country
+        self.scraping_date = scraping_date
+        self.validate()
+
+    def validate(self):
+        """
+        Check the schema of the record.
+
+        Raises:
+            ValueError: If the link is missing, a field is not a string or a date is malformed
+        """
+        if not isinstance(self.link, str) or not self.link:
+            raise ValueError(f"Missing link for job {self.vacancy_name}")
+        for field in self.__slots__:
+            value = getattr(self, field)
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"Invalid {field} for job {self.link}: {value!r}")
+        for field in self.DATES:
+            value = getattr(self, field)
+            if value and not DATE.fullmatch(value):
+                raise ValueError(f"Invalid {field} for job {self.link}: {value!r}")
+
+    @classmethod
+    def from_dict(cls, job: dict):
+        """
+        Build a record from a raw job dictionary, ignoring unknown keys.
+
+        Args:
+            job (dict): A raw job
+
+        Returns:
+            RawJob: The validated record
+
+        Raises:
+            ValueError: If the job does not match the schema
+        """
+        if not isinstance(job, dict):
+            raise ValueError(f"Invalid raw job: {job!r}")
+        return cls(**{field: job.get(field) for field in cls.__slots__})
+
+    def to_dict(self):
+        """
+        Get the raw job as a dictionary.
+
+        Returns:
+            dict: The fields of the record
+        """
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def decode(cls, line):
+        """
+        Decode a record from a JSON document.
+
+        Args:
+            line (str or bytes): One raw job as JSON, e.g. an NDJSON line
+
+        Returns:
+            RawJob: The validated record
+
+        Raises:
+            ValueError: If the document is not valid JSON or does not match the schema
+        """
+        return cls.from_dict(json.loads(line))
+
+    def encode(self):
+        """
+        Encode the record as a JSON document.
+
+        Returns:
+            str: The raw job as a single JSON line
+        """
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+    @classmethod
+    def read(cls, pathfile: str):
+        """
+        Decode the raw jobs of a JSON or NDJSON file into a DataFrame, validating them in batch.
+
+        The records are laid out column by column and the schema is checked on
+        whole columns, instead of building and validating one RawJob per row.
+        Invalid rows are logged and skipped.
+
+        Args:
+            pathfile (str): The path to the raw file
+
+        Returns:
+            pd.DataFrame: The valid raw jobs, one column per field, empty if the file could not be read
+        """
+        try:
+            jobs = [job for job in iter_records(pathfile) if isinstance(job, dict)]
+        except Exception as e:
+            logger.error(f"Error reading raw jobs from {pathfile}: {e}")
+            jobs = []
+        df = pd.DataFrame({
+            field: pd.Series([job.get(field) for job in jobs], dtype=object)
+            for field in cls.__slots__
+        })
+        valid = df['link'].map(type).eq(str) & df['link'].ne('')
+        for field in cls.__slots__:
+            valid &= df[field].map(type).isin([str, type(None)])
+        for field in cls.DATES:
+            valid &= df[field].str.fullmatch(DATE.pattern).ne(False) | df[field].eq('')
+        if not valid.all():
+            logger.error(f"Skipping {int((~valid).sum())} invalid raw jobs from {pathfile}")
+        logger.info(f"Decoded {int(valid.sum())} raw jobs from {pathfile}")
+        return df[valid].reset_index(drop=True)
+
+    @classmethod
+    def dump(cls, pathfile: str, records: list):
+        """
+        Encode the raw jobs to a JSON or NDJSON file.
+
+        Args:
+            pathfile (str): The path to the raw file
+            records (list): RawJob records
+
+        Returns:
+            int: The number of records written, or None if an error occurred
+        """
+        return save_records(pathfile, [[record.to_dict() for record in records]])
+
+    @classmethod
+    def frame(cls, records: list):
+        """
+        Build a DataFrame column by column from the records.
+
+        Args:
+            records (list): RawJob records
+
+        Returns:
+            pd.DataFrame: One row per record and one column per field
+        """
+        return pd.DataFrame({
+            field: pd.Series([getattr(record, field) for record in records], dtype=object)
+            for field in cls.__slots__
+        })
+
+    def __repr__(self):
+        return f'RawJob({self.link})'
@@ -0,0 +1,244 @@
+""" module to score users against the job matrices, serially or in a process pool """
+#base
+import time
+import logging
+logger = logging.getLogger('Jobbot')
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from multiprocessing.util import Finalize
+# vector management
+import numpy as np
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+from src.app.utils import (
+    cosine_similarity_matrix,
+    top_k_indices
+)
+
+# job arrays attached by every worker process
+_shared_jobs = {}
+_shared_blocks = []
+
+
+def signature(task: dict):
+    """
+    Get the knowledge filter signature of a task.
+
+    Args:
+        task (dict): A user scoring task
+
+    Returns:
+        tuple: The filter criteria codes and english flag, equal for users sharing the same candidate jobs
+    """
+    return tuple(tuple(np.asarray(codes).tolist()) for codes in task['criteria']), task['english']
+
+def score_group(tasks: list, jobs: dict):
+    """
+    Score users sharing the same knowledge filter signature against the job matrices.
+
+    The candidate jobs are filtered once for the whole group and every similarity
+    is obtained from a single matrix product. Users carrying the sorted positions of
+    their candidate jobs only keep those, and when every task carries them only
+    their union is scored. The threshold always applies to the dense score. Tasks
+    with lexical scores, given as sorted job positions and their scores, rank the
+    jobs clearing it by the dense score fused with the lexical one using their
+    lexical_weight, jobs without a lexical score counting as zero.
+
+    Args:
+        tasks (list): Tasks with the same signature, each with the user id, embeddings,
+            filter criteria codes, english flag, role_weight, threshold, top_k and
+            optional candidates, lexical scores and lexical_weight
+        jobs (dict): Job arrays (skill, role, codes, valid, english)
+
+    Returns:
+        list: For every task, the positions of the filtered jobs with their role and
+        skills similarities and dense score, and the positions within them of the
+        selected matches
+    """
+    mask = jobs['valid'].copy()
+    for column, codes in enumerate(tasks[0]['criteria']):
+        mask &= np.isin(jobs['codes'][:, column], codes)
+    if not tasks[0]['english']:
+        mask &= ~jobs['english']
+    restricted = all(task.get('candidates') is not None for task in tasks)
+    if restricted:
+        candidates = np.zeros(mask.size, dtype=bool)
+        for task in tasks:
+            candidates[task['candidates']] = True
+        mask &= candidates
+    positions = np.flatnonzero(mask)
+    skills = cosine_similarity_matrix(jobs['skill'][positions], np.stack([task['skill'] for task in tasks]))
+    role = cosine_similarity_matrix(jobs['role'][positions], np.stack([task['role'] for task in tasks]))
+    results = []
+    for column, task in enumerate(tasks):
+        keep = np.isin(positions, task['candidates']) if task.get('candidates') is not None else slice(None)
+        score = role[keep, column]*task['role_weight'] + skills[keep, column]*(1-task['role_weight'])
+        rank = None
+        if task.get('lexical') is not None:
+            lexical_positions, lexical_scores = task['lexical']
+            matched = np.isin(positions[keep], lexical_positions)
+            lexical = np.zeros(score.size)
+            lexical[matched] = lexical_scores[np.searchsorted(lexical_positions, positions[keep][matched])]
+            rank = score*(1-task['lexical_weight']) + lexical*task['lexical_weight']
+        results.append({
+            'user_id': task['user_id'],
+            'positions': positions[keep],
+            'role_similarity': role[keep, column],
+            'skills_similarity': skills[keep, column],
+            'score': score,
+            'selected': top_k_indices(score, task['top_k'], task['threshold'], rank)
+        })
+    return results
+
+def score_user(task: dict, jobs: dict):
+    """
+    Score one user against the job matrices.
+
+    Args:
+        task (dict): User id, embeddings, filter criteria codes, english flag,
+            role_weight, threshold and top_k
+        jobs (dict): Job arrays (skill, role, codes, valid, english)
+
+    Returns:
+        dict: The positions of the filtered jobs with their role and skills similarities,
+        and the positions within them of the selected matches
+    """
+    return score_group([task], jobs)[0]
+
+def _attach_jobs(specs: dict):
+    """
+    Attach the job arrays placed in shared memory by the parent process.
+
+    The blocks are closed by _detach_jobs when the worker process exits.
+
+    Args:
+        specs (dict): Shared memory name, shape and dtype of every job array
+    """
+    for key, (name, shape, dtype) in specs.items():
+        block = shared_memory.SharedMemory(name=name)
+        _shared_blocks.append(block)
+        _shared_jobs[key] = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    Finalize(None, _detach_jobs, exitpriority=10)
+
+def _detach_jobs():
+    """
+    Drop the views of the shared job arrays and close their blocks.
+    """
+    _shared_jobs.clear()
+    while _shared_blocks:
+        _shared_blocks.pop().close()
+
+def _score_batch(batch: list):
+    """
+    Score a batch of users sharing a filter signature against the shared job arrays.
+
+    Args:
+        batch (list): Tasks of the users in the batch
+
+    Returns:
+        list: The results of the users in the same order
+    """
+    return score_group(batch, _shared_jobs)
+
+
+class Scorer():
+    """
+    A class for scoring user batches against the job matrices.
+
+    With more than one worker the job matrices and the knowledge filter index are
+    placed once in multiprocessing.shared_memory, and a process pool scores user
+    batches against them without pickling the job data to every worker.
+
+    Users are grouped by knowledge filter signature, so each group filters the
+    candidate jobs once and is scored with one matrix product. Results are returned
+    group by group, in order of first appearance of each signature and in task order
+    within a group, so the output does not depend on the number of workers.
+
+    Attributes:
+        workers (int): Number of worker processes, 1 scores serially
+        batch_size (int): Maximum number of users scored in one matrix product
+    """
+    def __init__(self, workers: int = None, batch_size: int = None):
+        """
+        Initialize the Scorer with the workers and batch size from settings.
+
+        Args:
+            workers (int): Number of worker processes, defaults to settings.MENTOR_WORKERS
+            batch_size (int): Users per batch, defaults to settings.MENTOR_BATCH_SIZE
+        """
+        self.workers = max(1, int(workers if workers is not None else settings.MENTOR_WORKERS))
+        self.batch_size = max(1, int(batch_size if batch_size is not None else settings.MENTOR_BATCH_SIZE))
+
+    def batches(self, tasks: list):
+        """
+        Group the tasks by filter signature and split the groups into batches.
+
+        Args:
+            tasks (list): Tasks of all users
+
+        Returns:
+            list: Lists of tasks sharing a signature with at most batch_size elements
+        """
+        groups = {}
+        for task in tasks:
+            groups.setdefault(signature(task), []).append(task)
+        logger.info(f'Grouped {len(tasks)} users into {len(groups)} filter signatures')
+        return [
+            group[start:start + self.batch_size]
+            for group in groups.values()
+            for start in range(0, len(group), self.batch_size)
+        ]
+
+    def score(self, tasks: list, jobs: dict):
+        """
+        Score every task against the job arrays.
+
+        Args:
+            tasks (list): Tasks of all users
+            jobs (dict): Job arrays (skill, role, codes, valid, english)
+
+        Yields:
+            dict: The result of every task, grouped by filter signature
+        """
+        start = time.time()
+        batches = self.batches(tasks)
+        if self.workers == 1 or len(batches) == 1:
+            for batch in batches:
+                yield from score_group(batch, jobs)
+        else:
+            yield from self._score_parallel(batches, jobs)
+        logger.info(f'Scored {len(tasks)} users with {self.workers} workers in {time.time() - start:.2f}s')
+
+    def _score_parallel(self, batches: list, jobs: dict):
+        """
+        Score the batches in a process pool sharing the job arrays.
+
+        Args:
+            batches (list): Lists of tasks sharing a filter signature
+            jobs (dict): Job arrays (skill, role, codes, valid, english)
+
+        Yields:
+            dict: The result of every task, in the order of the batches
+        """
+        blocks = []
+        try:
+            specs = {}
+            for key, array in jobs.items():
+                array = np.ascontiguousarray(array)
+                block = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+                blocks.append(block)
+                np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+                specs[key] = (block.name, array.shape, array.dtype.str)
+            logger.info(f'Shared {sum(block.size for block in blocks)} bytes of job data with {self.workers} workers')
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_attach_jobs,
+                initargs=(specs,)
+            ) as executor:
+                for results in executor.map(_score_batch, batches):
+                    yield from results
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
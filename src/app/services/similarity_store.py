@@ -0,0 +1,223 @@
+""" module to persist the raw similarity components of the matches """
+#base
+import os
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+from src.app.utils import top_k_indices
+
+
+class SimilarityStore():
+    """
+    A class for storing the role and skills similarities of every scored (user, job) pair.
+
+    Rows are keyed by the user and job embedding versions computed by the Mentor, so
+    a cached pair is only reused while both embeddings are unchanged. Keeping the raw
+    components lets a change of role_weight or similarity_threshold be applied with a
+    vectorized re-blend instead of a new scoring pass.
+
+    Components scored during a run can be streamed to disk batch by batch with
+    begin, append and commit, so the scoring pass never holds them all in memory.
+
+    Attributes:
+        path (str): Path of the parquet file holding the components
+        session (dict): The components being written by the current run, None outside a run
+    """
+    COLUMNS = ['user_id', 'job_id', 'user_version', 'job_version', 'role_similarity', 'skills_similarity']
+    SCHEMA = pa.schema([
+        ('user_id', pa.string()),
+        ('job_id', pa.string()),
+        ('user_version', pa.string()),
+        ('job_version', pa.string()),
+        ('role_similarity', pa.float32()),
+        ('skills_similarity', pa.float32())
+    ])
+
+    def __init__(self, path: str = None):
+        """
+        Initialize the SimilarityStore with the path from settings.
+
+        Args:
+            path (str): Parquet file path, defaults to settings.SIMILARITIES or a file next to the matches
+        """
+        self.path = path or settings.SIMILARITIES or f'{os.path.splitext(settings.MATCHES)[0]}_similarities.parquet'
+        self.session = None
+
+    def load(self, user_ids: list = None):
+        """
+        Load the stored components.
+
+        Args:
+            user_ids (list): Optional subset of users to load
+
+        Returns:
+            pd.DataFrame: Stored components, empty if nothing has been stored yet
+        """
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=self.COLUMNS)
+        filters = [('user_id', 'in', list(user_ids))] if user_ids is not None else None
+        df = pq.read_table(self.path, filters=filters).to_pandas()
+        for col in ['user_id', 'job_id', 'user_version', 'job_version']:
+            df[col] = df[col].astype(str)
+        return df
+
+    def valid(self, df: pd.DataFrame, state: dict):
+        """
+        Keep only the components whose user and job versions are still current.
+
+        Args:
+            df (pd.DataFrame): Stored components
+            state (dict): Current user and job versions
+
+        Returns:
+            pd.DataFrame: Components that can be reused
+        """
+        return df[
+            (df['user_version'] == df['user_id'].map(state['users'])) &
+            (df['job_version'] == df['job_id'].map(state['jobs']))
+        ].copy()
+
+    def update(self, df_components: pd.DataFrame, state: dict):
+        """
+        Merge freshly scored components into the store and drop stale ones.
+
+        Args:
+            df_components (pd.DataFrame): Components with user_id, job_id, role_similarity and skills_similarity
+            state (dict): Current user and job versions
+        """
+        try:
+            df_components = df_components.copy()
+            df_components['user_version'] = df_components['user_id'].map(state['users'])
+            df_components['job_version'] = df_components['job_id'].map(state['jobs'])
+            frames = [df_components[self.COLUMNS], self.valid(self.load(), state)]
+            df = pd.concat([frame for frame in frames if not frame.empty] or frames[:1])
+            df.drop_duplicates(
+                subset=['user_id', 'job_id'],
+                keep='first',
+                inplace=True,
+                ignore_index=True
+            )
+            df.dropna(subset=['user_version', 'job_version'], inplace=True)
+            df = df.astype({'role_similarity': np.float32, 'skills_similarity': np.float32})
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            pq.write_table(table, self.path, use_dictionary=['user_id', 'user_version'])
+            logger.info(f'Storing {len(df)} similarity components at {self.path}')
+        except Exception as e:
+            logger.error(f'Error storing similarity components: {e}')
+
+    def begin(self, state: dict):
+        """
+        Start streaming the components of a run to a temporary file.
+
+        Args:
+            state (dict): Current user and job versions
+        """
+        self.abort()
+        self.session = {'state': state, 'writer': None, 'users': {}, 'scopes': [], 'rows': 0}
+
+    def _write(self, df: pd.DataFrame):
+        """Append versioned components to the temporary file of the run as one row group."""
+        if self.session['writer'] is None:
+            self.session['writer'] = pq.ParquetWriter(
+                f'{self.path}.tmp',
+                self.SCHEMA,
+                use_dictionary=['user_id', 'user_version']
+            )
+        table = pa.Table.from_pandas(df[self.COLUMNS], schema=self.SCHEMA, preserve_index=False)
+        self.session['writer'].write_table(table)
+        self.session['rows'] += len(df)
+
+    def append(self, df_components: pd.DataFrame, job_ids: set = None):
+        """
+        Write freshly scored components of the run, doing nothing outside a run.
+
+        Args:
+            df_components (pd.DataFrame): Components with user_id, job_id, role_similarity and skills_similarity
+            job_ids (set): Jobs the users were scored against, None when they were scored against every job
+        """
+        if self.session is None or df_components.empty:
+            return
+        state = self.session['state']
+        df = df_components.assign(
+            user_version=df_components['user_id'].map(state['users']),
+            job_version=df_components['job_id'].map(state['jobs'])
+        ).dropna(subset=['user_version', 'job_version'])
+        scopes = self.session['scopes']
+        if job_ids is None:
+            scope = -1
+        else:
+            scope = next((position for position, scope in enumerate(scopes) if scope is job_ids), len(scopes))
+            if scope == len(scopes):
+                scopes.append(job_ids)
+        for user_id in df_components['user_id'].unique():
+            self.session['users'][user_id] = scope
+        self._write(df)
+
+    def commit(self):
+        """
+        Merge the components written by the run into the store.
+
+        The stored components that are still current and were not rescored by the
+        run are copied after the new ones, one row group at a time, and the
+        temporary file then replaces the store. Nothing is rewritten when the run
+        scored nothing.
+        """
+        session = self.session
+        if session is None:
+            return
+        try:
+            if session['writer'] is None:
+                return
+            if os.path.exists(self.path):
+                for batch in pq.ParquetFile(self.path).iter_batches():
+                    df = self.valid(batch.to_pandas(), session['state'])
+                    scopes = df['user_id'].map(session['users'])
+                    rescored = scopes.eq(-1)
+                    for position, job_ids in enumerate(session['scopes']):
+                        rescored |= scopes.eq(position) & df['job_id'].isin(job_ids)
+                    df = df[~rescored]
+                    if not df.empty:
+                        self._write(df)
+            session['writer'].close()
+            session['writer'] = None
+            os.replace(f'{self.path}.tmp', self.path)
+            logger.info(f'Storing {session["rows"]} similarity components at {self.path}')
+        finally:
+            self.abort()
+
+    def abort(self):
+        """Discard the components written by the current run, if any."""
+        session, self.session = self.session, None
+        if session is None:
+            return
+        if session['writer'] is not None:
+            session['writer'].close()
+        if os.path.exists(f'{self.path}.tmp'):
+            os.remove(f'{self.path}.tmp')
+
+    @staticmethod
+    def blend(df: pd.DataFrame, role_weight: float, threshold: float = None, top_k: int = 0):
+        """
+        Blend the role and skills similarities into a score and select the best jobs.
+
+        Args:
+            df (pd.DataFrame): Components of a single user
+            role_weight (float): Weight of the role similarity
+            threshold (float): Optional minimum score to keep a job
+            top_k (int): Maximum number of jobs to keep, 0 keeps every job
+
+        Returns:
+            pd.DataFrame: job_id and score of the selected jobs
+        """
+        role = np.round(df['role_similarity'].to_numpy(dtype=np.float64), 4)
+        skills = np.round(df['skills_similarity'].to_numpy(dtype=np.float64), 4)
+        score = role * role_weight + skills * (1 - role_weight)
+        keep = top_k_indices(score, top_k, threshold)
+        return pd.DataFrame({'job_id': df['job_id'].to_numpy()[keep], 'score': score[keep]})
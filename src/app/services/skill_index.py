@@ -0,0 +1,105 @@
+""" module to generate candidate jobs from the skills they share with a user """
+#base
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import numpy as np
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+
+
+class SkillIndex():
+    """
+    An inverted index from skill to the positions of the jobs requiring it.
+
+    The index is built from the skills extracted by the Preprocesor. A user's
+    candidate jobs are the ones sharing at least min_shared skills with the user
+    and, when min_jaccard is set, with a Jaccard similarity between both skill
+    sets of at least min_jaccard. Only candidates are scored.
+
+    Attributes:
+        min_shared (int): Minimum number of shared skills, 0 disables the condition
+        min_jaccard (float): Minimum Jaccard similarity, 0 disables the condition
+        index (dict): Job positions indexed by skill
+        sizes (np.ndarray): Number of distinct skills of every job
+    """
+    def __init__(self, min_shared: int = None, min_jaccard: float = None):
+        """
+        Initialize the SkillIndex with the thresholds from settings.
+
+        Args:
+            min_shared (int): Defaults to settings.MATCHES_MIN_SHARED_SKILLS
+            min_jaccard (float): Defaults to settings.MATCHES_MIN_SKILL_JACCARD
+        """
+        self.min_shared = int(min_shared if min_shared is not None else settings.MATCHES_MIN_SHARED_SKILLS)
+        self.min_jaccard = float(min_jaccard if min_jaccard is not None else settings.MATCHES_MIN_SKILL_JACCARD)
+        self.index = {}
+        self.sizes = np.zeros(0, dtype=np.int32)
+
+    @property
+    def enabled(self):
+        """bool: True when candidate generation is configured."""
+        return self.min_shared > 0 or self.min_jaccard > 0
+
+    @staticmethod
+    def normalize(skills):
+        """
+        Normalize a list of skills.
+
+        Args:
+            skills (list): Skills as written by the user or extracted from a description
+
+        Returns:
+            set: Lowercase skills without surrounding spaces
+        """
+        if not isinstance(skills, (list, tuple, set, np.ndarray)):
+            return set()
+        return {str(skill).strip().lower() for skill in skills if str(skill).strip()}
+
+    def build(self, job_skills):
+        """
+        Build the index from the skills of every job.
+
+        Args:
+            job_skills (list): Skills of every job, in the order of the job matrices
+
+        Returns:
+            SkillIndex: The built index
+        """
+        positions = {}
+        sizes = np.zeros(len(job_skills), dtype=np.int32)
+        for position, skills in enumerate(job_skills):
+            skills = self.normalize(skills)
+            sizes[position] = len(skills)
+            for skill in skills:
+                positions.setdefault(skill, []).append(position)
+        self.index = {skill: np.array(jobs, dtype=np.int32) for skill, jobs in positions.items()}
+        self.sizes = sizes
+        logger.info(f'Indexed {len(self.index)} skills over {len(sizes)} jobs')
+        return self
+
+    def candidates(self, skills):
+        """
+        Get the candidate jobs of a user.
+
+        Args:
+            skills (list): The user's skills
+
+        Returns:
+            np.ndarray: Sorted positions of the candidate jobs, or None when the user has
+            no skills and every job has to be scored
+        """
+        skills = self.normalize(skills)
+        if not skills:
+            return None
+        postings = [self.index[skill] for skill in skills if skill in self.index]
+        if not postings:
+            return np.zeros(0, dtype=np.int32)
+        shared = np.bincount(np.concatenate(postings), minlength=self.sizes.size)
+        keep = shared >= max(1, self.min_shared)
+        if self.min_jaccard > 0:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                jaccard = shared / (len(skills) + self.sizes - shared)
+            keep &= jaccard >= self.min_jaccard
+        return np.flatnonzero(keep).astype(np.int32)
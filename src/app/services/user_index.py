@@ -0,0 +1,101 @@
+""" module to find the users a new job offer should be pushed to """
+#base
+import logging
+logger = logging.getLogger('Jobbot')
+# vector management
+import numpy as np
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+from src.app.utils import cosine_similarity_matrix
+
+
+class UserIndex():
+    """
+    A reverse index from job attributes to the users whose filters accept them.
+
+    For every knowledge filter column the index keeps one bitmap over the users per
+    accepted value, next to the user role and skill matrices, role weights and
+    thresholds. Matching a job intersects a handful of bitmaps and scores only the
+    eligible users, so a batch of new jobs costs in proportion to the batch size
+    instead of a full users x jobs pass.
+
+    Attributes:
+        user_ids (np.ndarray): Ids of the indexed users
+        skill (np.ndarray): User skill matrix
+        role (np.ndarray): User role matrix
+        role_weight (np.ndarray): Role weight of every user
+        threshold (np.ndarray): Similarity threshold of every user
+        english (np.ndarray): Whether every user accepts English job offers
+        bitmaps (dict): For each filter column, a bitmap over the users per accepted value
+    """
+    COLUMNS = ['seniority', 'location', 'work_modality_english', 'remote']
+
+    def __init__(self, user_ids, skill, role, records):
+        """
+        Build the index.
+
+        Args:
+            user_ids (list): Ids of the users, in the order of the matrices
+            skill (np.ndarray): User skill matrix
+            role (np.ndarray): User role matrix
+            records (list): UserRecord of every user, in the same order
+        """
+        self.user_ids = np.asarray(user_ids, dtype=object)
+        self.skill = skill
+        self.role = role
+        self.role_weight = np.array([record.role_weight for record in records], dtype=np.float64)
+        self.threshold = np.array([record.similarity_threshold for record in records], dtype=np.float64)
+        self.english = np.array([record.english for record in records], dtype=bool)
+        self.bitmaps = {column: {} for column in self.COLUMNS}
+        for position, record in enumerate(records):
+            for column, values in record.criteria().items():
+                for value in values:
+                    if value not in self.bitmaps[column]:
+                        self.bitmaps[column][value] = np.zeros(len(records), dtype=bool)
+                    self.bitmaps[column][value][position] = True
+        logger.info(f'Indexed {len(records)} users for push matching')
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def eligible(self, job: dict, english: bool = False):
+        """
+        Get the users whose knowledge filter accepts a job.
+
+        Args:
+            job (dict): Job offer with the filter columns
+            english (bool): Whether the job description is in English
+
+        Returns:
+            np.ndarray: Positions of the eligible users
+        """
+        mask = self.english.copy() if english else np.ones(len(self), dtype=bool)
+        for column in self.COLUMNS:
+            bitmap = self.bitmaps[column].get(job.get(column))
+            if bitmap is None:
+                return np.zeros(0, dtype=np.int64)
+            mask = mask & bitmap
+        return np.flatnonzero(mask)
+
+    def match(self, job: dict, skill, role, english: bool = False):
+        """
+        Score a job against its eligible users.
+
+        Args:
+            job (dict): Job offer with the filter columns
+            skill (np.ndarray): Skill vector of the job
+            role (np.ndarray): Role vector of the job
+            english (bool): Whether the job description is in English
+
+        Returns:
+            tuple: Ids of the users whose threshold the job clears, their role and skills
+            similarities and their scores
+        """
+        users = self.eligible(job, english)
+        role_similarity = cosine_similarity_matrix(self.role[users], role)
+        skills_similarity = cosine_similarity_matrix(self.skill[users], skill)
+        score = role_similarity*self.role_weight[users] + skills_similarity*(1-self.role_weight[users])
+        with np.errstate(invalid='ignore'):
+            keep = score >= self.threshold[users]
+        return self.user_ids[users][keep], role_similarity[keep], skills_similarity[keep], score[keep]
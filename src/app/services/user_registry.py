@@ -0,0 +1,240 @@
+""" module to load the job seekers profiles once per run """
+#base
+import os
+import logging
+logger = logging.getLogger('Jobbot')
+# repo imports
+from src.app.settings import Settings
+settings = Settings()
+from src.app.utils import open_json
+
+
+def parse_bool(value):
+    """
+    Parse a boolean stored as a bool or as a 'True'/'False' string.
+
+    Args:
+        value (bool or str): The value to parse
+
+    Returns:
+        bool: The parsed value
+
+    Raises:
+        ValueError: If the value is not a boolean
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ('true', 'false'):
+        return value.strip().lower() == 'true'
+    raise ValueError(f"Invalid boolean value: {value}")
+
+
+class UserRecord():
+    """
+    A compact, validated job seeker profile.
+
+    Attributes:
+        user_id (str): The user id
+        seniority (tuple): Accepted seniority levels
+        location (tuple): Accepted locations
+        work_modality_english (tuple): Accepted work modalities
+        remote (tuple): Accepted remote values as booleans
+        english (bool): Whether English job offers are accepted
+        role_weight (float): Weight of the role similarity in the score
+        similarity_threshold (float): Minimum score of a match
+        skills (tuple): Lowercase skills of the user
+        job_titles (tuple): Job titles searched by the user
+    """
+    __slots__ = (
+        'user_id',
+        'seniority',
+        'location',
+        'work_modality_english',
+        'remote',
+        'english',
+        'role_weight',
+        'similarity_threshold',
+        'skills',
+        'job_titles'
+    )
+
+    def __init__(self, user_id, seniority, location, work_modality_english, remote, english, role_weight, similarity_threshold, skills=(), job_titles=()):
+        self.user_id = user_id
+        self.seniority = seniority
+        self.location = location
+        self.work_modality_english = work_modality_english
+        self.remote = remote
+        self.english = english
+        self.role_weight = role_weight
+        self.similarity_threshold = similarity_threshold
+        self.skills = skills
+        self.job_titles = job_titles
+
+    @classmethod
+    def from_dict(cls, user: dict):
+        """
+        Build a record from a job seeker profile.
+
+        Args:
+            user (dict): A profile from the job seekers file
+
+        Returns:
+            UserRecord: The validated record
+
+        Raises:
+            ValueError: If a field is missing or invalid
+        """
+        try:
+            role_weight = float(user['role_weight'])
+            if not 0 <= role_weight <= 1:
+                raise ValueError(f"role_weight must be between 0 and 1, got {role_weight}")
+            return cls(
+                user_id=str(user['user_id']),
+                seniority=tuple(user['seniority']),
+                location=tuple(user['location']),
+                work_modality_english=tuple(user['work_modality_english']),
+                remote=tuple(parse_bool(val) for val in user['remote']),
+                english=parse_bool(user['english']),
+                role_weight=role_weight,
+                similarity_threshold=float(user['similarity_threshold']),
+                skills=tuple(str(skill).strip().lower() for skill in user.get('skills') or []),
+                job_titles=tuple(str(title) for title in user.get('job_titles') or [])
+            )
+        except KeyError as e:
+            raise ValueError(f"Missing field {e} for user {user.get('user_id')}") from e
+
+    def criteria(self):
+        """
+        Get the knowledge filter criteria of the user.
+
+        Returns:
+            dict: Accepted values indexed by job offer column
+        """
+        return {
+            'seniority': list(self.seniority),
+            'location': list(self.location),
+            'work_modality_english': list(self.work_modality_english),
+            'remote': list(self.remote)
+        }
+
+    def profile(self):
+        """
+        Get the fields of the user that take part in the knowledge filter.
+
+        Returns:
+            list: seniority, location, work_modality_english, remote and english
+        """
+        return [*self.criteria().values(), self.english]
+
+    def query(self):
+        """
+        Get the free text query describing the jobs the user looks for.
+
+        Returns:
+            str: The job titles and skills of the user
+        """
+        return ' '.join([*self.job_titles, *self.skills])
+
+    def __repr__(self):
+        return f'UserRecord({self.user_id})'
+
+
+class UserRegistry():
+    """
+    A class holding the validated job seekers indexed by user_id.
+
+    The job seekers file is parsed once and kept in memory until the file changes,
+    so repeated lookups during a run are dictionary accesses instead of scans and
+    literal evaluations over the raw profiles. Invalid profiles are logged and left
+    out of the registry.
+
+    Attributes:
+        path (str): Path of the job seekers file
+        users (dict): UserRecord indexed by user_id
+    """
+    def __init__(self, path: str = None):
+        """
+        Initialize the UserRegistry with the job seekers path from settings.
+
+        Args:
+            path (str): Job seekers file, defaults to settings.JOB_SEEKERS
+        """
+        self.path = path or settings.JOB_SEEKERS
+        self.users = {}
+        self._signature = None
+
+    def load(self, path: str = None):
+        """
+        Load the job seekers file, unless it was already loaded and has not changed.
+
+        Args:
+            path (str): Optional job seekers file replacing the current path
+
+        Returns:
+            UserRegistry: The loaded registry
+        """
+        self.path = path or self.path
+        try:
+            stat = os.stat(self.path)
+            signature = (self.path, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            signature = None
+        if signature is not None and signature == self._signature:
+            return self
+        users = {}
+        for user in open_json(self.path) or []:
+            try:
+                record = UserRecord.from_dict(user)
+                users[record.user_id] = record
+            except (ValueError, TypeError) as e:
+                logger.error(f"Skipping invalid job seeker profile: {e}")
+        self.users = users
+        self._signature = signature
+        logger.info(f'Loaded {len(users)} job seekers from {self.path}')
+        return self
+
+    def signature(self):
+        """
+        Get the version of the loaded job seekers file.
+
+        Returns:
+            tuple: The path, modification time and size of the loaded file, None if it could not be read
+        """
+        return self._signature
+
+    def get(self, user_id: str):
+        """
+        Get the record of a user.
+
+        Args:
+            user_id (str): The user id
+
+        Returns:
+            UserRecord: The record, or None if the user is not registered
+        """
+        return self.users.get(user_id)
+
+    def locations(self, user_ids: list = None):
+        """
+        Get the locations accepted by some users.
+
+        Args:
+            user_ids (list): Optional subset of users, all users by default
+
+        Returns:
+            set: The union of their location criteria
+        """
+        users = self.users.values() if user_ids is None else [self.users[user_id] for user_id in user_ids if user_id in self.users]
+        return {location for user in users for location in user.location}
+
+    def __getitem__(self, user_id: str):
+        return self.users[user_id]
+
+    def __contains__(self, user_id: str):
+        return user_id in self.users
+
+    def __iter__(self):
+        return iter(self.users.values())
+
+    def __len__(self):
+        return len(self.users)
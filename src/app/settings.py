@@ -26,6 +26,34 @@ class Settings:
     MAX_RETRIES = os.environ["MAX_RETRIES"]
     SKILLS = os.environ["SKILLS"]
     BASE_URL = os.environ["BASE_URL"]
+    # optional tuning knobs
+    EMBEDDING_DTYPE = os.environ.get("EMBEDDING_DTYPE", "float64")
+    EMBEDDING_PROJECTION = os.environ.get("EMBEDDING_PROJECTION", "none")
+    EMBEDDING_PROJECTION_DIM = os.environ.get("EMBEDDING_PROJECTION_DIM", "0")
+    MATCHING_MODE = os.environ.get("MATCHING_MODE", "full")
+    MATCHES_STATE = os.environ.get("MATCHES_STATE", "")
+    SIMILARITIES = os.environ.get("SIMILARITIES", "")
+    MATCHES_TOP_K = os.environ.get("MATCHES_TOP_K", "0")
+    MATCHES_THRESHOLD_FALLBACK = os.environ.get("MATCHES_THRESHOLD_FALLBACK", "True")
+    MENTOR_WORKERS = os.environ.get("MENTOR_WORKERS", "1")
+    MENTOR_BATCH_SIZE = os.environ.get("MENTOR_BATCH_SIZE", "64")
+    MATCHES_MIN_SHARED_SKILLS = os.environ.get("MATCHES_MIN_SHARED_SKILLS", "0")
+    MATCHES_MIN_SKILL_JACCARD = os.environ.get("MATCHES_MIN_SKILL_JACCARD", "0")
+    LEXICAL_INDEX = os.environ.get("LEXICAL_INDEX", "")
+    DESCRIPTIONS = os.environ.get("DESCRIPTIONS", "")
+    DESCRIPTIONS_MAX_PARTS = os.environ.get("DESCRIPTIONS_MAX_PARTS", "8")
+    JOB_IDS = os.environ.get("JOB_IDS", "")
+    PREPROCESSING_MODE = os.environ.get("PREPROCESSING_MODE", "full")
+    PREPROCESS_STATE = os.environ.get("PREPROCESS_STATE", "")
+    PREPROCESS_WORKERS = os.environ.get("PREPROCESS_WORKERS", "1")
+    PREPROCESS_CHUNK_SIZE = os.environ.get("PREPROCESS_CHUNK_SIZE", "10000")
+    PREPROCESS_ENGINE = os.environ.get("PREPROCESS_ENGINE", "pandas")
+    RAW_ARCHIVE = os.environ.get("RAW_ARCHIVE", "")
+    EXPIRER_CONCURRENCY = os.environ.get("EXPIRER_CONCURRENCY", "1")
+    EXPIRER_HOST_RATE = os.environ.get("EXPIRER_HOST_RATE", "0")
+    NEAR_DUPLICATE_THRESHOLD = os.environ.get("NEAR_DUPLICATE_THRESHOLD", "0")
+    MATCHES_LEXICAL_TOP_N = os.environ.get("MATCHES_LEXICAL_TOP_N", "0")
+    MATCHES_LEXICAL_WEIGHT = os.environ.get("MATCHES_LEXICAL_WEIGHT", "0.2")
 
     @staticmethod
     def get_embedder():
@@ -3,6 +3,9 @@
 import os
 import json
 import re
+import glob
+import shutil
+from urllib.parse import quote, unquote
 import logging
 logger = logging.getLogger('Jobbot')
 from datetime import datetime
@@ -10,6 +13,7 @@ from datetime import datetime
 import numpy as np
 import pandas as pd
 import pyarrow as pa
+import pyarrow.compute as pc
 import pyarrow.parquet as pq
 # NLP
 from nltk.corpus import words
@@ -55,6 +59,449 @@ def open_json(pathfile: str):
         logger.error(f'Error reading JSON file: {e}')
         return None
 
+def _is_ndjson(pathfile: str):
+    """Check if a path points to a newline delimited JSON file."""
+    return str(pathfile).endswith(('.ndjson', '.jsonl'))
+
+def save_records(pathfile: str, batches):
+    """
+    Stream batches of dictionaries to a JSON or NDJSON file.
+
+    Records are written as they arrive, so only one batch is held in memory. Files
+    ending in .ndjson or .jsonl get one record per line, any other file a JSON list.
+    The file is written under a temporary name and moved in place at the end, so
+    readers never see a partial file.
+
+    Args:
+        pathfile (str): The path to the JSON or NDJSON file.
+        batches: An iterable of lists of dictionaries.
+
+    Returns:
+        int: The number of records written, or None if an error occurred.
+    """
+    tmp_pathfile = f'{pathfile}.tmp'
+    try:
+        ndjson = _is_ndjson(pathfile)
+        count = 0
+        with open(tmp_pathfile, 'w') as file:
+            if not ndjson:
+                file.write('[')
+            for batch in batches:
+                for record in batch:
+                    if ndjson:
+                        file.write(json.dumps(record) + '\n')
+                    else:
+                        file.write((', ' if count else '') + json.dumps(record))
+                    count += 1
+            if not ndjson:
+                file.write(']')
+        os.replace(tmp_pathfile, pathfile)
+        logger.info(f'Storing {count} records at: {pathfile}')
+        return count
+    except Exception as e:
+        logger.error(f'Error storing records file: {e}')
+        if os.path.exists(tmp_pathfile):
+            os.remove(tmp_pathfile)
+        return None
+
+def iter_records(pathfile: str):
+    """
+    Iterate over the dictionaries stored in a JSON or NDJSON file.
+
+    NDJSON files are read line by line, JSON files are loaded at once.
+
+    Args:
+        pathfile (str): The path to the JSON or NDJSON file.
+
+    Yields:
+        dict: The stored records.
+    """
+    if _is_ndjson(pathfile):
+        with open(pathfile, 'r') as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(pathfile, 'r') as file:
+            yield from json.load(file)
+
+def open_records(pathfile: str):
+    """
+    Open and load a JSON or NDJSON file.
+
+    Args:
+        pathfile (str): The path to the JSON or NDJSON file.
+
+    Returns:
+        list: The loaded records, or None if an error occurred.
+    """
+    try:
+        logger.info(f'Reading file at: {pathfile}')
+        return list(iter_records(pathfile))
+    except Exception as e:
+        logger.error(f'Error reading records file: {e}')
+        return None
+
+CATEGORICAL_COLUMNS = [
+    'seniority',
+    'location',
+    'work_modality_english',
+    'company',
+    'country',
+    'query_keyword',
+    'industries',
+    'job_function'
+]
+
+def categorize(df: pd.DataFrame):
+    """
+    Dictionary encode the low-cardinality job columns as pandas categoricals.
+
+    Args:
+        df (pd.DataFrame): Job offers
+
+    Returns:
+        pd.DataFrame: The job offers with the CATEGORICAL_COLUMNS present as categoricals.
+    """
+    columns = [
+        column for column in CATEGORICAL_COLUMNS
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype)
+    ]
+    if columns:
+        df = df.astype({column: 'category' for column in columns})
+    return df
+
+def table_to_frame(table: pa.Table):
+    """
+    Convert an Arrow table to a dataframe with python lists in the list columns.
+
+    Dictionary columns become pandas categoricals.
+
+    Args:
+        table (pa.Table): The table to convert.
+
+    Returns:
+        pd.DataFrame: The converted dataframe.
+    """
+    df = table.to_pandas()
+    for field in table.schema:
+        if pa.types.is_list(field.type) or pa.types.is_large_list(field.type):
+            df[field.name] = table.column(field.name).to_pylist()
+    return df
+
+PARTITION_COLUMNS = ['publication_date', 'location']
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+PARTITION_FILE = 'part.parquet'
+
+def is_partitioned(pathfile: str):
+    """Check if a path points to a partitioned directory of parquet files, a path without extension."""
+    return not os.path.splitext(str(pathfile).rstrip('/'))[1]
+
+def list_partitions(path: str, filters: list = None, columns: list = None):
+    """
+    List the partitions of a partitioned table, most recent first.
+
+    Partitions are nested column=value directories over the partition columns, so
+    filters prune them from their names without opening any file.
+
+    Args:
+        path (str): The partitioned table directory.
+        filters (list): (column, op, value) tuples with op '>=', '==' or 'in'.
+        columns (list): The partition columns, defaults to PARTITION_COLUMNS.
+
+    Returns:
+        dict: The partition values indexed by the partition directory, relative to path.
+    """
+    partitions = {}
+    pattern = os.path.join(path, *['*=*'] * len(columns or PARTITION_COLUMNS), PARTITION_FILE)
+    for pathfile in sorted(glob.glob(pattern), reverse=True):
+        directory = os.path.relpath(os.path.dirname(pathfile), path)
+        values = {}
+        for name in directory.split(os.sep):
+            column, value = name.split('=', 1)
+            values[column] = None if value == NULL_PARTITION else unquote(value)
+        if all(_accepts(values.get(column), op, value) for column, op, value in filters or [] if column in values):
+            partitions[directory] = values
+    return partitions
+
+def _accepts(partition_value, op: str, value):
+    """Check a partition value against a filter."""
+    if op == '>=':
+        return partition_value is not None and partition_value >= value
+    if op == '==':
+        return partition_value == value
+    if op == 'in':
+        return partition_value in value
+    raise ValueError(f"Unsupported partition filter operator: {op}")
+
+def partition_directory(values: tuple, columns: list = None):
+    """Get the directory of the partition holding some values of the partition columns, PARTITION_COLUMNS by default."""
+    return os.path.join(*[
+        f'{column}={NULL_PARTITION if pd.isna(value) else quote(str(value), safe="")}'
+        for column, value in zip(columns or PARTITION_COLUMNS, values)
+    ])
+
+def _group_partitions(df: pd.DataFrame):
+    """Split job offers by partition, yielding the directory and the rows of every partition."""
+    keys = [
+        df[column].astype(object) if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+        for column in PARTITION_COLUMNS
+    ]
+    for values, df_partition in df.groupby(keys, dropna=False, sort=False):
+        yield partition_directory(values if isinstance(values, tuple) else (values,)), df_partition
+
+def _read_partition(path: str, directory: str, columns: list = None):
+    """Read the parquet file of a partition with its dictionary columns decoded, keeping the existing columns."""
+    pathfile = os.path.join(path, directory, PARTITION_FILE)
+    if columns is not None:
+        names = pq.read_schema(pathfile).names
+        columns = [column for column in columns if column in names]
+    table = pq.read_table(pathfile, columns=columns, partitioning=None)
+    return table.cast(pa.schema([
+        field.with_type(field.type.value_type) if pa.types.is_dictionary(field.type) else field
+        for field in table.schema
+    ]))
+
+def _write_partition(path: str, directory: str, df: pd.DataFrame):
+    """Write the rows of a partition, replacing its parquet file."""
+    pathfile = os.path.join(path, directory, PARTITION_FILE)
+    os.makedirs(os.path.dirname(pathfile), exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(categorize(df), preserve_index=False), f'{pathfile}.tmp')
+    os.replace(f'{pathfile}.tmp', pathfile)
+
+def _remove_partition(path: str, directory: str):
+    """Remove a partition and the parent directories it leaves empty."""
+    shutil.rmtree(os.path.join(path, directory))
+    parent = os.path.dirname(directory)
+    while parent and not os.listdir(os.path.join(path, parent)):
+        os.rmdir(os.path.join(path, parent))
+        parent = os.path.dirname(parent)
+
+def save_partitions(path: str, df: pd.DataFrame):
+    """
+    Save the job offers to a directory partitioned by PARTITION_COLUMNS.
+
+    Every partition holding rows is rewritten and partitions without rows are
+    dropped, see append_partitions to only touch the partitions receiving rows.
+
+    Args:
+        path (str): The partitioned table directory.
+        df (pd.DataFrame): The job offers to save.
+    """
+    try:
+        os.makedirs(path, exist_ok=True)
+        stored = list_partitions(path)
+        keep = set()
+        for directory, df_partition in _group_partitions(df):
+            _write_partition(path, directory, df_partition)
+            keep.add(directory)
+        for directory in set(stored) - keep:
+            _remove_partition(path, directory)
+        logger.info(f'Storing {len(keep)} and dropping {len(set(stored) - keep)} partitions at: {path}')
+    except Exception as e:
+        logger.error(f'Error storing partitioned table: {e}')
+
+def append_partitions(path: str, df: pd.DataFrame, removed: pd.DataFrame = None, since: str = ''):
+    """
+    Append job offers to a directory partitioned by PARTITION_COLUMNS.
+
+    Only the partitions receiving rows or holding removed rows are read and
+    rewritten, where the new rows replace the stored rows with the same job_id.
+    Partitions published before since are dropped by their directory name,
+    without being opened.
+
+    Args:
+        path (str): The partitioned table directory.
+        df (pd.DataFrame): The job offers to append.
+        removed (pd.DataFrame): Stored job offers to drop, with job_id and the partition columns.
+        since (str): Oldest publication date to keep, YYYY-MM-DD, every partition is kept when empty.
+
+    Returns:
+        int: The number of partitions rewritten, or None if an error occurred.
+    """
+    try:
+        os.makedirs(path, exist_ok=True)
+        stored = list_partitions(path)
+        appended = dict(_group_partitions(df))
+        dropped = {}
+        if removed is not None:
+            dropped = {directory: set(df_removed['job_id']) for directory, df_removed in _group_partitions(removed)}
+        written = 0
+        for directory in set(appended) | set(dropped):
+            df_partition = appended.get(directory, pd.DataFrame())
+            if directory in stored:
+                df_stored = table_to_frame(_read_partition(path, directory))
+                job_ids = dropped.get(directory, set()) | set(df_partition.get('job_id', []))
+                df_stored = df_stored[~df_stored['job_id'].isin(job_ids)]
+                df_partition = pd.concat([frame for frame in [df_stored, df_partition] if not frame.empty] or [df_stored])
+            elif df_partition.empty:
+                continue
+            if df_partition.empty:
+                _remove_partition(path, directory)
+            else:
+                _write_partition(path, directory, df_partition)
+            written += 1
+        expired = [
+            directory for directory, values in stored.items()
+            if since and not _accepts(values.get('publication_date'), '>=', since)
+            and os.path.isdir(os.path.join(path, directory))
+        ]
+        for directory in expired:
+            _remove_partition(path, directory)
+        logger.info(f'Appending {len(df)} rows to {written} partitions and dropping {len(expired)} expired partitions at: {path}')
+        return written
+    except Exception as e:
+        logger.error(f'Error appending to partitioned table: {e}')
+        return None
+
+def open_partitions(path: str, filters: list = None, columns: list = None):
+    """
+    Open the job offers stored in a partitioned directory, reading only the partitions the filters accept.
+
+    Args:
+        path (str): The partitioned table directory.
+        filters (list): (column, op, value) tuples with op '>=', '==' or 'in'.
+        columns (list): Columns to read, every column by default.
+
+    Returns:
+        pd.DataFrame: The job offers with the low-cardinality columns as categoricals,
+        or None if an error occurred.
+    """
+    try:
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f'No partitioned table at {path}')
+        partitions = list_partitions(path, filters)
+        logger.info(f'Reading {len(partitions)} partitions at: {path}')
+        if not partitions:
+            return pd.DataFrame(columns=columns) if columns else pd.DataFrame()
+        tables = [_read_partition(path, directory, columns) for directory in partitions]
+        return categorize(table_to_frame(pa.concat_tables(tables, promote_options='permissive')))
+    except Exception as e:
+        logger.error(f'Error reading partitioned table: {e}')
+        return None
+
+def recent_cutoff(days: int = 7):
+    """
+    Get the first publication date of the window, at midnight.
+
+    Args:
+        days (int): Days in the window.
+
+    Returns:
+        pd.Timestamp: Oldest publication date kept, so the whole day is in the window.
+    """
+    return pd.Timestamp.now().normalize() - pd.Timedelta(days=days)
+
+def recent_filters(days: int = 7):
+    """
+    Get the partition filters of the publication window.
+
+    Args:
+        days (int): Days in the window.
+
+    Returns:
+        list: Filters accepting the publication dates of the last days.
+    """
+    return [('publication_date', '>=', recent_cutoff(days).strftime('%Y-%m-%d'))]
+
+def location_filters(locations=None):
+    """
+    Get the partition filters of some locations.
+
+    Args:
+        locations (iterable): Accepted locations, None accepts every location.
+
+    Returns:
+        list: Filters accepting the locations.
+    """
+    return [] if locations is None else [('location', 'in', sorted({str(location) for location in locations}))]
+
+def save_clustered(pathfile: str, table: pa.Table, column: str):
+    """
+    Save a parquet file with one row group per value of a column.
+
+    The statistics of every row group then hold a single value, so readers
+    filtering on the column skip the row groups of the other values.
+
+    Args:
+        pathfile (str): The path to the parquet file.
+        table (pa.Table): The table to save.
+        column (str): The clustering column.
+    """
+    if column not in table.column_names or not table.num_rows:
+        return pq.write_table(table, pathfile)
+    table = table.take(pc.sort_indices(table, sort_keys=[(column, 'ascending')]))
+    codes = pd.factorize(table.column(column).to_numpy(zero_copy_only=False))[0]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    with pq.ParquetWriter(pathfile, table.schema) as writer:
+        for start, end in zip(starts, np.r_[starts[1:], table.num_rows]):
+            writer.write_table(table.slice(start, end - start))
+
+def save_table(pathfile: str, df: pd.DataFrame):
+    """
+    Save the job offers to a JSON file, a parquet file or a partitioned directory.
+
+    The low-cardinality columns are dictionary encoded, which parquet files keep
+    on disk as Arrow dictionary arrays. A path without extension is a directory
+    partitioned by publication date and location, see save_partitions. Any
+    other file gets a JSON list.
+
+    Args:
+        pathfile (str): The path to the JSON file, parquet file or directory.
+        df (pd.DataFrame): The job offers to save.
+    """
+    if is_partitioned(pathfile):
+        return save_partitions(pathfile, df)
+    if not str(pathfile).endswith('.parquet'):
+        return save_json(pathfile, df.to_dict(orient='records'))
+    try:
+        tmp_pathfile = f'{pathfile}.tmp'
+        pq.write_table(pa.Table.from_pandas(categorize(df), preserve_index=False), tmp_pathfile)
+        os.replace(tmp_pathfile, pathfile)
+        logger.info(f'Storing file at: {pathfile}')
+    except Exception as e:
+        logger.error(f'Error storing parquet file: {e}')
+
+def open_table(pathfile: str, filters: list = None, columns: list = None):
+    """
+    Open the job offers stored in a JSON file, a parquet file or a partitioned directory.
+
+    Args:
+        pathfile (str): The path to the JSON file, parquet file or directory.
+        filters (list): Partition filters, only applied to partitioned directories.
+        columns (list): Columns to read, only applied to partitioned directories.
+
+    Returns:
+        pd.DataFrame: The job offers with the low-cardinality columns as categoricals,
+        or None if an error occurred.
+    """
+    if is_partitioned(pathfile):
+        return open_partitions(pathfile, filters, columns)
+    if not str(pathfile).endswith('.parquet'):
+        list_dicts = open_json(pathfile)
+        return categorize(pd.DataFrame(list_dicts)) if list_dicts is not None else None
+    try:
+        logger.info(f'Reading file at: {pathfile}')
+        return table_to_frame(pq.read_table(pathfile))
+    except Exception as e:
+        logger.error(f'Error reading parquet file: {e}')
+        return None
+
+def isin_codes(values: pd.Series, criteria):
+    """
+    Check which values are among the criteria comparing integer category codes.
+
+    Args:
+        values (pd.Series): Categorical or plain values.
+        criteria (list): Accepted values.
+
+    Returns:
+        np.ndarray: True for the values among the criteria.
+    """
+    values = values.astype('category')
+    accepted = values.cat.categories.get_indexer(pd.Index(list(criteria), dtype=object))
+    return np.isin(values.cat.codes.to_numpy(), accepted[accepted >= 0])
+
 def get_file_paths(directory):
     """
     Get the paths of all files in a directory and its subdirectories.
@@ -121,6 +568,78 @@ def cosine_similarity_numpy(vec1, vec2):
         logger.error(f'Error calculating cosine similarity: {e}')
         raise  # Re-raise the exception to be handled by the caller
 
+def cosine_similarity_matrix(matrix, vectors, block_size: int = 4096):
+    """
+    Calculate the cosine similarity between every row of a matrix and one or more vectors.
+
+    Rows stored in compact dtypes (float16, int8) are upcast to float32 one block at a
+    time, so the full matrix never needs to be materialized at float precision.
+
+    Args:
+        matrix: 2D array with one embedding per row
+        vectors: A single vector (1D) or a 2D array with one vector per row
+        block_size (int): Number of matrix rows upcast at once
+
+    Returns:
+        np.ndarray: Similarities rounded to 4 decimals with shape (n_rows,) for a single
+        vector or (n_rows, n_vectors) otherwise. Zero vectors produce NaN.
+
+    Raises:
+        ValueError: If the matrix and vectors have different dimensions
+    """
+    try:
+        matrix = np.asarray(matrix)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        single = vectors.ndim == 1
+        vectors = np.atleast_2d(vectors)
+        if matrix.shape[0] == 0:
+            empty = np.empty((0, vectors.shape[0]), dtype=np.float64)
+            return empty[:, 0] if single else empty
+        if matrix.shape[1] != vectors.shape[1]:
+            raise ValueError(f"Vectors must have the same length. Got lengths {matrix.shape[1]} and {vectors.shape[1]}")
+
+        vector_norms = np.linalg.norm(vectors, axis=1)
+        similarity = np.empty((matrix.shape[0], vectors.shape[0]), dtype=np.float64)
+        for start in range(0, matrix.shape[0], block_size):
+            block = matrix[start:start + block_size].astype(np.float32)
+            norms = np.outer(np.linalg.norm(block, axis=1), vector_norms)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scores = (block @ vectors.T) / norms
+            scores[norms == 0] = np.nan
+            similarity[start:start + block_size] = scores
+        similarity = np.round(similarity, 4)
+        return similarity[:, 0] if single else similarity
+    except Exception as e:
+        logger.error(f'Error calculating cosine similarity matrix: {e}')
+        raise
+
+def top_k_indices(scores, k: int, threshold: float = None, rank=None):
+    """
+    Select the positions of the k highest scores with a partial sort.
+
+    Args:
+        scores: 1D array of scores
+        k (int): Number of positions to keep, 0 keeps every position
+        threshold (float): Optional minimum score, applied before the selection
+        rank: Optional 1D array ranking the positions that clear the threshold
+            instead of the scores
+
+    Returns:
+        np.ndarray: Selected positions, sorted by descending rank when k is set and
+        in their original order otherwise. NaN scores are never selected.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    keep = ~np.isnan(scores)
+    if threshold is not None:
+        keep &= scores >= threshold
+    candidates = np.flatnonzero(keep)
+    if not k:
+        return candidates
+    rank = scores if rank is None else np.asarray(rank, dtype=np.float64)
+    if k < candidates.size:
+        candidates = candidates[np.argpartition(-rank[candidates], k - 1)[:k]]
+    return candidates[np.argsort(-rank[candidates], kind='stable')]
+
 def create_job_markdown_table(job_list):
     """
     Create a Markdown table for a list of job offers.
@@ -213,13 +732,14 @@ class Retriever:
     Attributes:
         embedding_path (str): The path to the directory containing embeddings.
         job_offers (str): The path to the JSON file containing job offers.
-        matches (str): The path to the JSON file containing user-job matches.
+        matches (str): The path to the JSON or NDJSON file containing user-job matches.
     """
 
     def __init__(self):
         self.embedding_path = settings.EMBEDDING_PATH
         self.job_offers = settings.JOB_OFFERS
         self.matches = settings.MATCHES
+        self.top_k = int(settings.MATCHES_TOP_K)
 
     def _get_specific_file_paths(self, specfic_file: str):
         """
@@ -273,12 +793,14 @@ class Retriever:
             logger.error(f"Error getting last run date: {e}")
             return None
 
-    def get_last_embed(self, embed_type: str):
+    def get_last_embed(self, embed_type: str, locations=None):
         """
         Get the last embeddings for a given type (users or jobs).
 
         Args:
             embed_type (str): The type of embeddings to retrieve ('users' or 'jobs').
+            locations (iterable): Locations of the jobs to read, None reads every job.
+                Job snapshots are clustered by location, so only their row groups are read.
 
         Returns:
             pandas.DataFrame: A DataFrame containing the last embeddings.
@@ -292,7 +814,8 @@ class Retriever:
             if last_run is not None:
                 last_run_path = f"{self.embedding_path}{last_run}/{embed_type}.parquet"
                 if os.path.exists(last_run_path):
-                    table_last_embeds = pq.read_table(last_run_path)
+                    filters = location_filters(locations) if 'location' in pq.read_schema(last_run_path).names else []
+                    table_last_embeds = pq.read_table(last_run_path, filters=filters or None)
                     df_last_embeds = table_last_embeds.to_pandas()
                 else:
                     df_last_embeds = pd.DataFrame(columns=[dict_ids[embed_type], 'embed'])
@@ -303,24 +826,26 @@ class Retriever:
             logger.error(f"Error getting last embeddings: {e}")
             return pd.DataFrame()
 
-    def get_last_matches(self, user_id):
+    def get_last_matches(self, user_id, top_k: int = None, locations=None):
         """
         Get the last job matches for a given user ID, sorted by publication date and score.
 
         Args:
             user_id (str): The ID of the user.
+            top_k (int): Maximum number of matches to return, defaults to settings.MATCHES_TOP_K.
+                0 returns every match.
+            locations (iterable): The user's locations, only their partitions are read.
 
         Returns:
             list: A list of dictionaries containing job information and match scores.
         """
         try:
-            dict_jobs = open_json(self.job_offers)
-            df_jobs = pd.DataFrame(dict_jobs)
-            dict_matches = open_json(self.matches)
-            df_matches = pd.DataFrame(dict_matches)
-            df_matches['user_id'] = df_matches['match_id'].apply(lambda x: str(x).split('|')[0])
-            df_matches['job_id'] = df_matches['match_id'].apply(lambda x: str(x).split('|')[1])
-            df_matches_user = df_matches[df_matches['user_id'] == user_id].copy()
+            df_jobs = open_table(self.job_offers, recent_filters() + location_filters(locations))
+            df_matches_user = pd.DataFrame(
+                [match for match in iter_records(self.matches) if str(match['match_id']).split('|')[0] == user_id],
+                columns=['match_id', 'match_date', 'score']
+            )
+            df_matches_user['job_id'] = df_matches_user['match_id'].apply(lambda x: str(x).split('|')[1])
             df_matches_user.index = df_matches_user.job_id
             dict_matches_user = df_matches_user['score'].to_dict()
             df_jobs['score'] = df_jobs['job_id'].map(dict_matches_user)
@@ -329,6 +854,9 @@ class Retriever:
                 inplace=True,
                 ignore_index=True
             )
+            top_k = self.top_k if top_k is None else top_k
+            if top_k:
+                df_jobs = df_jobs.nlargest(top_k, 'score')
             df_jobs.sort_values(
                 by=[
                     'publication_date',
@@ -0,0 +1,67 @@
+import pytest
+import pandas as pd
+from src.app.services.blob_store import BlobStore
+
+@pytest.fixture
+def blob_store(tmp_path):
+    """Fixture to provide an empty store in a temporary directory."""
+    return BlobStore(str(tmp_path / "descriptions"))
+
+def test_key():
+    """Test that texts are addressed by a stable 64-bit hash."""
+    assert BlobStore.key("Python developer") == BlobStore.key("Python developer")
+    assert len(BlobStore.key("Python developer")) == 16
+    assert BlobStore.key("Python developer") != BlobStore.key("Java developer")
+    assert BlobStore.key(None) is None
+
+def test_put_get(blob_store):
+    """Test that texts are stored once and fetched by address."""
+    assert blob_store.get(["missing"]) == {}
+    hashes = blob_store.put(["Python developer", "Java developer", "Python developer", None])
+    assert hashes[0] == hashes[2] and hashes[3] is None
+    blob_store.put(["Python developer", "Data engineer"])
+    assert len(blob_store.keys()) == 3
+    assert blob_store.get([hashes[1], "missing"]) == {hashes[1]: "Java developer"}
+
+def test_texts(blob_store):
+    """Test that only the descriptions not held inline are fetched."""
+    hashes = blob_store.put(["Python developer"])
+    df = pd.DataFrame({
+        'job_id': ['job1', 'job2'],
+        'description': [None, "Inline description"],
+        'description_hash': [hashes[0], BlobStore.key("Inline description")]
+    })
+    assert blob_store.texts(df).tolist() == ["Python developer", "Inline description"]
+    texts = blob_store.texts(df[["job_id", "description_hash"]])
+    assert texts.iloc[0] == "Python developer" and pd.isna(texts.iloc[1])
+
+def test_compact(tmp_path):
+    """Test that parts are merged into one part sorted by hash once there are too many."""
+    import os
+    import pyarrow.parquet as pq
+    blob_store = BlobStore(str(tmp_path / "descriptions"), max_parts=2)
+    hashes = blob_store.put(["Python developer"]) + blob_store.put(["Java developer"])
+    assert len(blob_store.parts()) == 2
+    hashes += blob_store.put(["Data engineer", "Python developer"])[:1]
+    parts = blob_store.parts()
+    assert len(parts) == 1
+    table = pq.read_table(os.path.join(blob_store.path, parts[0]))
+    assert table.column('hash').to_pylist() == sorted(hashes)
+    assert blob_store.get(hashes) == dict(zip(hashes, ["Python developer", "Java developer", "Data engineer"]))
+    statistics = pq.ParquetFile(os.path.join(blob_store.path, parts[0])).metadata.row_group(0).column(0).statistics
+    assert (statistics.min, statistics.max) == (min(hashes), max(hashes))
+
+def test_keys_cached(blob_store, monkeypatch):
+    """Test that the stored hashes are read once until the parts change."""
+    blob_store.put(["Python developer"])
+    reads = []
+    original_read = blob_store._read
+    monkeypatch.setattr(blob_store, '_read', lambda *args: reads.append(args) or original_read(*args))
+    blob_store.put(["Python developer", "Java developer"])
+    blob_store.put(["Java developer"])
+    assert len(blob_store.keys()) == 2
+    assert reads == []
+    other = BlobStore(blob_store.path)
+    other.put(["Data engineer"])
+    assert len(blob_store.keys()) == 3
+    assert len(reads) == 1
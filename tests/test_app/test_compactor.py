@@ -0,0 +1,84 @@
+import pytest
+import os
+import json
+import pyarrow.parquet as pq
+from src.app.services.compactor import Compactor
+from src.app.services.raw_job import RawJob
+
+@pytest.fixture
+def compactor(tmp_path):
+    """Fixture to provide an empty archive and a raw file in a temporary directory."""
+    return Compactor(str(tmp_path / "raw_archive"), str(tmp_path / "data_jobs.json"))
+
+def write_raw(compactor, jobs):
+    with open(compactor.raw, 'w') as f:
+        json.dump(jobs, f)
+
+def test_compact(compactor):
+    """Test that raw jobs are rolled into zstd partitions by scraping date, once per canonical link."""
+    write_raw(compactor, [
+        {"link": "https://example.com/job1?trk=feed", "scraping_date": "2024-01-01"},
+        {"link": "https://example.com/job2", "scraping_date": "2024-01-02"},
+        {"link": "https://example.com/job1", "scraping_date": "2024-01-02"}
+    ])
+    assert compactor.run() == 2
+    assert sorted(os.listdir(compactor.path)) == ["_links", "scraping_date=2024-01-01", "scraping_date=2024-01-02"]
+    pathfile = os.path.join(compactor.path, "scraping_date=2024-01-01", "part.parquet")
+    assert pq.ParquetFile(pathfile).metadata.row_group(0).column(0).compression == "ZSTD"
+    with open(compactor.raw) as f:
+        assert json.load(f) == []
+
+    write_raw(compactor, [
+        {"link": "https://example.com/job2?trk=feed", "scraping_date": "2024-01-03"},
+        {"link": "https://example.com/job3", "scraping_date": "2024-01-02", "company": "Tech Corp"}
+    ])
+    assert compactor.run() == 1
+    df = compactor.read()
+    assert df["link"].to_list() == ["https://example.com/job1?trk=feed", "https://example.com/job2", "https://example.com/job3"]
+    assert compactor.read("2024-01-02")["link"].to_list() == ["https://example.com/job2", "https://example.com/job3"]
+    assert compactor.read("2024-01-03").empty
+    assert list(compactor.read("2024-01-03").columns) == list(RawJob.__slots__)
+
+def test_links(compactor, monkeypatch):
+    """Test that the archived links are checked without reading the partitions, and indexed once for older archives."""
+    write_raw(compactor, [
+        {"link": "https://example.com/job1", "scraping_date": "2024-01-01"},
+        {"link": "https://example.com/job2", "scraping_date": "2024-01-02"}
+    ])
+    assert compactor.run() == 2
+    for part in compactor.link_parts():
+        os.remove(part)
+    assert sorted(compactor.links()) == ["https://example.com/job1", "https://example.com/job2"]
+    assert len(compactor.link_parts()) == 1
+
+    def fail(*args, **kwargs):
+        raise AssertionError("partition read")
+    monkeypatch.setattr(compactor, "_read", fail)
+    assert compactor.links(["https://example.com/job2", "https://example.com/job9"]).tolist() == ["https://example.com/job2"]
+    compactor.MAX_LINK_PARTS = 1
+    write_raw(compactor, [
+        {"link": "https://example.com/job2?trk=feed", "scraping_date": "2024-01-03"},
+        {"link": "https://example.com/job3", "scraping_date": "2024-01-03"}
+    ])
+    assert compactor.run() == 1
+    assert len(compactor.link_parts()) == 1
+    assert sorted(compactor.links()) == ["https://example.com/job1", "https://example.com/job2", "https://example.com/job3"]
+
+def test_disabled(tmp_path):
+    """Test that compaction is off without an archive directory."""
+    compactor = Compactor("", str(tmp_path / "data_jobs.json"))
+    write_raw(compactor, [{"link": "https://example.com/job1"}])
+    assert not compactor.enabled
+    assert compactor.run() == 0
+    with open(compactor.raw) as f:
+        assert len(json.load(f)) == 1
+
+def test_compact_keeps_raw_on_failure(compactor, monkeypatch):
+    """Test that the raw file is only emptied once the partitions are written."""
+    write_raw(compactor, [{"link": "https://example.com/job1", "scraping_date": "2024-01-01"}])
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+    monkeypatch.setattr("src.app.services.compactor.pq.write_table", fail)
+    assert compactor.run() == 0
+    with open(compactor.raw) as f:
+        assert len(json.load(f)) == 1
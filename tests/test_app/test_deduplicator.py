@@ -0,0 +1,72 @@
+import pytest
+import numpy as np
+import pandas as pd
+from src.app.services.deduplicator import Deduplicator
+
+DESCRIPTION = (
+    "We are looking for a senior data engineer to build and maintain batch and streaming "
+    "pipelines on AWS using Python, Spark and Airflow. You will work with analysts and "
+    "product teams to model data, improve quality checks and reduce infrastructure costs."
+)
+
+@pytest.fixture
+def deduplicator(tmp_path):
+    """Fixture to provide a Deduplicator storing its signatures in a temporary file."""
+    return Deduplicator(threshold=0.5, path=str(tmp_path / "minhash.parquet"))
+
+@pytest.fixture
+def df_jobs():
+    """Fixture to provide a repost with a small edit and an unrelated job."""
+    return pd.DataFrame({
+        'job_id': ['job1', 'job2', 'job3'],
+        'description': [
+            DESCRIPTION,
+            DESCRIPTION.replace("Spark and Airflow", "Spark and Dagster").replace("reduce infrastructure costs", "reduce cloud costs"),
+            "Frontend developer with React and TypeScript experience for an e-commerce startup."
+        ]
+    })
+
+def test_deduplicator_initialization():
+    """Test the configuration of the Deduplicator."""
+    assert not Deduplicator(threshold=0).enabled
+    with pytest.raises(ValueError, match="multiple of bands"):
+        Deduplicator(threshold=0.8, num_perm=10, bands=3)
+
+def test_signature(deduplicator):
+    """Test that similar texts get similar signatures."""
+    first = deduplicator.signature(DESCRIPTION)
+    assert first.shape == (64,)
+    assert np.array_equal(first, deduplicator.signature(DESCRIPTION))
+    assert np.mean(first == deduplicator.signature(DESCRIPTION + " Apply now")) > 0.7
+    assert np.mean(first == deduplicator.signature("Frontend developer with React")) < 0.2
+    assert deduplicator.signature(None).shape == (64,)
+
+def test_run(deduplicator, df_jobs):
+    """Test that near duplicates collapse into the first job with aliases."""
+    df = deduplicator.run(df_jobs)
+    assert df['job_id'].tolist() == ['job1', 'job3']
+    assert df['aliases'].tolist() == [['job2'], []]
+
+def test_run_incremental(deduplicator, df_jobs):
+    """Test that the canonical job of a previous run keeps winning its cluster."""
+    deduplicator.run(df_jobs)
+    df_next = pd.concat([
+        pd.DataFrame({'job_id': ['job4'], 'description': [DESCRIPTION + " Apply now"]}),
+        deduplicator.run(df_jobs)
+    ], ignore_index=True)
+    df = deduplicator.run(df_next)
+    assert df['job_id'].tolist() == ['job1', 'job3']
+    assert df['aliases'].tolist() == [['job2', 'job4'], []]
+    assert set(deduplicator.load()) == {'job1', 'job3'}
+
+def test_run_rehashes_edited_descriptions(deduplicator, df_jobs):
+    """Test that a stored signature is not reused once the description_hash changes."""
+    df_jobs = df_jobs.assign(description_hash=['hash1', 'hash2', 'hash3'])
+    deduplicator.run(df_jobs)
+    assert deduplicator.load()['job1'][0] == 'hash1'
+    df_next = df_jobs[df_jobs['job_id'] != 'job2'].copy()
+    df_next.loc[df_next['job_id'] == 'job3', ['description', 'description_hash']] = [DESCRIPTION + " Apply now", 'hash4']
+    df = deduplicator.run(df_next)
+    assert df['job_id'].tolist() == ['job1']
+    assert df['aliases'].tolist() == [['job3']]
+    assert deduplicator.load()['job1'][0] == 'hash1'
@@ -1,5 +1,7 @@
 import pytest
 import json
+import asyncio
+import httpx
 import pandas as pd
 import ast
 import shutil
@@ -244,3 +246,53 @@ def test_expirer_checker_with_real_links(expirer, job_links):
         'link': "https://www.linkedin.com/jobs/view/test-broken"
     })
     assert result['available'] is False  # Should be False for broken link
+
+def test_expirer_check_all(expirer):
+    """Test the asyncio checker keeps the order and output of the serial checker."""
+    tag = ast.literal_eval(Settings.AVAILABLE_TAGS)[0]
+    calls = []
+
+    def handler(request):
+        calls.append(str(request.url))
+        if request.url.path == "/jobs/view/throttled" and calls.count(str(request.url)) == 1:
+            return httpx.Response(429, headers={'Retry-After': '0'})
+        if request.url.path == "/jobs/view/missing":
+            return httpx.Response(404)
+        if request.url.path == "/jobs/view/expired":
+            return httpx.Response(200, content=tag.encode())
+        return httpx.Response(200, content=b"Job is available")
+
+    jobs = [
+        {'job_id': '1', 'link': "https://www.linkedin.com/jobs/view/open"},
+        {'job_id': '2', 'link': "https://www.linkedin.com/jobs/view/missing"},
+        {'job_id': '3', 'link': "https://www.linkedin.com/jobs/view/expired"},
+        {'job_id': '4', 'link': "https://www.linkedin.com/jobs/view/throttled"},
+        {'job_id': '5', 'link': None}
+    ]
+    expirer.concurrency = 2
+    expirer.host_rate = 1000
+    results = asyncio.run(expirer.check_all(jobs, transport=httpx.MockTransport(handler)))
+    assert results == [
+        {'job_id': '1', 'available': True},
+        {'job_id': '2', 'available': False},
+        {'job_id': '3', 'available': False},
+        {'job_id': '4', 'available': True},
+        {'job_id': '5', 'available': False}
+    ]
+    assert calls.count("https://www.linkedin.com/jobs/view/throttled") == 2
+
+def test_expirer_checker_async_waits_outside_semaphore(expirer):
+    """Test that a request waiting for its turn does not hold the semaphore, and that the checker runs without check_all."""
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=b"Job is available")))
+
+    async def check():
+        semaphore = asyncio.Semaphore(1)
+        expirer._paused_until = asyncio.get_running_loop().time() + 0.05
+        task = asyncio.create_task(expirer.checker_async(client, semaphore, {'job_id': '1', 'link': "https://www.linkedin.com/jobs/view/open"}))
+        await asyncio.sleep(0.01)
+        assert not semaphore.locked()
+        result = await task
+        await client.aclose()
+        return result
+
+    assert asyncio.run(check()) == {'job_id': '1', 'available': True}
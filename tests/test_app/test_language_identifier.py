@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+from src.app.services.language_identifier import LanguageIdentifier
+from src.app.utils import is_english
+
+ENGLISH = "We are looking for a backend developer to join our team and build services with Python and AWS."
+SPANISH = "Buscamos un desarrollador backend para unirse a nuestro equipo y construir servicios con Python y AWS."
+
+def test_predict():
+    """Test labels and confidence on English, Spanish and empty texts."""
+    identifier = LanguageIdentifier()
+    labels, confidence = identifier.predict([ENGLISH, SPANISH, "", None, "12345"])
+    assert labels.tolist() == ['en', 'es', 'unknown', 'unknown', 'unknown']
+    assert (confidence[:2] > 0.99).all()
+    assert (confidence[2:] == 0.5).all()
+    labels, confidence = identifier.predict([])
+    assert labels.size == 0 and confidence.size == 0
+
+def test_short_spanish_with_tech_terms():
+    """Test short Spanish texts dominated by English technical terms."""
+    identifier = LanguageIdentifier()
+    texts = pd.Series([
+        "Desarrollador con experiencia en Python, Django, AWS y Docker",
+        "Ingeniero de datos - Spark, SQL, Airflow y dbt",
+        "¿Te apasiona el Machine Learning?",
+        "Data Engineer: Spark, SQL and Airflow experience required"
+    ], index=[10, 11, 12, 13])
+    assert identifier.predict(texts)[0].tolist() == ['es', 'es', 'es', 'en']
+    assert identifier.is_english(texts).tolist() == [False, False, False, True]
+
+def test_separator_in_text():
+    """Test that texts holding the internal separator byte keep their own evidence."""
+    identifier = LanguageIdentifier()
+    assert identifier.predict(["Desarrollador\x01 con", ENGLISH])[0].tolist() == ['es', 'en']
+
+def test_matches_is_english():
+    """Test that a batch is identified as is_english does one text at a time."""
+    identifier = LanguageIdentifier()
+    corpus = [(ENGLISH if i % 2 else SPANISH) * 30 for i in range(200)]
+    english = identifier.is_english(corpus)
+    assert np.array_equal(english, np.array([is_english(text) for text in corpus]))
+    assert np.array_equal(english, np.arange(200) % 2 == 1)
+    assert np.array_equal(LanguageIdentifier(max_chars=0).is_english(corpus), english)
@@ -0,0 +1,90 @@
+import os
+import pytest
+import pandas as pd
+from src.app.services.lexical_index import LexicalIndex
+
+@pytest.fixture
+def df_jobs():
+    """Fixture to provide job descriptions."""
+    return pd.DataFrame({
+        'job_id': ['job1', 'job2', 'job3'],
+        'description': [
+            'Python developer building data pipelines with Python and SQL',
+            'Java developer for backend services',
+            'Desarrollador de datos con experiencia en SQL y Airflow'
+        ]
+    })
+
+@pytest.fixture
+def lexical_index(tmp_path):
+    """Fixture to provide an empty index in a temporary directory."""
+    return LexicalIndex(str(tmp_path / 'lexical'), top_n=2, weight=0.3)
+
+def test_tokenize():
+    """Test tokenization of descriptions."""
+    assert LexicalIndex.tokenize('Senior Python/SQL developer, a team!') == ['senior', 'python', 'sql', 'developer', 'team']
+    assert LexicalIndex.tokenize(None) == []
+
+def test_search(lexical_index, df_jobs):
+    """Test BM25 retrieval over an index stored on disk."""
+    assert lexical_index.enabled
+    lexical_index.update(df_jobs)
+    job_ids, scores = lexical_index.load().search('python sql')
+    assert job_ids.tolist() == ['job1', 'job3']
+    assert scores[0] > scores[1] > 0
+    job_ids, _ = lexical_index.load({'java'}).search('java python')
+    assert job_ids.tolist() == ['job2']
+    assert lexical_index.search('kotlin')[0].tolist() == []
+
+def test_update_incremental(lexical_index, df_jobs):
+    """Test that updates index new jobs and drop expired ones."""
+    lexical_index.update(df_jobs)
+    df_next = pd.concat([
+        df_jobs[df_jobs['job_id'] != 'job2'],
+        pd.DataFrame({'job_id': ['job4'], 'description': ['Kotlin and Java mobile developer']})
+    ])
+    lexical_index.update(df_next)
+    lexical_index.load()
+    assert sorted(lexical_index.doc_ids.tolist()) == ['job1', 'job3', 'job4']
+    assert lexical_index.search('java')[0].tolist() == ['job4']
+
+def test_update_writes_parts(lexical_index, df_jobs):
+    """Test that updates only write the postings of new jobs and merge the parts past MAX_PARTS."""
+    lexical_index.MAX_PARTS = 2
+    lexical_index.update(df_jobs.iloc[:2])
+    lexical_index.update(df_jobs)
+    parts = lexical_index.parts()
+    assert len(parts) == 2
+    assert pd.read_parquet(parts[1])['job_id'].unique().tolist() == ['job3']
+    lexical_index.update(df_jobs[df_jobs['job_id'] != 'job1'])
+    assert len(lexical_index.parts()) == 2
+    assert lexical_index.load().search('python')[0].tolist() == []
+    lexical_index.update(pd.concat([
+        df_jobs[df_jobs['job_id'] != 'job1'],
+        pd.DataFrame({'job_id': ['job4'], 'description': ['Python backend developer']})
+    ]))
+    parts = lexical_index.parts()
+    assert len(parts) == 1
+    assert sorted(pd.read_parquet(parts[0])['job_id'].unique().tolist()) == ['job2', 'job3', 'job4']
+    assert lexical_index.load().search('python')[0].tolist() == ['job4']
+    assert not [name for name in os.listdir(os.path.dirname(parts[0])) if name.endswith('.tmp')]
+
+def test_update_reindexes_jobs(lexical_index, df_jobs):
+    """Test that jobs coming back or with a new description_hash keep a single set of postings."""
+    df_jobs = df_jobs.assign(description_hash=['hash1', 'hash2', 'hash3'])
+    lexical_index.update(df_jobs)
+    lexical_index.update(df_jobs[df_jobs['job_id'] != 'job2'])
+    assert lexical_index.load().search('java')[0].tolist() == []
+    assert lexical_index.documents()['active'].tolist().count(False) == 1
+    lexical_index.update(df_jobs)
+    job_ids, scores = lexical_index.load().search('java')
+    assert job_ids.tolist() == ['job2']
+    assert lexical_index.load().postings['java'][0].tolist() == [lexical_index.doc_ids.tolist().index('job2')]
+    df_changed = df_jobs.copy()
+    df_changed.loc[df_changed['job_id'] == 'job1', ['description', 'description_hash']] = ['Kotlin developer', 'hash4']
+    lexical_index.update(df_changed)
+    assert lexical_index.load().search('python')[0].tolist() == []
+    assert lexical_index.search('kotlin')[0].tolist() == ['job1']
+    df_postings = pd.concat([pd.read_parquet(part) for part in lexical_index.parts()])
+    assert not df_postings.duplicated(subset=['term', 'job_id']).any()
+    assert len(lexical_index.documents()) == 3
@@ -1,10 +1,12 @@
 import pytest
+import os
 import json
 import pandas as pd
 import shutil
 from pathlib import Path
 from datetime import datetime, timedelta
 from src.app.services.mentor import Mentor
+from src.app.services.similarity_store import SimilarityStore
 from src.app.settings import Settings
 
 @pytest.fixture
@@ -78,6 +80,8 @@ def mentor(temp_test_dir):
     mentor.job_offers = str(job_offers)
     mentor.job_seekers = str(job_seekers)
     mentor.matches = str(matches)
+    mentor.matches_state = str(temp_test_dir / "matches_state.json")
+    mentor.similarity_store = SimilarityStore(str(temp_test_dir / "similarities.parquet"))
     
     return mentor
 
@@ -142,7 +146,7 @@ def test_recommend(mentor):
         })
         
         m.setattr("src.app.services.mentor.retriever.get_last_embed", 
-                 lambda x: user_embeddings if x == 'users' else job_embeddings)
+                 lambda x, locations=None: user_embeddings if x == 'users' else job_embeddings)
         
         recommendations = mentor.recommend()
         assert isinstance(recommendations, list)
@@ -171,7 +175,7 @@ def test_run(mentor):
         })
         
         m.setattr("src.app.services.mentor.retriever.get_last_embed", 
-                 lambda x: user_embeddings if x == 'users' else job_embeddings)
+                 lambda x, locations=None: user_embeddings if x == 'users' else job_embeddings)
         
         mentor.run()
         
@@ -198,3 +202,414 @@ def test_empty_data(mentor, temp_test_dir):
     # Should not raise any errors
     result = mentor.run()
     assert result is None
+
+def test_recommend_projected(mentor, temp_test_dir):
+    """Test recommendation generation on projected job embeddings."""
+    from src.app.services.projector import Projector
+    embedding_path = temp_test_dir / "embeddings"
+    (embedding_path / "2024-01-01").mkdir(parents=True)
+    projector = Projector('truncate', 2)
+    projector.save(str(embedding_path / "2024-01-01" / Projector.FILE_NAME))
+    mentor.projector = Projector('truncate', 2)
+    
+    with pytest.MonkeyPatch.context() as m:
+        user_embeddings = pd.DataFrame({
+            'user_id': ['user1'],
+            'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+            'avg_role_embeds': [[0.4, 0.5, 0.6]]
+        })
+        job_embeddings = pd.DataFrame({
+            'job_id': ['job1'],
+            'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+            'role_embeds': [[0.4, 0.5, 0.6]],
+            'avg_skill_embeds_projected': [[0.1, 0.2]],
+            'role_embeds_projected': [[-0.4, -0.5]]
+        })
+        m.setattr("src.app.services.mentor.retriever.get_last_embed", 
+                 lambda x, locations=None: user_embeddings if x == 'users' else job_embeddings)
+        m.setattr("src.app.services.mentor.retriever.get_last_run", lambda x: "2024-01-01")
+        m.setattr("src.app.services.mentor.retriever.embedding_path", f"{embedding_path}/")
+        
+        recommendations = mentor.recommend()
+        # the projected role embedding points away from the user, so the score drops below threshold
+        assert recommendations == []
+        
+        # cached scores are versioned by the projection they were computed on
+        state = mentor.matching_state()
+        Projector('truncate', 1).save(str(embedding_path / "2024-01-01" / Projector.FILE_NAME))
+        assert mentor.matching_state()['users'] != state['users']
+        
+        mentor.projector = Projector('none', 0)
+        recommendations = mentor.recommend()
+        assert [match['match_id'] for match in recommendations] == ['user1|job1']
+
+def test_run_incremental(mentor):
+    """Test that incremental runs only score new users and new jobs."""
+    user_embeddings = pd.DataFrame({
+        'user_id': ['user1'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+        'avg_role_embeds': [[0.4, 0.5, 0.6]]
+    })
+    job_embeddings = pd.DataFrame({
+        'job_id': ['job1'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+        'role_embeds': [[0.4, 0.5, 0.6]]
+    })
+    embeddings = {'users': user_embeddings, 'jobs': job_embeddings}
+    
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr("src.app.services.mentor.retriever.get_last_embed", lambda x, locations=None: embeddings[x])
+        mentor.run(incremental=True)
+        with open(mentor.matches, 'r') as f:
+            assert [match['match_id'] for match in json.load(f)] == ['user1|job1']
+        
+        # a new job shows up, job1 is kept without rescoring
+        with open(mentor.job_offers, 'r') as f:
+            jobs = json.load(f)
+        jobs.append({**jobs[0], 'job_id': 'job3'})
+        with open(mentor.job_offers, 'w') as f:
+            json.dump(jobs, f)
+        embeddings['jobs'] = pd.concat([
+            job_embeddings,
+            pd.DataFrame({
+                'job_id': ['job3'],
+                'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+                'role_embeds': [[0.4, 0.5, 0.6]]
+            })
+        ], ignore_index=True)
+        calls = []
+        original_recommend = mentor.recommend
+        def spy_recommend(user_ids=None, job_ids=None):
+            calls.append((user_ids, job_ids))
+            return original_recommend(user_ids=user_ids, job_ids=job_ids)
+        m.setattr(mentor, 'recommend', spy_recommend)
+        mentor.run(incremental=True)
+        assert calls == [(['user1'], ['job3'])]
+        with open(mentor.matches, 'r') as f:
+            assert sorted(match['match_id'] for match in json.load(f)) == ['user1|job1', 'user1|job3']
+        
+        # job1 expires and its match is dropped without scoring anything
+        with open(mentor.job_offers, 'w') as f:
+            json.dump([job for job in jobs if job['job_id'] != 'job1'], f)
+        calls.clear()
+        mentor.run(incremental=True)
+        assert calls == []
+        with open(mentor.matches, 'r') as f:
+            assert [match['match_id'] for match in json.load(f)] == ['user1|job3']
+
+def test_rerank(mentor):
+    """Test that a preference change is applied from cached similarities."""
+    user_embeddings = pd.DataFrame({
+        'user_id': ['user1'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+        'avg_role_embeds': [[0.4, 0.5, 0.6]]
+    })
+    job_embeddings = pd.DataFrame({
+        'job_id': ['job1'],
+        'avg_skill_embeds': [[0.3, 0.2, 0.1]],
+        'role_embeds': [[0.4, 0.5, 0.6]]
+    })
+    
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr("src.app.services.mentor.retriever.get_last_embed", 
+                 lambda x, locations=None: user_embeddings if x == 'users' else job_embeddings)
+        mentor.run()
+        with open(mentor.matches, 'r') as f:
+            assert [match['score'] for match in json.load(f)] == [pytest.approx(0.7 + 0.3 * 0.7143)]
+        
+        # the user now cares only about skills
+        with open(mentor.job_seekers, 'r') as f:
+            users = json.load(f)
+        users[0]['role_weight'] = "0.0"
+        with open(mentor.job_seekers, 'w') as f:
+            json.dump(users, f)
+        m.setattr(mentor, 'recommend', lambda *args, **kwargs: pytest.fail("rerank must not rescore"))
+        mentor.rerank(['user1'])
+        with open(mentor.matches, 'r') as f:
+            assert [match['score'] for match in json.load(f)] == [0.7143]
+        
+        # a stricter threshold drops the match
+        users[0]['similarity_threshold'] = "0.9"
+        with open(mentor.job_seekers, 'w') as f:
+            json.dump(users, f)
+        mentor.rerank(['user1'])
+        with open(mentor.matches, 'r') as f:
+            assert json.load(f) == []
+
+def test_recommend_top_k(mentor):
+    """Test that only the k best jobs of every user are kept."""
+    with open(mentor.job_offers, 'r') as f:
+        jobs = json.load(f)
+    jobs += [{**jobs[0], 'job_id': f'job{i}'} for i in range(3, 6)]
+    with open(mentor.job_offers, 'w') as f:
+        json.dump(jobs, f)
+    user_embeddings = pd.DataFrame({
+        'user_id': ['user1'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+        'avg_role_embeds': [[0.4, 0.5, 0.6]]
+    })
+    job_embeddings = pd.DataFrame({
+        'job_id': ['job1', 'job3', 'job4', 'job5'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3], [0.3, 0.2, 0.1], [0.1, 0.2, 0.35], [-0.1, -0.2, -0.3]],
+        'role_embeds': [[0.4, 0.5, 0.6]] * 4
+    })
+    
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr("src.app.services.mentor.retriever.get_last_embed", 
+                 lambda x, locations=None: user_embeddings if x == 'users' else job_embeddings)
+        mentor.top_k = 2
+        recommendations = mentor.recommend()
+        assert [match['match_id'] for match in recommendations] == ['user1|job1', 'user1|job4']
+        
+        # without the threshold fallback the k best jobs are kept whatever their score
+        mentor.top_k = 4
+        assert len(mentor.recommend()) == 3
+        mentor.threshold_fallback = False
+        assert len(mentor.recommend()) == 4
+        
+        mentor.top_k = 1
+        assert mentor.limit_matches([
+            {'match_id': 'user1|job1', 'score': 0.6},
+            {'match_id': 'user1|job3', 'score': 0.8},
+            {'match_id': 'user2|job1', 'score': 0.5}
+        ]) == [{'match_id': 'user1|job3', 'score': 0.8}, {'match_id': 'user2|job1', 'score': 0.5}]
+
+def test_recommend_parallel(mentor):
+    """Test that scoring in a process pool gives the same matches as serial scoring."""
+    from src.app.services.scorer import Scorer
+    with open(mentor.job_seekers, 'r') as f:
+        users = json.load(f)
+    users += [{**users[0], 'user_id': f'user{i}', 'role_weight': str(i / 10)} for i in range(2, 6)]
+    users.append({**users[0], 'user_id': 'user6', 'seniority': ['Junior'], 'location': ['Medellin'],
+                  'work_modality_english': ['Part-time'], 'remote': ['False']})
+    with open(mentor.job_seekers, 'w') as f:
+        json.dump(users, f)
+    user_embeddings = pd.DataFrame({
+        'user_id': [user['user_id'] for user in users],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3 + i / 10] for i in range(len(users))],
+        'avg_role_embeds': [[0.4, 0.5, 0.6]] * len(users)
+    })
+    job_embeddings = pd.DataFrame({
+        'job_id': ['job1', 'job2'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3], [0.2, 0.3, 0.4]],
+        'role_embeds': [[0.4, 0.5, 0.6], [0.5, 0.6, 0.7]]
+    })
+    
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr("src.app.services.mentor.retriever.get_last_embed", 
+                 lambda x, locations=None: user_embeddings if x == 'users' else job_embeddings)
+        serial = mentor.recommend()
+        mentor.scorer = Scorer(workers=2, batch_size=2)
+        assert mentor.recommend() == serial
+    assert [match['match_id'] for match in serial] == [f'user{i}|job1' for i in range(1, 6)] + ['user6|job2']
+
+def test_run_ndjson(mentor, temp_test_dir):
+    """Test that a full run streams the matches to an NDJSON file."""
+    mentor.matches = str(temp_test_dir / "matches.ndjson")
+    user_embeddings = pd.DataFrame({
+        'user_id': ['user1'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+        'avg_role_embeds': [[0.4, 0.5, 0.6]]
+    })
+    job_embeddings = pd.DataFrame({
+        'job_id': ['job1', 'job2'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3], [0.2, 0.3, 0.4]],
+        'role_embeds': [[0.4, 0.5, 0.6], [0.5, 0.6, 0.7]]
+    })
+    
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr("src.app.services.mentor.retriever.get_last_embed", 
+                 lambda x, locations=None: user_embeddings if x == 'users' else job_embeddings)
+        assert [len(batch) for batch in mentor.recommend_batches()] == [1]
+        mentor.run()
+    with open(mentor.matches, 'r') as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line)['match_id'] for line in lines] == ['user1|job1']
+
+def test_run_failure_keeps_previous_files(mentor):
+    """Test that a scoring error mid-run stores neither matches, similarities nor state."""
+    user_embeddings = pd.DataFrame({
+        'user_id': ['user1'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+        'avg_role_embeds': [[0.4, 0.5, 0.6]]
+    })
+    job_embeddings = pd.DataFrame({
+        'job_id': ['job1'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+        'role_embeds': [[0.4, 0.5, 0.6]]
+    })
+    
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr("src.app.services.mentor.retriever.get_last_embed", 
+                 lambda x, locations=None: user_embeddings if x == 'users' else job_embeddings)
+        mentor.run()
+        with open(mentor.matches, 'r') as f:
+            matches = json.load(f)
+        components = mentor.similarity_store.load()
+        assert len(matches) == 1 and len(components) == 1
+        
+        def failing_score(tasks, jobs):
+            yield from original_score(tasks, jobs)
+            raise RuntimeError("worker died")
+        original_score = mentor.scorer.score
+        m.setattr(mentor.scorer, 'score', failing_score)
+        with pytest.raises(RuntimeError):
+            list(mentor.recommend_batches())
+        os.remove(mentor.matches_state)
+        mentor.run()
+    with open(mentor.matches, 'r') as f:
+        assert json.load(f) == matches
+    assert mentor.similarity_store.load().equals(components)
+    assert not os.path.exists(mentor.matches_state)
+    assert not os.path.exists(mentor.similarity_store.path + '.tmp')
+
+def test_recommend_skill_candidates(mentor):
+    """Test that only jobs sharing skills with the user are scored."""
+    from src.app.services.skill_index import SkillIndex
+    with open(mentor.job_offers, 'r') as f:
+        jobs = json.load(f)
+    jobs[0]['skills'] = ['python']
+    jobs.append({**jobs[0], 'job_id': 'job3', 'skills': ['java']})
+    with open(mentor.job_offers, 'w') as f:
+        json.dump(jobs, f)
+    with open(mentor.job_seekers, 'r') as f:
+        users = json.load(f)
+    users[0]['skills'] = ['Python', 'SQL']
+    with open(mentor.job_seekers, 'w') as f:
+        json.dump(users, f)
+    user_embeddings = pd.DataFrame({
+        'user_id': ['user1'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+        'avg_role_embeds': [[0.4, 0.5, 0.6]]
+    })
+    job_embeddings = pd.DataFrame({
+        'job_id': ['job1', 'job3'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]] * 2,
+        'role_embeds': [[0.4, 0.5, 0.6]] * 2
+    })
+    
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr("src.app.services.mentor.retriever.get_last_embed", 
+                 lambda x, locations=None: user_embeddings if x == 'users' else job_embeddings)
+        assert [match['match_id'] for match in mentor.recommend()] == ['user1|job1', 'user1|job3']
+        mentor.skill_index = SkillIndex(min_shared=1)
+        assert [match['match_id'] for match in mentor.recommend()] == ['user1|job1']
+        report = mentor.candidate_recall()
+        assert report['full_matches'] == 2
+        assert report['recall'] == 0.5
+        assert report['per_user'] == {'user1': 0.5}
+        assert mentor.skill_index.min_shared == 1
+
+def test_push(mentor):
+    """Test that new jobs are matched to users without a full run."""
+    with open(mentor.job_offers, 'r') as f:
+        jobs = json.load(f)
+    jobs.append({**jobs[0], 'job_id': 'job3'})
+    with open(mentor.job_offers, 'w') as f:
+        json.dump(jobs, f)
+    with open(mentor.matches, 'w') as f:
+        json.dump([{'match_id': 'user1|job1', 'match_date': '2024-01-01', 'score': 0.9}], f)
+    user_embeddings = pd.DataFrame({
+        'user_id': ['user1'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+        'avg_role_embeds': [[0.4, 0.5, 0.6]]
+    })
+    job_embeddings = pd.DataFrame({
+        'job_id': ['job1', 'job2', 'job3'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]] * 3,
+        'role_embeds': [[0.4, 0.5, 0.6]] * 3
+    })
+    
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr("src.app.services.mentor.retriever.get_last_embed", 
+                 lambda x, locations=None: user_embeddings if x == 'users' else job_embeddings)
+        m.setattr(mentor, 'recommend', lambda *args, **kwargs: pytest.fail("push must not run a full pass"))
+        assert mentor.push([]) == []
+        pushed = mentor.push(['job2', 'job3'])
+    # job2 does not pass the knowledge filter of user1
+    assert [match['match_id'] for match in pushed] == ['user1|job3']
+    with open(mentor.matches, 'r') as f:
+        assert [match['match_id'] for match in json.load(f)] == ['user1|job1', 'user1|job3']
+
+def test_recommend_lexical(mentor, temp_test_dir):
+    """Test that lexical scores rank the matches without restricting the jobs or changing their dense scores."""
+    from src.app.services.lexical_index import LexicalIndex
+    with open(mentor.job_offers, 'r') as f:
+        jobs = json.load(f)
+    jobs.append({**jobs[0], 'job_id': 'job3', 'description': 'Accountant position'})
+    with open(mentor.job_offers, 'w') as f:
+        json.dump(jobs, f)
+    with open(mentor.job_seekers, 'r') as f:
+        users = json.load(f)
+    users[0]['job_titles'] = ['Python Developer']
+    users[0]['skills'] = ['python']
+    with open(mentor.job_seekers, 'w') as f:
+        json.dump(users, f)
+    mentor.lexical_index = LexicalIndex(str(temp_test_dir / 'lexical'), top_n=5, weight=0.4)
+    mentor.lexical_index.update(pd.DataFrame(jobs))
+    user_embeddings = pd.DataFrame({
+        'user_id': ['user1'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]],
+        'avg_role_embeds': [[0.4, 0.5, 0.6]]
+    })
+    job_embeddings = pd.DataFrame({
+        'job_id': ['job3', 'job1'],
+        'avg_skill_embeds': [[0.1, 0.2, 0.3]] * 2,
+        'role_embeds': [[0.4, 0.5, 0.6]] * 2
+    })
+    
+    with pytest.MonkeyPatch.context() as m:
+        m.setattr("src.app.services.mentor.retriever.get_last_embed", 
+                 lambda x, locations=None: user_embeddings if x == 'users' else job_embeddings)
+        recommendations = mentor.recommend()
+        scores = {match['match_id']: match['score'] for match in recommendations}
+        assert scores == {'user1|job1': pytest.approx(1.0), 'user1|job3': pytest.approx(1.0)}
+        mentor.top_k = 1
+        recommendations = mentor.recommend()
+    assert [match['match_id'] for match in recommendations] == ['user1|job1']
+    assert recommendations[0]['score'] == pytest.approx(1.0)
+
+def test_knowledge_based_filter_blob_store(mentor, temp_test_dir):
+    """Test that descriptions held in the blob store are fetched for language detection."""
+    from src.app.services.blob_store import BlobStore
+    mentor.blob_store = BlobStore(str(temp_test_dir / "descriptions"))
+    with open(mentor.job_offers, 'r') as f:
+        jobs = json.load(f)
+    jobs[0]['description_hash'] = mentor.blob_store.put(["Senior Python developer position with a great team"])[0]
+    del jobs[0]['description']
+    jobs.append({**jobs[0], 'job_id': 'job3', 'description_hash': mentor.blob_store.put(["Desarrollador de software con experiencia"])[0]})
+    with open(mentor.job_offers, 'w') as f:
+        json.dump(jobs, f)
+    with open(mentor.job_seekers, 'r') as f:
+        users = json.load(f)
+    users[0]['english'] = "False"
+    with open(mentor.job_seekers, 'w') as f:
+        json.dump(users, f)
+    assert mentor.knowledge_based_filter("user1") == ['job3']
+
+def test_knowledge_based_filter_parquet(mentor, temp_test_dir):
+    """Test that the filters compare category codes of job offers stored as parquet."""
+    from src.app.utils import save_table
+    with open(mentor.job_offers, 'r') as f:
+        jobs = json.load(f)
+    mentor.job_offers = str(temp_test_dir / "job_offers.parquet")
+    save_table(mentor.job_offers, pd.DataFrame(jobs))
+    assert isinstance(mentor.offers()['seniority'].dtype, pd.CategoricalDtype)
+    assert mentor.knowledge_based_filter("user1") == ['job1']
+    assert [job['job_id'] for job in mentor.offers(records=True)] == ['job1', 'job2']
+
+def test_knowledge_based_filter_partitioned(mentor, temp_test_dir, monkeypatch):
+    """Test that only the location partitions a user's criteria can match are read."""
+    import os
+    from src.app import utils
+    from src.app.utils import save_table
+    with open(mentor.job_offers, 'r') as f:
+        jobs = json.load(f)
+    mentor.job_offers = str(temp_test_dir / "job_offers")
+    save_table(mentor.job_offers, pd.DataFrame(jobs).assign(publication_date=datetime.now().strftime('%Y-%m-%d')))
+    read = []
+    read_table = utils.pq.read_table
+    monkeypatch.setattr(utils.pq, "read_table", lambda path, **kwargs: read.append(os.path.dirname(path)) or read_table(path, **kwargs))
+    assert mentor.knowledge_based_filter("user1") == ['job1']
+    assert [os.path.basename(path) for path in read] == ['location=Bogota']
+    assert mentor.users().locations() == {'Bogota'}
@@ -6,7 +6,9 @@ from pathlib import Path
 from datetime import datetime, timedelta
 from src.app.services.preprocesor import Preprocesor
 from src.app.settings import Settings
+from src.app.utils import recent_filters
 import uuid
+import shortuuid
 
 @pytest.fixture
 def temp_test_dir(tmp_path):
@@ -61,6 +63,8 @@ def preprocessor(temp_test_dir):
     preprocessor.data_jobs = str(data_jobs)
     preprocessor.job_offers = str(job_offers)
     preprocessor.gral_skills = str(skills)
+    preprocessor.blob_store.path = str(temp_test_dir / "descriptions")
+    preprocessor.job_ids.path = str(temp_test_dir / "job_ids.parquet")
     
     return preprocessor
 
@@ -104,6 +108,18 @@ def test_preprocessor_augment(preprocessor):
     assert all(isinstance(skills, list) for skills in df['skills'])
     assert any('python' in skills for skills in df['skills'])
 
+def test_clean_matches_recent_filters(preprocessor):
+    """Test that clean() keeps the same publication days as the partition filters."""
+    dates = [(datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d') for days in [7, 8]]
+    df = preprocessor.clean(pd.DataFrame({
+        'company': ['Tech Corp', 'Tech Corp'],
+        'link': ['https://example.com/job1', 'https://example.com/job2'],
+        'publication_date': dates,
+        'description_hash': ['hash1', 'hash2']
+    }))
+    assert df['publication_date'].tolist() == [dates[0]]
+    assert [date for date in dates if date >= recent_filters()[0][2]] == [dates[0]]
+
 def test_preprocessor_transform(preprocessor):
     """Test data transformation functionality."""
     df = preprocessor.transform()
@@ -175,3 +191,241 @@ def test_preprocessor_empty_data(preprocessor, temp_test_dir):
     result = preprocessor.run()
     assert isinstance(result, list)
     assert len(result) == 0  # After filtering, should be empty
+
+def test_preprocessor_incremental(preprocessor, temp_test_dir):
+    """Test that only the raw rows past the watermark are augmented."""
+    preprocessor.incremental = True
+    preprocessor.state = str(temp_test_dir / "state.json")
+    today = datetime.now().strftime('%Y-%m-%d')
+    with open(preprocessor.data_jobs, 'r') as f:
+        raw_jobs = json.load(f)
+    for job in raw_jobs:
+        job['scraping_date'] = today
+    with open(preprocessor.data_jobs, 'w') as f:
+        json.dump(raw_jobs, f)
+
+    first = preprocessor.run()
+    assert len(first) == 2
+    with open(preprocessor.state, 'r') as f:
+        state = json.load(f)
+    assert state == {'scraping_date': today, 'links': ["https://example.com/job1", "https://example.com/job2"], 'undated_links': []}
+
+    # a repeated link with tracking parameters and an older row are skipped
+    raw_jobs.append({**raw_jobs[0], 'link': "https://example.com/job1?trk=feed"})
+    raw_jobs.append({**raw_jobs[0], 'link': "https://example.com/job0", 'scraping_date': "2000-01-01"})
+    raw_jobs.append({
+        "link": "https://example.com/job3",
+        "description": "Data Engineer with Python",
+        "vacancy_name": "Data Engineer",
+        "company": "Data Corp",
+        "publication_date": today,
+        "scraping_date": today
+    })
+    with open(preprocessor.data_jobs, 'w') as f:
+        json.dump(raw_jobs, f)
+    assert preprocessor.extract(preprocessor.data_jobs).pipe(preprocessor.unseen)['link'].to_list() == ["https://example.com/job3"]
+
+    second = preprocessor.run()
+    assert sorted(job['link'] for job in second) == [f"https://example.com/job{i}" for i in (1, 2, 3)]
+    with open(preprocessor.state, 'r') as f:
+        assert len(json.load(f)['links']) == 3
+    assert len(preprocessor.run()) == 3
+
+    # a row without scraping_date is processed once, even after the watermark moves on
+    raw_jobs.append({**raw_jobs[0], 'link': "https://example.com/job4", 'scraping_date': None})
+    with open(preprocessor.data_jobs, 'w') as f:
+        json.dump(raw_jobs, f)
+    assert preprocessor.extract(preprocessor.data_jobs).pipe(preprocessor.unseen)['link'].to_list() == ["https://example.com/job4"]
+    preprocessor.run()
+    with open(preprocessor.state, 'r') as f:
+        state = json.load(f)
+    assert state['undated_links'] == ["https://example.com/job4"]
+    moved_state = {**state, 'scraping_date': '2999-01-01', 'links': []}
+    with open(preprocessor.state, 'w') as f:
+        json.dump(moved_state, f)
+    assert preprocessor.extract(preprocessor.data_jobs).pipe(preprocessor.unseen).empty
+
+def test_preprocessor_raw_archive(preprocessor, temp_test_dir):
+    """Test that the raw file is compacted and only the partitions past the watermark are read."""
+    import os
+    preprocessor.incremental = True
+    preprocessor.state = str(temp_test_dir / "state.json")
+    preprocessor.compactor.path = str(temp_test_dir / "raw_archive")
+    today = datetime.now().strftime('%Y-%m-%d')
+    with open(preprocessor.data_jobs, 'r') as f:
+        raw_jobs = json.load(f)
+    old_job = {**raw_jobs[0], 'link': "https://example.com/job0", 'scraping_date': "2000-01-01"}
+    with open(preprocessor.data_jobs, 'w') as f:
+        json.dump([{**job, 'scraping_date': today} for job in raw_jobs] + [old_job], f)
+
+    assert len(preprocessor.run()) == 2
+    assert sorted(os.listdir(preprocessor.compactor.path)) == ["_links", "scraping_date=2000-01-01", f"scraping_date={today}"]
+    assert preprocessor.extract(preprocessor.data_jobs).empty
+
+    with open(preprocessor.data_jobs, 'w') as f:
+        json.dump([{
+            "link": "https://example.com/job3",
+            "description": "Data Engineer with Python",
+            "vacancy_name": "Data Engineer",
+            "company": "Data Corp",
+            "publication_date": today,
+            "scraping_date": today
+        }], f)
+    df_raw, _ = preprocessor.sources()
+    assert df_raw['link'].to_list() == ["https://example.com/job3"]
+    assert sorted(job['link'] for job in preprocessor.load()) == [f"https://example.com/job{i}" for i in (1, 2, 3)]
+
+def test_preprocessor_augment_chunks(preprocessor):
+    """Test that chunked augmentation in a process pool keeps the serial result and order."""
+    df_raw = preprocessor.extract(preprocessor.data_jobs)
+    df_raw = pd.concat([df_raw] * 3, ignore_index=True)
+    df_raw['link'] = [f"https://example.com/job{i}" for i in range(len(df_raw))]
+    gral_skills = ["python", "java", "machine learning", "remote"]
+    serial = preprocessor.augment_raw(df_raw, gral_skills)
+
+    preprocessor.workers = 2
+    preprocessor.chunk_size = 4
+    parallel = preprocessor.augment_raw(df_raw, gral_skills)
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert parallel['link'].to_list() == df_raw['link'].to_list()
+    assert parallel.loc[0, 'skills'] == ["python", "machine learning"]
+
+def test_preprocessor_arrow_engine(preprocessor):
+    """Test that the arrow engine produces the same job offers as the pandas path."""
+    recent = (datetime.now() - timedelta(days=3)).strftime('%Y-%m-%d')
+    with open(preprocessor.data_jobs, 'r') as f:
+        raw_jobs = json.load(f)
+    raw_jobs += [
+        {**raw_jobs[0], 'link': "https://example.com/job1?trk=feed", 'publication_date': recent},
+        {**raw_jobs[1], 'link': "https://example.com/job3", 'description': "Java Developer"},
+        {**raw_jobs[1], 'link': "https://example.com/job4", 'publication_date': "2000-01-01", 'description': "Old"},
+        {**raw_jobs[1], 'link': "https://example.com/job5", 'company': preprocessor.filter_params[0], 'description': "Fake"}
+    ]
+    with open(preprocessor.data_jobs, 'w') as f:
+        json.dump(raw_jobs, f)
+    with open(preprocessor.job_offers, 'w') as f:
+        json.dump([{
+            "link": "https://example.com/job6",
+            "description_hash": "0123456789abcdef",
+            "vacancy_name": "Data Engineer",
+            "company": "Data Corp",
+            "publication_date": recent,
+            "job_id": "job6",
+            "remote": False,
+            "skills": ["python"]
+        }], f)
+
+    preprocessor.engine = 'pandas'
+    df_pandas = preprocessor.transform()
+    preprocessor.engine = 'arrow'
+    df_arrow = preprocessor.transform()
+    assert sorted(df_arrow.columns) == sorted(df_pandas.columns)
+    assert df_arrow['link'].to_list() == df_pandas['link'].to_list()
+    normalize = lambda df: df.astype(object).where(df.notna(), None)
+    pd.testing.assert_frame_equal(normalize(df_arrow), normalize(df_pandas[df_arrow.columns]))
+    assert len(df_arrow) == 4
+
+def test_preprocessor_load_parquet(preprocessor, temp_test_dir):
+    """Test that job offers stored as parquet keep the low-cardinality columns dictionary encoded."""
+    import pyarrow.parquet as pq
+    preprocessor.job_offers = str(temp_test_dir / "job_offers.parquet")
+    assert len(preprocessor.run()) == 2
+    assert str(pq.read_schema(preprocessor.job_offers).field('company').type).startswith('dictionary')
+    # a second run merges with the stored categorical offers
+    for engine in ['pandas', 'arrow']:
+        preprocessor.engine = engine
+        assert sorted(job['job_id'] for job in preprocessor.run()) == sorted(preprocessor.extract(preprocessor.data_jobs)['link'].map(
+            lambda link: shortuuid.encode(uuid.uuid5(preprocessor.namespace, link))
+        ))
+
+def test_preprocessor_load_partitioned(preprocessor, temp_test_dir):
+    """Test that job offers stored by publication date age out of the window a whole partition at a time."""
+    import os
+    from src.app.utils import save_table
+    preprocessor.job_offers = str(temp_test_dir / "job_offers")
+    old_date = (datetime.now() - timedelta(days=9)).strftime('%Y-%m-%d')
+    save_table(preprocessor.job_offers, pd.DataFrame([{
+        "job_id": "old", "link": "https://example.com/old", "publication_date": old_date,
+        "company": "Old Co", "description_hash": "0", "remote": False, "skills": ["python"]
+    }]))
+    assert len(preprocessor.run()) == 2
+    assert sorted(os.listdir(preprocessor.job_offers)) == sorted(
+        f"publication_date={(datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')}" for days in [1, 2]
+    )
+
+def test_preprocessor_append_partitioned(preprocessor, temp_test_dir):
+    """Test that partitioned job offers only receive the new jobs, replacing the stored ones they republish."""
+    import os
+    import time
+    from src.app.utils import open_table
+    from src.app.services.deduplicator import Deduplicator
+    preprocessor.job_offers = str(temp_test_dir / "job_offers")
+    preprocessor.deduplicator = Deduplicator(threshold=0.5, path=str(temp_test_dir / "signatures.parquet"))
+    assert len(preprocessor.run()) == 2
+    yesterday = f"publication_date={(datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')}"
+    absorbing = os.path.join(preprocessor.job_offers, yesterday, "location=__HIVE_DEFAULT_PARTITION__", "part.parquet")
+    modified = os.path.getmtime(absorbing)
+    time.sleep(0.01)
+
+    today = datetime.now().strftime('%Y-%m-%d')
+    with open(preprocessor.data_jobs, 'r') as f:
+        raw_jobs = json.load(f)
+    with open(preprocessor.data_jobs, 'w') as f:
+        json.dump([
+            {**raw_jobs[0], 'publication_date': today},
+            {**raw_jobs[1], 'link': "https://example.com/job3?trk=feed", 'description': "Remote Java Developer position!"},
+            {**raw_jobs[1], 'link': "https://example.com/job4", 'description': "Go Developer", 'publication_date': "2000-01-01"}
+        ], f)
+    appended = preprocessor.run()
+    assert [job['link'] for job in appended] == ["https://example.com/job1", "https://example.com/job2"]
+    # job2 absorbed job3 and is rewritten with its alias, job1 moved to today's partition
+    assert os.path.getmtime(absorbing) != modified
+    assert sorted(os.listdir(preprocessor.job_offers)) == [yesterday, f"publication_date={today}"]
+    df = open_table(preprocessor.job_offers).set_index('link')
+    assert sorted(df.index) == ["https://example.com/job1", "https://example.com/job2"]
+    assert df.loc["https://example.com/job1", 'publication_date'] == today
+    assert list(df.loc["https://example.com/job2", 'aliases']) == [
+        shortuuid.encode(uuid.uuid5(preprocessor.namespace, "https://example.com/job3"))
+    ]
+
+def test_preprocessor_job_ids(preprocessor, temp_test_dir):
+    """Test that job IDs are looked up by canonical link and kept for stored offers."""
+    with open(preprocessor.job_offers, 'w') as f:
+        json.dump([{"link": "https://example.com/job1", "job_id": "stored1"}], f)
+    with open(preprocessor.data_jobs, 'r') as f:
+        raw_jobs = json.load(f)
+    raw_jobs.append({**raw_jobs[1], 'link': "https://example.com/job2?trk=feed"})
+    with open(preprocessor.data_jobs, 'w') as f:
+        json.dump(raw_jobs, f)
+
+    df_raw, _ = preprocessor.sources()
+    new_id = shortuuid.encode(uuid.uuid5(preprocessor.namespace, "https://example.com/job2"))
+    assert df_raw['job_id'].to_list() == ["stored1", new_id, new_id]
+    df_map = preprocessor.job_ids.load()
+    assert dict(zip(df_map['link'], df_map['job_id'])) == {
+        "https://example.com/job1": "stored1",
+        "https://example.com/job2": new_id
+    }
+
+    # known links are resolved from the stored map without generating ids
+    preprocessor.job_ids.generate = lambda links: pytest.fail("unexpected id generation")
+    assert preprocessor.job_ids.assign(pd.Series(["https://example.com/job2?x=1"])).to_list() == [new_id]
+
+def test_preprocessor_raw_archive_empty_window(preprocessor, temp_test_dir):
+    """Test that no archived partition in the publication window keeps the stored offers."""
+    import os
+    assert len(preprocessor.run()) == 2
+
+    preprocessor.compactor.path = str(temp_test_dir / "raw_archive")
+    scraped = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+    with open(preprocessor.data_jobs, 'r') as f:
+        raw_jobs = json.load(f)
+    with open(preprocessor.data_jobs, 'w') as f:
+        json.dump([{**job, 'link': job['link'] + "0", 'scraping_date': scraped} for job in raw_jobs], f)
+    df_raw, _ = preprocessor.sources()
+    assert df_raw.empty and 'link' in df_raw.columns
+    assert sorted(os.listdir(preprocessor.compactor.path)) == ["_links", f"scraping_date={scraped}"]
+    assert sorted(job['link'] for job in preprocessor.run()) == ["https://example.com/job1", "https://example.com/job2"]
+
+    preprocessor.job_offers = str(temp_test_dir / "empty_offers.json")
+    assert preprocessor.run() == []
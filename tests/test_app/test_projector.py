@@ -0,0 +1,91 @@
+import pytest
+import numpy as np
+import pandas as pd
+from src.app.services.projector import Projector
+
+@pytest.fixture
+def df_jobs():
+    """Fixture to provide job embeddings living mostly in a low dimensional subspace."""
+    rng = np.random.default_rng(3)
+    basis = rng.normal(size=(4, 32))
+    noise = 0.01 * rng.normal(size=(60, 32))
+    skills = rng.normal(size=(30, 4)) @ basis + noise[:30]
+    roles = rng.normal(size=(30, 4)) @ basis + noise[30:]
+    return pd.DataFrame({
+        'job_id': [f'job{i}' for i in range(30)],
+        'avg_skill_embeds': skills.tolist(),
+        'role_embeds': roles.tolist()
+    }), basis
+
+@pytest.fixture
+def df_users(df_jobs):
+    """Fixture to provide user embeddings in the same subspace as the jobs."""
+    _, basis = df_jobs
+    rng = np.random.default_rng(5)
+    return pd.DataFrame({
+        'user_id': ['user1', 'user2', 'user3'],
+        'avg_skill_embeds': (rng.normal(size=(3, 4)) @ basis).tolist(),
+        'avg_role_embeds': (rng.normal(size=(3, 4)) @ basis).tolist()
+    })
+
+def test_projector_initialization():
+    """Test that Projector validates its configuration."""
+    assert not Projector('none', 0).enabled
+    assert Projector('pca', 8).enabled
+    with pytest.raises(ValueError, match="Unsupported projection method"):
+        Projector('umap', 8)
+
+def test_projector_truncate():
+    """Test truncation of Matryoshka embeddings."""
+    projector = Projector('truncate', 2)
+    projected = projector.transform([[1, 2, 3, 4], [5, 6, 7, 8]])
+    assert projected.tolist() == [[1, 2], [5, 6]]
+
+def test_projector_pca(df_jobs):
+    """Test PCA fitting and transformation."""
+    df, _ = df_jobs
+    projector = Projector('pca', 8)
+    with pytest.raises(ValueError, match="has not been fitted"):
+        projector.transform(df['role_embeds'].to_list())
+    projector.fit(np.vstack([df['avg_skill_embeds'].to_list(), df['role_embeds'].to_list()]))
+    assert projector.transform(df['role_embeds'].to_list()).shape == (30, 8)
+
+def test_projector_pca_keeps_cosine(df_jobs, df_users):
+    """Test that the uncentred PCA projection keeps the cosine similarities and is fingerprinted."""
+    from src.app.utils import cosine_similarity_matrix
+    df, _ = df_jobs
+    jobs = np.array(df['role_embeds'].to_list(), dtype=np.float32)
+    users = np.array(df_users['avg_role_embeds'].to_list(), dtype=np.float32)
+    projector = Projector('pca', 4).fit(jobs)
+    full = cosine_similarity_matrix(jobs, users)
+    assert np.abs(cosine_similarity_matrix(projector.transform(jobs), projector.transform(users)) - full).max() < 0.01
+    fingerprint = projector.fingerprint()
+    assert fingerprint == Projector('pca', 4).fit(jobs).fingerprint()
+    assert fingerprint != Projector('pca', 4).fit(jobs[:20]).fingerprint()
+
+def test_projector_save_load(df_jobs, tmp_path):
+    """Test that a fitted projection round trips through disk."""
+    df, _ = df_jobs
+    projector = Projector('pca', 6).fit(df['role_embeds'].to_list())
+    path = str(tmp_path / Projector.FILE_NAME)
+    projector.save(path)
+    loaded = Projector('none', 0)
+    assert loaded.load(path)
+    assert loaded.enabled
+    assert np.allclose(
+        loaded.transform(df['role_embeds'].to_list()),
+        projector.transform(df['role_embeds'].to_list())
+    )
+    assert not loaded.load(str(tmp_path / 'missing.npz'))
+
+def test_correlation_report(df_jobs, df_users):
+    """Test the correlation report against full vectors."""
+    df, _ = df_jobs
+    projector = Projector('pca', 4).fit(
+        np.vstack([df['avg_skill_embeds'].to_list(), df['role_embeds'].to_list()])
+    )
+    report = projector.correlation_report(df_users, df)
+    assert report['dim'] == 4
+    for name in ['skills', 'role']:
+        assert report[name]['pearson'] > 0.9
+        assert report[name]['spearman'] > 0.9
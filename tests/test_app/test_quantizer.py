@@ -0,0 +1,87 @@
+import pytest
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from src.app.services.quantizer import Quantizer
+from src.app.utils import cosine_similarity_matrix
+
+@pytest.fixture
+def df_jobs():
+    """Fixture to provide random full precision job embeddings."""
+    rng = np.random.default_rng(7)
+    return pd.DataFrame({
+        'job_id': [f'job{i}' for i in range(50)],
+        'avg_skill_embeds': rng.normal(size=(50, 16)).tolist(),
+        'role_embeds': rng.normal(size=(50, 16)).tolist()
+    })
+
+@pytest.fixture
+def df_users():
+    """Fixture to provide random user embeddings."""
+    rng = np.random.default_rng(11)
+    return pd.DataFrame({
+        'user_id': ['user1', 'user2'],
+        'avg_skill_embeds': rng.normal(size=(2, 16)).tolist(),
+        'avg_role_embeds': rng.normal(size=(2, 16)).tolist()
+    })
+
+def test_quantizer_initialization():
+    """Test that Quantizer validates the storage type."""
+    assert Quantizer('float16').dtype == 'float16'
+    with pytest.raises(ValueError, match="Unsupported embedding dtype"):
+        Quantizer('int4')
+
+@pytest.mark.parametrize("dtype, expected", [
+    ('float32', np.float32),
+    ('float16', np.float16),
+    ('int8', np.int8)
+])
+def test_quantize_dtypes(df_jobs, dtype, expected):
+    """Test that embedding columns are stored with the requested dtype."""
+    quantizer = Quantizer(dtype)
+    df = quantizer.quantize(df_jobs, ['avg_skill_embeds', 'role_embeds'])
+    assert quantizer.stack(df, 'role_embeds').dtype == expected
+    assert ('role_embeds_scale' in df.columns) == (dtype == 'int8')
+
+def test_quantize_round_trip(df_jobs):
+    """Test that int8 codes dequantize close to the original vectors."""
+    quantizer = Quantizer('int8', block_size=8)
+    df = quantizer.quantize(df_jobs, ['role_embeds'])
+    original = np.array(df_jobs['role_embeds'].to_list(), dtype=np.float32)
+    restored = quantizer.to_matrix(df, 'role_embeds')
+    assert np.allclose(original, restored, atol=np.abs(original).max() / 127)
+    assert 'role_embeds_scale' not in quantizer.dequantize(df, ['role_embeds']).columns
+
+def test_quantize_parquet_round_trip(df_jobs, tmp_path):
+    """Test that compact embeddings survive a parquet round trip."""
+    quantizer = Quantizer('float16')
+    df = quantizer.quantize(df_jobs, ['avg_skill_embeds', 'role_embeds'])
+    pq.write_table(pa.Table.from_pandas(df), tmp_path / 'jobs.parquet')
+    df_loaded = pq.read_table(tmp_path / 'jobs.parquet').to_pandas()
+    assert quantizer.stack(df_loaded, 'avg_skill_embeds').dtype == np.float16
+
+def test_cosine_on_quantized_codes(df_jobs, df_users):
+    """Test that scoring int8 codes directly matches full precision scores."""
+    quantizer = Quantizer('int8')
+    df = quantizer.quantize(df_jobs, ['role_embeds'])
+    user = quantizer.stack(df_users, 'avg_role_embeds')[0]
+    full = cosine_similarity_matrix(quantizer.stack(df_jobs, 'role_embeds'), user)
+    compact = cosine_similarity_matrix(quantizer.stack(df, 'role_embeds'), user)
+    assert np.nanmax(np.abs(full - compact)) < 0.02
+
+def test_drift_report(df_jobs, df_users):
+    """Test the drift report against full precision."""
+    report = Quantizer('float16').drift_report(df_users, df_jobs, top_k=5, threshold=0.2)
+    assert report['dtype'] == 'float16'
+    for name in ['skills', 'role']:
+        assert report[name]['max_abs_drift'] < 0.01
+        assert report[name]['recall@5'] >= 0.8
+        assert 0 <= report[name]['threshold_recall'] <= 1
+
+def test_empty_data():
+    """Test handling of empty data."""
+    quantizer = Quantizer('int8')
+    df = pd.DataFrame(columns=['job_id', 'role_embeds'])
+    assert quantizer.quantize(df, ['role_embeds']).empty
+    assert quantizer.stack(df, 'role_embeds').shape == (0, 0)
@@ -0,0 +1,54 @@
+import pytest
+import sys
+import json
+from src.app.services.raw_job import RawJob
+
+@pytest.fixture
+def raw_job():
+    """Fixture to provide a scraped job as a dictionary."""
+    return {
+        "vacancy_name": "Data Engineer",
+        "company": "Tech Corp",
+        "location": "Bogotá, Colombia",
+        "link": "https://example.com/job1",
+        "description": "Python and SQL",
+        "publication_date": "2024-01-01",
+        "scraping_date": "2024-01-02"
+    }
+
+def test_from_dict(raw_job):
+    """Test that records are validated once and keep their fields in slots."""
+    record = RawJob.from_dict({**raw_job, "unknown": 1})
+    assert record.to_dict() == {field: raw_job.get(field) for field in RawJob.__slots__}
+    assert not hasattr(record, "__dict__")
+    assert sys.getsizeof(record) < sys.getsizeof(record.to_dict())
+    for invalid in [{"link": None}, {"link": ""}, {"company": 1}, {"publication_date": "yesterday"}]:
+        with pytest.raises(ValueError):
+            RawJob.from_dict({**raw_job, **invalid})
+    assert RawJob.from_dict({**raw_job, "publication_date": ""}).publication_date == ""
+
+def test_encode_decode(raw_job):
+    """Test that a record round trips through a JSON line."""
+    record = RawJob.from_dict(raw_job)
+    line = record.encode()
+    assert "\n" not in line and "Bogotá" in line
+    assert RawJob.decode(line).to_dict() == record.to_dict()
+    with pytest.raises(ValueError):
+        RawJob.decode("{")
+
+@pytest.mark.parametrize("file_name", ["data_jobs.json", "data_jobs.ndjson"])
+def test_dump_read(tmp_path, raw_job, file_name):
+    """Test that raw files are decoded in batch, skipping the rows that do not match the schema."""
+    path = str(tmp_path / file_name)
+    records = [RawJob.from_dict(raw_job), RawJob.from_dict({**raw_job, "link": "https://example.com/job2"})]
+    assert RawJob.dump(path, records) == 2
+    df = RawJob.read(path)
+    assert list(df.columns) == list(RawJob.__slots__)
+    assert df["link"].to_list() == ["https://example.com/job1", "https://example.com/job2"]
+    assert RawJob.frame(records).equals(df)
+
+    with open(path, "w") as f:
+        jobs = [raw_job, {**raw_job, "link": None}, {**raw_job, "scraping_date": 20240102}, {**raw_job, "scraping_date": "2024/01/02"}]
+        f.write("\n".join(json.dumps(job) for job in jobs) if file_name.endswith(".ndjson") else json.dumps(jobs))
+    assert RawJob.read(path)["link"].to_list() == ["https://example.com/job1"]
+    assert RawJob.read(str(tmp_path / "missing.json")).empty
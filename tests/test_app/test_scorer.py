@@ -0,0 +1,105 @@
+import pytest
+import numpy as np
+from src.app.services import scorer
+from src.app.services.scorer import Scorer, score_group, score_user, signature
+
+@pytest.fixture
+def jobs():
+    """Fixture to provide job arrays with two filter columns."""
+    rng = np.random.default_rng(7)
+    return {
+        'skill': rng.normal(size=(50, 8)).astype(np.float32),
+        'role': rng.normal(size=(50, 8)).astype(np.float32),
+        'codes': rng.integers(0, 3, size=(50, 2)).astype(np.int32),
+        'valid': np.arange(50) % 10 != 0,
+        'english': np.arange(50) % 2 == 0
+    }
+
+@pytest.fixture
+def tasks():
+    """Fixture to provide scoring tasks for several users."""
+    rng = np.random.default_rng(11)
+    return [
+        {
+            'user_id': f'user{i}',
+            'skill': rng.normal(size=8),
+            'role': rng.normal(size=8),
+            'criteria': [np.array([0, 1], dtype=np.int32), np.array([i % 3], dtype=np.int32)],
+            'english': i % 2 == 0,
+            'role_weight': 0.5,
+            'threshold': 0.0,
+            'top_k': 3
+        }
+        for i in range(7)
+    ]
+
+def test_scorer_initialization():
+    """Test that Scorer never uses less than one worker."""
+    scorer = Scorer(workers=0, batch_size=0)
+    assert scorer.workers == 1
+    assert scorer.batch_size == 1
+
+def test_batches(tasks):
+    """Test that tasks are grouped by filter signature before batching."""
+    batches = Scorer(batch_size=2).batches(tasks)
+    assert [[task['user_id'] for task in batch] for batch in batches] == [
+        ['user0', 'user6'], ['user1'], ['user2'], ['user3'], ['user4'], ['user5']
+    ]
+    assert all(len({signature(task) for task in batch}) == 1 for batch in batches)
+
+def test_score_user(jobs, tasks):
+    """Test the knowledge filter and selection of a single user."""
+    result = score_user(tasks[1], jobs)
+    positions = result['positions']
+    assert jobs['valid'][positions].all()
+    assert np.isin(jobs['codes'][positions, 0], [0, 1]).all()
+    assert (jobs['codes'][positions, 1] == 1).all()
+    assert not jobs['english'][positions].any()
+    assert result['selected'].size <= 3
+    assert (result['score'][result['selected']] >= 0).all()
+
+def test_score_group(jobs, tasks):
+    """Test that a group scored with one matrix product matches per-user scoring."""
+    group = [{**task, 'criteria': tasks[0]['criteria'], 'english': True} for task in tasks]
+    for result, task in zip(score_group(group, jobs), group):
+        expected = score_user(task, jobs)
+        assert result['user_id'] == task['user_id']
+        assert np.array_equal(result['positions'], expected['positions'])
+        assert np.allclose(result['score'], expected['score'], atol=1e-4)
+
+def test_score_parallel(jobs, tasks):
+    """Test that parallel scoring returns the serial results in the same order."""
+    serial = list(Scorer(workers=1, batch_size=2).score(tasks, jobs))
+    parallel = list(Scorer(workers=2, batch_size=2).score(tasks, jobs))
+    assert [result['user_id'] for result in parallel] == [result['user_id'] for result in serial]
+    assert sorted(result['user_id'] for result in parallel) == sorted(task['user_id'] for task in tasks)
+    for expected, result in zip(serial, parallel):
+        for key in ['positions', 'role_similarity', 'skills_similarity', 'selected']:
+            assert np.array_equal(expected[key], result[key], equal_nan=True)
+
+def test_detach_jobs(jobs):
+    """Test that the worker views of the shared job arrays are dropped and their blocks closed."""
+    from multiprocessing import shared_memory
+    array = np.ascontiguousarray(jobs['skill'])
+    block = shared_memory.SharedMemory(create=True, size=array.nbytes)
+    try:
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        scorer._attach_jobs({'skill': (block.name, array.shape, array.dtype.str)})
+        assert np.array_equal(scorer._shared_jobs['skill'], array)
+        scorer._detach_jobs()
+        assert scorer._shared_jobs == {} and scorer._shared_blocks == []
+    finally:
+        block.close()
+        block.unlink()
+
+def test_score_group_candidates(jobs, tasks):
+    """Test that users only keep their own skill candidates."""
+    group = [
+        {**tasks[0], 'candidates': np.arange(0, 50, 2, dtype=np.int32)},
+        {**tasks[6], 'candidates': np.array([1, 3, 4], dtype=np.int32)}
+    ]
+    first, second = score_group(group, jobs)
+    assert np.isin(first['positions'], group[0]['candidates']).all()
+    assert np.isin(second['positions'], [1, 3, 4]).all()
+    full = score_user(tasks[0], jobs)
+    assert np.array_equal(first['positions'], full['positions'][full['positions'] % 2 == 0])
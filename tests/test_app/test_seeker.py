@@ -86,17 +86,20 @@ def test_seeker_run_with_matches(seeker, temp_test_dir):
         ]
         
         m.setattr("src.app.controllers.seeker.retriever.get_last_matches", 
-                 lambda x: sample_matches)
+                 lambda x, locations=None: sample_matches)
         
         # Mock the service classes
         m.setattr("src.app.controllers.seeker.preprocesor.run", lambda: None)
         m.setattr("src.app.controllers.seeker.expirer.update", lambda: None)
         m.setattr("src.app.controllers.seeker.embeder.users", lambda: None)
-        m.setattr("src.app.controllers.seeker.embeder.jobs", lambda: None)
+        m.setattr("src.app.controllers.seeker.embeder.jobs", lambda: ['job1'])
         m.setattr("src.app.controllers.seeker.mentor.run", lambda: None)
+        pushed = []
+        m.setattr("src.app.controllers.seeker.mentor.push", pushed.append)
         
         # Run the pipeline
         seeker.run()
+        assert pushed == [['job1']]
         
         # Verify output files were created
         output_file = Path(seeker.output) / f"{seeker.user_ids[0]}.md"
@@ -113,7 +116,7 @@ def test_seeker_run_without_matches(seeker, temp_test_dir):
     # Mock the retriever's get_last_matches method to return empty list
     with pytest.MonkeyPatch.context() as m:
         m.setattr("src.app.controllers.seeker.retriever.get_last_matches", 
-                 lambda x: [])
+                 lambda x, locations=None: [])
         
         # Mock the service classes
         m.setattr("src.app.controllers.seeker.preprocesor.run", lambda: None)
@@ -145,7 +148,7 @@ def test_seeker_run_with_service_errors(seeker, temp_test_dir):
     
     # Mock the retriever's get_last_matches method to raise an error
     with pytest.MonkeyPatch.context() as m:
-        def mock_get_last_matches(user_id):
+        def mock_get_last_matches(user_id, locations=None):
             # Instead of raising an exception, return an empty list
             # This should trigger the "no matches" behavior
             return []
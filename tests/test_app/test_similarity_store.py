@@ -0,0 +1,83 @@
+import pytest
+import os
+import numpy as np
+import pandas as pd
+from src.app.services.similarity_store import SimilarityStore
+
+@pytest.fixture
+def store(tmp_path):
+    """Fixture to create a SimilarityStore in a temporary directory."""
+    return SimilarityStore(str(tmp_path / "similarities.parquet"))
+
+@pytest.fixture
+def components():
+    """Fixture to provide similarity components for two users."""
+    return pd.DataFrame({
+        'user_id': ['user1', 'user1', 'user2'],
+        'job_id': ['job1', 'job2', 'job1'],
+        'role_similarity': [0.9, 0.2, 0.5],
+        'skills_similarity': [0.1, 0.8, 0.5]
+    })
+
+@pytest.fixture
+def state():
+    """Fixture to provide user and job versions."""
+    return {
+        'users': {'user1': 'u1', 'user2': 'u2'},
+        'jobs': {'job1': 'j1', 'job2': 'j2'}
+    }
+
+def test_load_empty(store):
+    """Test loading before anything has been stored."""
+    df = store.load()
+    assert df.empty
+    assert list(df.columns) == SimilarityStore.COLUMNS
+
+def test_update_and_load(store, components, state):
+    """Test that components round trip through the store."""
+    store.update(components, state)
+    df = store.load()
+    assert len(df) == 3
+    assert df['role_similarity'].dtype == np.float32
+    assert set(store.load(['user2'])['job_id']) == {'job1'}
+
+def test_update_drops_stale_versions(store, components, state):
+    """Test that components of changed embeddings are not reused."""
+    store.update(components, state)
+    new_state = {'users': {'user1': 'u1', 'user2': 'u2-new'}, 'jobs': {'job1': 'j1'}}
+    assert len(store.valid(store.load(), new_state)) == 1
+    store.update(components.iloc[:0], new_state)
+    assert store.load()[['user_id', 'job_id']].values.tolist() == [['user1', 'job1']]
+
+def test_blend(components):
+    """Test the vectorized re-blend of the components."""
+    df = SimilarityStore.blend(components[components['user_id'] == 'user1'], role_weight=0.0, threshold=0.5)
+    assert df['job_id'].tolist() == ['job2']
+    assert df['score'].tolist() == [0.8]
+    df = SimilarityStore.blend(components[components['user_id'] == 'user1'], role_weight=1.0, threshold=0.5)
+    assert df['job_id'].tolist() == ['job1']
+
+def test_blend_top_k(components):
+    """Test that the re-blend keeps only the k best jobs."""
+    df = SimilarityStore.blend(components[components['user_id'] == 'user1'], role_weight=0.3, top_k=1)
+    assert df['job_id'].tolist() == ['job2']
+
+def test_stream_components(store, components, state):
+    """Test that components streamed during a run replace only the rescored pairs."""
+    store.update(components, state)
+    store.begin(state)
+    store.append(pd.DataFrame({'user_id': 'user1', 'job_id': ['job2'], 'role_similarity': [0.3], 'skills_similarity': [0.3]}), {'job2'})
+    store.append(pd.DataFrame({'user_id': 'user2', 'job_id': ['job2'], 'role_similarity': [0.4], 'skills_similarity': [0.4]}))
+    assert len(store.load()) == 3
+    store.commit()
+    assert store.session is None
+    df = store.load().sort_values(['user_id', 'job_id'])
+    assert df[['user_id', 'job_id']].values.tolist() == [['user1', 'job1'], ['user1', 'job2'], ['user2', 'job2']]
+    assert df['role_similarity'].tolist() == pytest.approx([0.9, 0.3, 0.4])
+
+    # an aborted run leaves the store untouched
+    store.begin(state)
+    store.append(components)
+    store.abort()
+    assert len(store.load()) == 3
+    assert not os.path.exists(store.path + '.tmp')
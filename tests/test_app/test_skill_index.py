@@ -0,0 +1,34 @@
+import pytest
+import numpy as np
+from src.app.services.skill_index import SkillIndex
+
+@pytest.fixture
+def skill_index():
+    """Fixture to provide an index over four jobs."""
+    return SkillIndex(min_shared=1).build([
+        ['python', 'sql'],
+        ['java'],
+        ['python', 'docker', 'aws', 'sql'],
+        None
+    ])
+
+def test_skill_index_initialization():
+    """Test that candidate generation is disabled without thresholds."""
+    assert not SkillIndex(0, 0).enabled
+    assert SkillIndex(2, 0).enabled
+    assert SkillIndex(0, 0.3).enabled
+
+def test_build(skill_index):
+    """Test the postings and skill counts of the index."""
+    assert skill_index.index['python'].tolist() == [0, 2]
+    assert skill_index.sizes.tolist() == [2, 1, 4, 0]
+
+def test_candidates(skill_index):
+    """Test candidate generation by shared skills and Jaccard similarity."""
+    assert skill_index.candidates([' Python ', 'SQL']).tolist() == [0, 2]
+    assert skill_index.candidates(['rust']).tolist() == []
+    assert skill_index.candidates([]) is None
+    skill_index.min_shared = 2
+    assert skill_index.candidates(['python', 'sql', 'java']).tolist() == [0, 2]
+    skill_index.min_jaccard = 0.6
+    assert skill_index.candidates(['python', 'sql']).tolist() == [0]
@@ -0,0 +1,50 @@
+import pytest
+import numpy as np
+from src.app.services.user_index import UserIndex
+from src.app.services.user_registry import UserRecord
+
+@pytest.fixture
+def user_index():
+    """Fixture to provide an index over three users."""
+    profile = {
+        "seniority": ["Senior"],
+        "location": ["Bogota"],
+        "work_modality_english": ["Full-time"],
+        "remote": ["True"],
+        "english": "True",
+        "role_weight": "0.5",
+        "similarity_threshold": "0.5"
+    }
+    records = [
+        UserRecord.from_dict({**profile, "user_id": "user1"}),
+        UserRecord.from_dict({**profile, "user_id": "user2", "english": "False"}),
+        UserRecord.from_dict({**profile, "user_id": "user3", "location": ["Medellin"]})
+    ]
+    skill = np.array([[1, 0], [1, 0], [1, 0]], dtype=np.float32)
+    role = np.array([[1, 0], [0, 1], [1, 0]], dtype=np.float32)
+    return UserIndex(['user1', 'user2', 'user3'], skill, role, records)
+
+@pytest.fixture
+def job():
+    """Fixture to provide a job offer accepted by the Bogota users."""
+    return {
+        "seniority": "Senior",
+        "location": "Bogota",
+        "work_modality_english": "Full-time",
+        "remote": True
+    }
+
+def test_eligible(user_index, job):
+    """Test that the bitmaps select the users accepting a job."""
+    assert user_index.eligible(job).tolist() == [0, 1]
+    assert user_index.eligible(job, english=True).tolist() == [0]
+    assert user_index.eligible({**job, "location": "Cali"}).tolist() == []
+
+def test_match(user_index, job):
+    """Test that only the users whose threshold is cleared are returned."""
+    user_ids, role, skills, score = user_index.match(job, np.array([1, 0]), np.array([1, 0]))
+    assert user_ids.tolist() == ['user1', 'user2']
+    assert score.tolist() == [1.0, 0.5]
+    user_ids, _, _, score = user_index.match(job, np.array([0, 1]), np.array([0, 1]))
+    assert user_ids.tolist() == ['user2']
+    assert score.tolist() == [0.5]
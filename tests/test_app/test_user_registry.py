@@ -0,0 +1,81 @@
+import pytest
+import json
+from src.app.services.user_registry import UserRecord, UserRegistry, parse_bool
+
+@pytest.fixture
+def job_seekers(tmp_path):
+    """Fixture to provide a job seekers file with one invalid profile."""
+    path = tmp_path / "job_seekers.json"
+    users = [
+        {
+            "user_id": "user1",
+            "seniority": ["Senior"],
+            "location": ["Bogota"],
+            "work_modality_english": ["Full-time"],
+            "remote": ["True", "False"],
+            "english": "False",
+            "role_weight": "0.7",
+            "similarity_threshold": "0.5"
+        },
+        {
+            "user_id": "user2",
+            "seniority": ["Junior"],
+            "location": ["Medellin"],
+            "work_modality_english": ["Part-time"],
+            "remote": ["maybe"],
+            "english": "True",
+            "role_weight": "0.7",
+            "similarity_threshold": "0.5"
+        }
+    ]
+    with open(path, 'w') as f:
+        json.dump(users, f)
+    return path, users
+
+def test_parse_bool():
+    """Test parsing of boolean flags."""
+    assert parse_bool("True") is True
+    assert parse_bool(" false ") is False
+    assert parse_bool(True) is True
+    with pytest.raises(ValueError, match="Invalid boolean"):
+        parse_bool("1")
+
+def test_user_record(job_seekers):
+    """Test validation of a job seeker profile."""
+    _, users = job_seekers
+    record = UserRecord.from_dict(users[0])
+    assert record.remote == (True, False)
+    assert record.english is False
+    assert record.role_weight == 0.7
+    assert record.profile() == [['Senior'], ['Bogota'], ['Full-time'], [True, False], False]
+    assert not hasattr(record, '__dict__')
+    with pytest.raises(ValueError, match="role_weight"):
+        UserRecord.from_dict({**users[0], 'role_weight': '1.5'})
+    with pytest.raises(ValueError, match="Missing field"):
+        UserRecord.from_dict({'user_id': 'user3'})
+
+def test_user_registry(job_seekers):
+    """Test that the registry indexes valid users and reloads only on change."""
+    path, users = job_seekers
+    registry = UserRegistry(str(path)).load()
+    assert len(registry) == 1
+    assert 'user1' in registry and 'user2' not in registry
+    assert registry.get('user2') is None
+    record = registry['user1']
+    assert registry.load()['user1'] is record
+    
+    users[0]['role_weight'] = "0.2"
+    with open(path, 'w') as f:
+        json.dump(users + [{**users[0], 'user_id': 'user3'}], f)
+    registry.load()
+    assert registry['user1'].role_weight == 0.2
+    assert [user.user_id for user in registry] == ['user1', 'user3']
+
+def test_user_registry_signature(job_seekers):
+    """Test that the signature changes with the job seekers file."""
+    path, _ = job_seekers
+    registry = UserRegistry(str(path))
+    assert registry.signature() is None
+    signature = registry.load().signature()
+    assert signature[0] == str(path)
+    assert registry.load().signature() == signature
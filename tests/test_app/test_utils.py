@@ -17,8 +17,19 @@ logger.addHandler(console_handler)
 from src.app.utils import (
     save_json,
     open_json,
+    save_records,
+    iter_records,
+    open_records,
+    save_table,
+    append_partitions,
+    open_table,
+    isin_codes,
+    location_filters,
+    save_clustered,
     get_file_paths,
     cosine_similarity_numpy,
+    cosine_similarity_matrix,
+    top_k_indices,
     create_job_markdown_table,
     save_markdown_to_file,
     is_english,
@@ -78,6 +89,134 @@ def test_open_json(temp_test_files):
 
 
 
+# Test save_records, iter_records and open_records functions
+@pytest.mark.parametrize("file_name", ["records.json", "records.ndjson"])
+def test_save_records(tmp_path, file_name):
+    path = str(tmp_path / file_name)
+    batches = ([{"id": i, "batch": batch} for i in range(2)] for batch in range(3))
+    assert save_records(path, batches) == 6
+    assert not os.path.exists(f"{path}.tmp")
+    records = list(iter_records(path))
+    assert records == [{"id": i, "batch": batch} for batch in range(3) for i in range(2)]
+    if file_name.endswith(".json"):
+        with open(path, "r") as f:
+            assert json.load(f) == records
+    assert save_records(path, [[]]) == 0
+    assert open_records(path) == []
+    assert open_records(str(tmp_path / "missing.ndjson")) is None
+
+
+# Test save_table, open_table and isin_codes functions
+@pytest.mark.parametrize("file_name", ["offers.json", "offers.parquet"])
+def test_save_table(tmp_path, file_name):
+    import pyarrow.parquet as pq
+    path = str(tmp_path / file_name)
+    df = pd.DataFrame({
+        "job_id": ["job1", "job2", "job3"],
+        "seniority": ["Senior", "Junior", "Senior"],
+        "company": ["Tech Corp", None, "Tech Corp"],
+        "skills": [["python"], [], ["java", "sql"]]
+    })
+    save_table(path, df)
+    loaded = open_table(path)
+    assert isinstance(loaded["seniority"].dtype, pd.CategoricalDtype)
+    assert isinstance(loaded["company"].dtype, pd.CategoricalDtype)
+    assert loaded["job_id"].dtype == object
+    assert loaded["skills"].to_list() == [["python"], [], ["java", "sql"]]
+    assert loaded["seniority"].astype(str).to_list() == ["Senior", "Junior", "Senior"]
+    if file_name.endswith(".parquet"):
+        schema = pq.read_schema(path)
+        assert str(schema.field("seniority").type).startswith("dictionary")
+        assert str(schema.field("job_id").type) == "string"
+    assert open_table(str(tmp_path / "missing.parquet")) is None
+    assert isin_codes(loaded["seniority"], ["Senior", "Lead"]).tolist() == [True, False, True]
+    assert isin_codes(loaded["company"], ["Tech Corp"]).tolist() == [True, False, True]
+    assert not isin_codes(loaded["company"], []).any()
+
+
+def test_save_table_partitioned(tmp_path):
+    import time
+    path = str(tmp_path / "job_offers")
+    df = pd.DataFrame({
+        "job_id": ["job1", "job2", "job3", "job4"],
+        "publication_date": ["2024-01-03", "2024-01-02", "2024-01-03", None],
+        "location": ["Bogotá, Colombia", "Lima, Peru", "Lima, Peru", "Lima, Peru"],
+        "company": ["Tech Corp", "Data Inc", "Tech Corp", "Web Co"],
+        "skills": [["python"], [], ["java", "sql"], ["go"]]
+    })
+    save_table(path, df)
+    assert sorted(os.listdir(path)) == [
+        "publication_date=2024-01-02",
+        "publication_date=2024-01-03",
+        "publication_date=__HIVE_DEFAULT_PARTITION__"
+    ]
+    assert sorted(os.listdir(os.path.join(path, "publication_date=2024-01-03"))) == [
+        "location=Bogot%C3%A1%2C%20Colombia",
+        "location=Lima%2C%20Peru"
+    ]
+    loaded = open_table(path)
+    assert sorted(loaded["job_id"]) == ["job1", "job2", "job3", "job4"]
+    assert isinstance(loaded["company"].dtype, pd.CategoricalDtype)
+    assert loaded.set_index("job_id").loc["job3", "skills"] == ["java", "sql"]
+    # readers prune the partitions outside the window and the user's locations
+    recent = open_table(path, [("publication_date", ">=", "2024-01-03")])
+    assert sorted(recent["job_id"]) == ["job1", "job3"]
+    assert open_table(path, [("publication_date", "in", ["2024-01-02"])])["job_id"].to_list() == ["job2"]
+    assert sorted(open_table(path, location_filters(["Lima, Peru"]))["job_id"]) == ["job2", "job3", "job4"]
+    assert open_table(path, location_filters([])).empty
+    # partitions without rows are dropped
+    save_table(path, pd.concat([df.iloc[[1]], df.iloc[[0]].assign(job_id="job5", publication_date="2024-01-04")]))
+    assert sorted(os.listdir(path)) == ["publication_date=2024-01-02", "publication_date=2024-01-04"]
+    assert open_table(path, columns=["job_id", "missing"]).columns.to_list() == ["job_id"]
+    assert open_table(str(tmp_path / "missing")) is None
+
+
+def test_append_partitions(tmp_path):
+    import time
+    path = str(tmp_path / "job_offers")
+    df = pd.DataFrame({
+        "job_id": ["job1", "job2", "job3"],
+        "publication_date": ["2024-01-01", "2024-01-02", "2024-01-03"],
+        "location": ["Lima, Peru", "Lima, Peru", "Lima, Peru"],
+        "company": ["Tech Corp", "Data Inc", "Web Co"]
+    })
+    assert append_partitions(path, df) == 3
+    untouched = os.path.join(path, "publication_date=2024-01-03", "location=Lima%2C%20Peru", "part.parquet")
+    modified = os.path.getmtime(untouched)
+    time.sleep(0.01)
+    # only the partitions receiving or losing rows are rewritten, expired ones are dropped by name
+    new = pd.DataFrame({
+        "job_id": ["job2", "job4"],
+        "publication_date": ["2024-01-02", "2024-01-04"],
+        "location": ["Lima, Peru", "Lima, Peru"],
+        "company": ["New Corp", "Data Inc"]
+    })
+    assert append_partitions(path, new, since="2024-01-02") == 2
+    assert os.path.getmtime(untouched) == modified
+    assert sorted(os.listdir(path)) == ["publication_date=2024-01-02", "publication_date=2024-01-03", "publication_date=2024-01-04"]
+    loaded = open_table(path).set_index("job_id")
+    assert sorted(loaded.index) == ["job2", "job3", "job4"]
+    assert loaded.loc["job2", "company"] == "New Corp"
+    assert isinstance(loaded["company"].dtype, pd.CategoricalDtype)
+    # removed rows empty their partition
+    assert append_partitions(path, new.iloc[:0], removed=df.iloc[[2]]) == 1
+    assert sorted(os.listdir(path)) == ["publication_date=2024-01-02", "publication_date=2024-01-04"]
+
+
+def test_save_clustered(tmp_path):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    pathfile = str(tmp_path / "jobs.parquet")
+    df = pd.DataFrame({
+        "job_id": ["job1", "job2", "job3", "job4"],
+        "location": ["Lima, Peru", "Bogotá, Colombia", None, "Lima, Peru"]
+    })
+    save_clustered(pathfile, pa.Table.from_pandas(df), "location")
+    assert pq.ParquetFile(pathfile).num_row_groups == 3
+    table = pq.read_table(pathfile, filters=location_filters(["Lima, Peru"]))
+    assert sorted(table.column("job_id").to_pylist()) == ["job1", "job4"]
+
+
 # Test get_file_paths function
 def test_get_file_paths(temp_test_files):
     test_dir = temp_test_files["test_dir"]
@@ -200,6 +339,37 @@ def test_cosine_similarity_numpy():
 
 
 
+# Test cosine_similarity_matrix function
+def test_cosine_similarity_matrix():
+    matrix = np.array([[1, 2, 3], [0, 0, 0], [-1, -2, -3]], dtype=np.float16)
+    similarity = cosine_similarity_matrix(matrix, [1, 2, 3], block_size=2)
+    assert similarity.shape == (3,)
+    assert similarity[0] == 1.0
+    assert np.isnan(similarity[1])
+    assert similarity[2] == -1.0
+    # several vectors at once
+    similarity = cosine_similarity_matrix(matrix, np.array([[1, 2, 3], [4, 5, 6]]))
+    assert similarity.shape == (3, 2)
+    assert similarity[0, 1] == cosine_similarity_numpy([1, 2, 3], [4, 5, 6])
+    # different dimensions
+    with pytest.raises(ValueError, match="Vectors must have the same length"):
+        cosine_similarity_matrix(matrix, [1, 2])
+
+
+
+# Test top_k_indices function
+def test_top_k_indices():
+    scores = np.array([0.2, 0.9, np.nan, 0.5, 0.7])
+    assert top_k_indices(scores, 2).tolist() == [1, 4]
+    assert top_k_indices(scores, 10).tolist() == [1, 4, 3, 0]
+    # without k every position above the threshold is kept in its original order
+    assert top_k_indices(scores, 0, threshold=0.5).tolist() == [1, 3, 4]
+    assert top_k_indices(scores, 2, threshold=0.8).tolist() == [1]
+    assert top_k_indices([], 3).tolist() == []
+    assert top_k_indices(scores, 2, threshold=0.5, rank=[0, 0.1, 0, 0.3, 0.2]).tolist() == [3, 4]
+
+
+
 # Test create_job_markdown_table function
 def test_create_job_markdown_table():
     job_list = [
@@ -408,6 +578,18 @@ class TestRetriever:
 
 
 
+    def test_get_last_matches_ndjson(self, tmp_path):
+        matches_path = str(tmp_path / "matches.ndjson")
+        save_records(matches_path, [self.matches_data])
+        self.retriever.matches = matches_path
+        assert [match["score"] for match in self.retriever.get_last_matches("user2")] == [0.9, 0.7]
+
+    def test_get_last_matches_top_k(self):
+        user2_matches = self.retriever.get_last_matches("user2", top_k=1)
+        assert len(user2_matches) == 1
+        assert user2_matches[0]["score"] == 0.9
+        assert len(self.retriever.get_last_matches("user2", top_k=0)) == 2
+
     def test_get_last_matches(self):
         # Call the method being tested
         user1_matches = self.retriever.get_last_matches("user1")